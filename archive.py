@@ -0,0 +1,74 @@
+import sys
+import time
+from datetime import datetime
+
+import task_db
+from metrics import METRICS
+
+# Completed tasks are archived once they have been done for this many days
+ARCHIVE_AFTER_DAYS = 30
+# Tasks moved per write transaction, so other writers wait at most one batch
+ARCHIVE_BATCH_SIZE = 1000
+
+# Tasks of one batch: completed before the cutoff, within the batch's id range. Tasks completed
+# before schema version 6 have no completed_at and are dated by their due date instead.
+BATCH_CONDITION = "status='Completed' AND COALESCE(completed_at, due_epoch) < ? AND id BETWEEN ? AND ?"
+
+
+def archive_completed(pool, older_than_days=ARCHIVE_AFTER_DAYS, batch_size=ARCHIVE_BATCH_SIZE, progress=None,
+                      on_batch=None, now=None):
+    """Move tasks completed more than older_than_days ago from tasks into archive.tasks; returns the count
+
+    The pool must have the archive attached (task_db.ConnectionPool does by default). Tasks are
+    moved batch_size at a time in id order, holding the write lock for one batch: the rows and
+    their full-text entries are copied into the archive and committed, then deleted from tasks
+    (the delete trigger drops them from tasks_fts) together with their reminder_log rows. The
+    lock is released between batches, so the app keeps saving edits while a backlog is archived.
+
+    A commit spanning two WAL databases is atomic per file only, hence the two commits: a crash
+    in between leaves a batch in both databases, never in neither. The copy skips rows already
+    archived and the next run finishes the move. on_batch(ids) and progress(archived) are called
+    after every batch.
+    """
+    now_epoch = task_db.datetime_to_epoch(now or datetime.now())
+    cutoff = now_epoch - older_than_days * 86400
+    archived = last_id = 0
+    while True:
+        started = time.perf_counter()
+        with pool.write() as conn:
+            # "+status" keeps SQLite from using the status index, which would not return ids in order;
+            # walking the primary key from last_id reads the table once over all batches
+            ids = [row[0] for row in conn.execute(
+                "SELECT id FROM tasks WHERE +status='Completed' AND COALESCE(completed_at, due_epoch) < ? AND id > ? "
+                "ORDER BY id LIMIT ?",
+                (cutoff, last_id, batch_size)
+            )]
+            if not ids:
+                break
+            params = (cutoff, ids[0], ids[-1])
+            conn.execute(f"""
+                INSERT INTO archive.tasks_fts (rowid, title, description)
+                SELECT id, title, description FROM main.tasks
+                WHERE {BATCH_CONDITION} AND id NOT IN (SELECT id FROM archive.tasks WHERE id BETWEEN ? AND ?)
+            """, (*params, ids[0], ids[-1]))
+            conn.execute(f"""
+                INSERT OR IGNORE INTO archive.tasks (id, title, description, due_date, priority, status, ai_reason,
+                                                     estimate_hours, completed_at, archived_at)
+                SELECT id, title, description, due_date, priority, status, ai_reason, estimate_hours, completed_at, ?
+                FROM main.tasks WHERE {BATCH_CONDITION}
+            """, (now_epoch, *params))
+            conn.commit()
+            conn.execute(f"DELETE FROM reminder_log WHERE task_id IN (SELECT id FROM main.tasks WHERE {BATCH_CONDITION})",
+                         params)
+            conn.execute(f"DELETE FROM main.tasks WHERE {BATCH_CONDITION}", params)
+        METRICS.record("archive batch", time.perf_counter() - started)
+        last_id = ids[-1]
+        archived += len(ids)
+        if on_batch is not None:
+            on_batch(ids)
+        if progress is not None:
+            progress(archived)
+    if archived:
+        METRICS.count("archive tasks", archived)
+        print(f"[Archive] Moved {archived} completed tasks to {pool.archive_path}", file=sys.stderr)
+    return archived
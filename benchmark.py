@@ -0,0 +1,379 @@
+"""Benchmarks for the scheduler's hot paths, headless, with JSON results and baseline comparison
+
+    python benchmark.py                                   # 1k, 100k and 1M rows
+    python benchmark.py --sizes 1000 100000 --output results.json
+    python benchmark.py --save-baseline                   # store results as the baseline
+    python benchmark.py --baseline benchmark_baseline.json --tolerance 0.25
+
+Synthetic databases are generated once per size (fixed seed) and reused from --data-dir.
+With a baseline, any benchmark whose median time per operation (or the task store's memory per
+task) grew by more than --tolerance is reported and the exit code is 1.
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import sqlite3
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import date, datetime, timedelta
+
+import changefeed
+import scoring
+import task_db
+from task_ai import HIGH_KEYWORDS, MEDIUM_LEMMAS, ModelLoader, PriorityClassifier
+from task_service import TaskService
+from task_store import TaskStore
+
+SIZES = (1000, 100000, 1000000)
+SEED = 42
+BASELINE_PATH = "benchmark_baseline.json"
+# A benchmark regresses when its median time per operation grows by more than this fraction
+TOLERANCE = 0.2
+
+# Descriptions mixing every classifier tier: keywords, inflected lemmas and no match at all
+FILLER_WORDS = ["report", "meeting", "client", "invoice", "review", "call", "email", "lunch", "gym",
+                "budget", "deploy", "server", "design", "docs", "groceries", "dentist", "plan", "team"]
+LEMMA_FORMS = ["priorities", "majors", "soonest", "prioritized"]
+CLASSIFY_SAMPLES = 2000
+WRITE_SAMPLES = 500
+QUERY_REPEAT = 50
+STARTUP_REPEAT = 5
+# Rows per list page, as in task_scheduler.PAGE_SIZE (not imported: that module needs Tk)
+PAGE_SIZE = 100
+# "Now" for the check_tasks scan, inside the synthetic due date range
+CHECK_TIME = datetime(2026, 6, 1)
+
+STARTUP_SCRIPT = (
+    "from task_service import TaskService\n"
+    "service = TaskService({path!r})\n"
+    "service.count_tasks()\n"
+    "service.fetch_page(None, {page_size})\n"
+    "service.close()\n"
+)
+
+
+def synthetic_description(rnd):
+    words = rnd.choices(FILLER_WORDS, k=rnd.randint(3, 10))
+    roll = rnd.random()
+    if roll < 0.1:
+        words.insert(rnd.randrange(len(words) + 1), rnd.choice(HIGH_KEYWORDS))
+    elif roll < 0.2:
+        words.insert(rnd.randrange(len(words) + 1), rnd.choice(MEDIUM_LEMMAS))
+    elif roll < 0.3:
+        words.insert(rnd.randrange(len(words) + 1), rnd.choice(LEMMA_FORMS))
+    return " ".join(words)
+
+
+def synthetic_tasks(count, rnd, classifier):
+    """Yield import-ready (title, description, due_date, priority, ai_reason, score, score_features) rows"""
+    first_day = date(2026, 1, 1)
+    first_epoch = task_db.date_to_epoch(first_day.strftime(task_db.DATE_FORMAT))
+    today = scoring.today_epoch(CHECK_TIME)
+    while count > 0:
+        batch = min(count, 10000)
+        descriptions = [synthetic_description(rnd) for _ in range(batch)]
+        days = [rnd.randrange(730) for _ in range(batch)]
+        features = [scoring.text_features(description) for description in descriptions]
+        scores, reasons = scoring.score_tasks(features, [first_epoch + day * 86400 for day in days],
+                                              ["Pending"] * batch, today)
+        for description, (priority, _), day, ai_reason, score, feature_bits in zip(
+                descriptions, classifier.prioritize_batch(descriptions), days, reasons, scores.tolist(), features):
+            title = " ".join(rnd.choices(FILLER_WORDS, k=rnd.randint(1, 4))).capitalize()
+            due_date = (first_day + timedelta(days=day)).strftime(task_db.DATE_FORMAT)
+            yield title, description, due_date, priority, ai_reason, score, feature_bits
+        count -= batch
+
+
+def prepare_database(data_dir, size):
+    """Path of a database with `size` synthetic tasks (a fifth completed), generated on first use"""
+    path = os.path.join(data_dir, f"tasks_{size}_v{task_db.SCHEMA_VERSION}.db")
+    if os.path.exists(path):
+        return path
+    print(f"[Bench] Generating {size} tasks in {path}...", file=sys.stderr)
+    started = time.perf_counter()
+    partial = path + ".partial"
+    for suffix in ("", "-wal", "-shm"):
+        if os.path.exists(partial + suffix):
+            os.remove(partial + suffix)
+    pool = task_db.ConnectionPool(partial, archive=False)
+    with pool.write() as conn:
+        task_db.init_schema(conn)
+    rnd = random.Random(SEED)
+    rows = synthetic_tasks(size, rnd, PriorityClassifier())
+    while batch := [row for _, row in zip(range(10000), rows)]:
+        pool.insert_tasks(batch)
+    with pool.write() as conn:
+        conn.execute("UPDATE tasks SET status='Completed', score=NULL WHERE id % 5 = 0")
+    scoring.rescore_all(pool, CHECK_TIME)  # scores the completed tasks
+    pool.close()  # the last connection to close checkpoints and removes the WAL
+    os.replace(partial, path)
+    print(f"[Bench] Generated in {time.perf_counter() - started:.1f} s", file=sys.stderr)
+    return path
+
+
+def summarize(timings, operations=1):
+    """Result entry from per-call timings in seconds, each call covering `operations` operations"""
+    per_op = sorted(timing / operations for timing in timings)
+    return {
+        "median_ms": statistics.median(per_op) * 1000,
+        "p95_ms": per_op[min(len(per_op) - 1, int(len(per_op) * 0.95))] * 1000,
+        "ops_per_s": len(per_op) / sum(per_op) if sum(per_op) else None,
+        "samples": len(per_op),
+    }
+
+
+def measure(fn, repeat, *args):
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn(*args)
+        timings.append(time.perf_counter() - started)
+    return timings
+
+
+def bench_classifier(nlp_loader):
+    """ai_prioritize_task one description at a time and as one batch (independent of database size)"""
+    rnd = random.Random(SEED)
+    descriptions = [synthetic_description(rnd) for _ in range(CLASSIFY_SAMPLES)]
+    with tempfile.TemporaryDirectory() as scratch:
+        service = TaskService(os.path.join(scratch, "classify.db"), PriorityClassifier(), nlp_loader)
+        try:
+            single = [t for description in descriptions for t in measure(service.ai_prioritize_task, 1, description)]
+            batched = measure(service.ai_prioritize_tasks, 3, descriptions)
+        finally:
+            service.close()
+    return {
+        "ai_prioritize_task": summarize(single),
+        "ai_prioritize_tasks": summarize(batched, len(descriptions)),
+    }
+
+
+def bench_database(path, nlp_loader):
+    service = TaskService(path, PriorityClassifier(), nlp_loader)
+    results = {}
+    try:
+        # refresh_tasks: count + first page, and a page from the middle of the list
+        results["refresh_first_page"] = summarize(measure(
+            lambda: (service.count_tasks(), service.fetch_page(None, PAGE_SIZE)), QUERY_REPEAT))
+        with service.pool.read() as conn:
+            middle = conn.execute(
+                "SELECT priority_rank, due_epoch, id FROM tasks ORDER BY priority_rank, due_epoch, id "
+                "LIMIT 1 OFFSET (SELECT COUNT(*) / 2 FROM tasks)"
+            ).fetchone()
+        results["refresh_deep_page"] = summarize(measure(service.fetch_page, QUERY_REPEAT, middle, PAGE_SIZE))
+        results["check_tasks_scan"] = summarize(measure(service.due_tasks, QUERY_REPEAT, 1, CHECK_TIME))
+        results["search"] = summarize(measure(service.search_tasks, QUERY_REPEAT, "client rev"))
+        feed = changefeed.ChangeFeed(service.latest_change())
+        results["changes_poll_idle"] = summarize(measure(service.poll_changes, QUERY_REPEAT, feed))
+
+        # Single-row writes; the inserted rows are updated and deleted again, so the data set is unchanged
+        rnd = random.Random(SEED)
+        new_tasks = [(f"Bench {i}", synthetic_description(rnd), "2026-06-01") for i in range(WRITE_SAMPLES)]
+        inserted, timings = [], []
+        for task in new_tasks:
+            started = time.perf_counter()
+            inserted.append(service.add_task(*task)[0])
+            timings.append(time.perf_counter() - started)
+        results["insert"] = summarize(timings)
+        results["update"] = summarize([
+            t for task_id in inserted
+            for t in measure(service.update_task, 1, task_id, "Bench updated", "urgent follow-up", "2026-06-02")
+        ])
+        # What another process polling the change log does to pick up the inserts and updates above
+        results["changes_poll"] = summarize(measure(service.poll_changes, 1, feed), WRITE_SAMPLES)
+        results["delete"] = summarize([t for task_id in inserted for t in measure(service.delete_task, 1, task_id)])
+    finally:
+        service.close()
+    return results
+
+
+def store_size(store):
+    """Bytes held by the store: containers, records and the strings and ids they own (shared values once)"""
+    containers = [store._by_id, store._sorted, store._due, store._values, *store._buckets.values()]
+    size = sum(map(sys.getsizeof, containers)) + sum(map(sys.getsizeof, store._values))
+    for record in store._sorted:
+        size += sys.getsizeof(record) + sys.getsizeof(record.id)
+        size += sys.getsizeof(record.title) + sys.getsizeof(record.description)
+    return size
+
+
+def bench_store(path, nlp_loader):
+    """The same reads as bench_database, answered by a loaded TaskStore; returns (results, bytes per task)"""
+    service = TaskService(path, PriorityClassifier(), nlp_loader, store=TaskStore())
+    results = {}
+    try:
+        results["store_load"] = summarize(measure(service.load_store, 1))
+        results["store_first_page"] = summarize(measure(
+            lambda: (service.count_tasks(), service.fetch_page(None, PAGE_SIZE)), QUERY_REPEAT))
+        middle = service.store.page(None, service.count_tasks() // 2 + 1)[-1]
+        results["store_deep_page"] = summarize(measure(service.fetch_page, QUERY_REPEAT, middle[-2:] + middle[:1], PAGE_SIZE))
+        results["store_filtered_page"] = summarize(measure(service.fetch_page, QUERY_REPEAT, None, PAGE_SIZE, "Completed"))
+        results["store_check_tasks_scan"] = summarize(measure(service.due_tasks, QUERY_REPEAT, 1, CHECK_TIME))
+        bytes_per_task = store_size(service.store) / max(service.count_tasks(), 1)
+    finally:
+        service.close()
+    return results, bytes_per_task
+
+
+def bench_plan(path, nlp_loader):
+    """Building the work plan once, then replanning after single-task edits"""
+    service = TaskService(path, PriorityClassifier(), nlp_loader)
+    results = {}
+    try:
+        timings = measure(service.build_plan, 1)
+        results["plan_build"] = summarize(timings)
+        plan = service.build_plan()
+        rnd = random.Random(SEED)
+        task_ids = [entry[1] for entry in plan.plan(WRITE_SAMPLES)]
+        timings = []
+        for task_id in task_ids:
+            due_date = (date(2026, 1, 1) + timedelta(days=rnd.randrange(730))).strftime(task_db.DATE_FORMAT)
+            started = time.perf_counter()
+            plan.update(task_id, "Bench", due_date, "High", rnd.choice((0.5, 2.0, 8.0)))
+            plan.summary()
+            timings.append(time.perf_counter() - started)
+        results["replan_one_task"] = summarize(timings)
+    finally:
+        service.close()
+    return results
+
+
+def bench_rescore(path):
+    """The nightly rescoring: one day later, then back (untimed), so the data set is unchanged"""
+    service = TaskService(path, PriorityClassifier())
+    try:
+        timings = measure(service.rescore_tasks, 1, CHECK_TIME + timedelta(days=1))
+        service.rescore_tasks(CHECK_TIME)
+    finally:
+        service.close()
+    return {"rescore_next_day": summarize(timings)}
+
+
+def bench_startup(path):
+    """Fresh interpreter until the first page is loaded (what the GUI does before showing the list)"""
+    script = STARTUP_SCRIPT.format(path=path, page_size=PAGE_SIZE)
+    here = os.path.dirname(os.path.abspath(__file__))
+    timings = []
+    for _ in range(STARTUP_REPEAT):
+        started = time.perf_counter()
+        subprocess.run([sys.executable, "-c", script], cwd=here, check=True, stdout=subprocess.DEVNULL)
+        timings.append(time.perf_counter() - started)
+    return summarize(timings)
+
+
+def compare(results, baseline, tolerance):
+    """Print changes against the baseline; returns the names of regressed benchmarks"""
+    regressions = []
+    for name, entry in sorted(results["results"].items()):
+        before = baseline.get("results", {}).get(name)
+        if before is None:
+            print(f"  {name:40} {entry['median_ms']:10.3f} ms  (new)", file=sys.stderr)
+            continue
+        change = entry["median_ms"] / before["median_ms"] - 1 if before["median_ms"] else 0.0
+        flag = ""
+        if change > tolerance:
+            flag = "  REGRESSION"
+            regressions.append(name)
+        print(f"  {name:40} {entry['median_ms']:10.3f} ms  {change:+7.1%}{flag}", file=sys.stderr)
+    for name, value in sorted(results.get("memory", {}).items()):
+        before = baseline.get("memory", {}).get(name)
+        if before is None:
+            print(f"  {name:40} {value:10.0f} B   (new)", file=sys.stderr)
+            continue
+        change = value / before - 1 if before else 0.0
+        flag = ""
+        if change > tolerance:
+            flag = "  REGRESSION"
+            regressions.append(name)
+        print(f"  {name:40} {value:10.0f} B   {change:+7.1%}{flag}", file=sys.stderr)
+    return regressions
+
+
+def run(sizes, data_dir, use_model):
+    nlp_loader = ModelLoader()
+    if use_model:
+        nlp_loader.wait()
+    results = bench_classifier(nlp_loader)
+    memory = {}
+    for size in sizes:
+        path = prepare_database(data_dir, size)
+        print(f"[Bench] {size} rows", file=sys.stderr)
+        for name, entry in bench_database(path, nlp_loader).items():
+            results[f"{size}/{name}"] = entry
+        for name, entry in bench_plan(path, nlp_loader).items():
+            results[f"{size}/{name}"] = entry
+        for name, entry in bench_rescore(path).items():
+            results[f"{size}/{name}"] = entry
+        store_results, bytes_per_task = bench_store(path, nlp_loader)
+        for name, entry in store_results.items():
+            results[f"{size}/{name}"] = entry
+        memory[f"{size}/store_bytes_per_task"] = bytes_per_task
+        results[f"{size}/cold_startup"] = bench_startup(path)
+    return {
+        "meta": {
+            "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "python": platform.python_version(),
+            "sqlite": sqlite3.sqlite_version,
+            "platform": platform.platform(),
+            "cpus": os.cpu_count(),
+            "model": nlp_loader.name if nlp_loader.ready else None,
+            "schema_version": task_db.SCHEMA_VERSION,
+            "sizes": list(sizes),
+        },
+        "results": results,
+        "memory": memory,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the task scheduler's hot paths")
+    parser.add_argument("--sizes", type=int, nargs="+", default=list(SIZES), help="task counts (default: %(default)s)")
+    parser.add_argument("--data-dir", default=os.path.join(tempfile.gettempdir(), "task_scheduler_bench"),
+                        help="where generated databases are kept between runs (default: %(default)s)")
+    parser.add_argument("--no-model", action="store_true", help="skip loading SpaCy (keyword tiers only)")
+    parser.add_argument("--output", help="write the JSON results here instead of stdout")
+    parser.add_argument("--baseline", default=BASELINE_PATH, help="results to compare with (default: %(default)s)")
+    parser.add_argument("--save-baseline", action="store_true", help="store these results as the baseline")
+    parser.add_argument("--tolerance", type=float, default=TOLERANCE,
+                        help="allowed slowdown per benchmark before it counts as a regression (default: %(default)s)")
+    args = parser.parse_args(argv)
+
+    os.makedirs(args.data_dir, exist_ok=True)
+    results = run(args.sizes, args.data_dir, not args.no_model)
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+    else:
+        json.dump(results, sys.stdout, indent=2)
+        print()
+
+    if args.save_baseline:
+        with open(args.baseline, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+        print(f"[Bench] Baseline saved to {args.baseline}", file=sys.stderr)
+        return 0
+    if not os.path.exists(args.baseline):
+        print(f"[Bench] No baseline at {args.baseline}; run with --save-baseline to create one", file=sys.stderr)
+        return 0
+    with open(args.baseline, encoding="utf-8") as f:
+        baseline = json.load(f)
+    print(f"[Bench] Compared with {args.baseline} ({baseline['meta'].get('created')}):", file=sys.stderr)
+    for key in ("platform", "cpus", "model", "schema_version"):
+        if baseline["meta"].get(key) != results["meta"][key]:
+            print(f"[Bench] Note: baseline {key} was {baseline['meta'].get(key)!r}, now {results['meta'][key]!r}",
+                  file=sys.stderr)
+    regressions = compare(results, baseline, args.tolerance)
+    if regressions:
+        print(f"[Bench] {len(regressions)} regression(s): {', '.join(regressions)}", file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,104 @@
+import json
+import sys
+import time
+
+from metrics import METRICS
+
+# Log entries older than this are pruned; a consumer that falls further behind reloads everything
+RETENTION_SECONDS = 24 * 3600
+# Most log entries read by one poll; a consumer with more to catch up on polls again right away
+POLL_LIMIT = 5000
+# A consumer holding every task (TaskStore) reloads instead once it is this many entries behind:
+# each applied row is a sorted insert, which past here costs more than one load
+RELOAD_AFTER = 10000
+# Log entries deleted per transaction when pruning
+PRUNE_BATCH_SIZE = 10000
+
+CURRENT_ROWS = """
+    SELECT id, title, description, due_date, priority, status, ai_reason, estimate_hours
+    FROM tasks
+    WHERE id IN (SELECT value FROM json_each(?))
+"""
+
+
+def latest_seq(conn):
+    """Sequence number of the newest change (0 before the first one), also once the log was pruned"""
+    row = conn.execute("SELECT seq FROM sqlite_sequence WHERE name='task_changes'").fetchone()
+    return row[0] if row is not None else 0
+
+
+class ChangeFeed:
+    """One consumer's position in the task_changes log, for "changes since seq" polling
+
+    Triggers log every insert, update and delete of a task, whichever connection or process
+    made it. Sequence numbers are handed out under SQLite's write lock and never reused
+    (AUTOINCREMENT), so a snapshot of the log is always a gapless run and a poll can never
+    miss an entry that commits later with a smaller number.
+
+    poll() coalesces the entries per task and returns each task's current row instead of
+    replaying the entries: a task edited ten times comes back once, and one deleted (or
+    archived) since comes back as a deleted id. Applying a delta is therefore idempotent, so a
+    consumer may see its own writes again or overlap a full load without harm.
+    """
+
+    def __init__(self, seq=0):
+        self.seq = seq
+        self.more = False
+
+    def poll(self, conn, limit=POLL_LIMIT, reload_after=None):
+        """Changes since the last poll as (TASK_COLUMNS rows plus estimate_hours, deleted ids, reset)
+
+        Log and rows are read in one snapshot. reset is True when entries the feed had not
+        seen yet were pruned, or more than reload_after entries are waiting: the feed then
+        moves to the newest entry and the consumer has to reload everything. more is left True
+        when the limit cut the poll short.
+        """
+        started = time.perf_counter()
+        conn.execute("BEGIN")
+        try:
+            latest = latest_seq(conn)
+            changes = conn.execute(
+                "SELECT seq, task_id FROM task_changes WHERE seq > ? ORDER BY seq LIMIT ?", (self.seq, limit)
+            ).fetchall()
+            first = changes[0][0] if changes else latest + 1
+            if first != self.seq + 1 or reload_after is not None and latest - self.seq > reload_after:
+                reason = "were pruned" if first != self.seq + 1 else f"are {latest - self.seq} entries"
+                print(f"[Changes] Changes after {self.seq} {reason}, reloading", file=sys.stderr)
+                self.seq = latest
+                self.more = False
+                METRICS.count("changes reset")
+                return [], [], True
+            task_ids = list(dict.fromkeys(task_id for _, task_id in changes))
+            found = {}
+            if task_ids:
+                found = {row[0]: row for row in conn.execute(CURRENT_ROWS, (json.dumps(task_ids),))}
+        finally:
+            conn.execute("COMMIT")
+        if changes:
+            self.seq = changes[-1][0]
+        self.more = len(changes) == limit
+        METRICS.record("changes poll", time.perf_counter() - started)
+        return ([found[task_id] for task_id in task_ids if task_id in found],
+                [task_id for task_id in task_ids if task_id not in found], False)
+
+
+def prune(pool, retention=RETENTION_SECONDS, batch_size=PRUNE_BATCH_SIZE):
+    """Delete log entries older than retention seconds, batch_size per transaction; returns the count
+
+    Only a prefix of the log is ever removed (everything up to the newest old entry), so what
+    is left stays gapless and a feed still behind it is reset instead of skipping entries.
+    """
+    with pool.read() as conn:
+        first, cutoff = conn.execute(
+            "SELECT MIN(seq), MAX(seq) FROM task_changes WHERE changed_at < CAST(strftime('%s', 'now') AS INTEGER) - ?",
+            (retention,)
+        ).fetchone()
+    pruned = 0
+    if cutoff is None:
+        return pruned
+    for start in range(first, cutoff + 1, batch_size):
+        with pool.write() as conn:
+            pruned += conn.execute("DELETE FROM task_changes WHERE seq <= ?",
+                                   (min(start + batch_size - 1, cutoff),)).rowcount
+    print(f"[Changes] Pruned {pruned} log entries", file=sys.stderr)
+    return pruned
@@ -0,0 +1,644 @@
+"""Synthetic load for the scheduler: realistic task databases and a headless soak test
+
+    python loadgen.py generate soak.db --tasks 1000000
+    python loadgen.py soak soak.db --minutes 60 --writers 4 --rate 50
+    python loadgen.py soak soak.db --minutes 10 --no-model --output soak.jsonl
+
+generate writes tasks the way people keep them: short verb-object titles, descriptions that are
+often empty and sometimes urgent, most due dates in the next few weeks (rarely on a weekend,
+often at a month end), and a history of past tasks that are mostly done.
+
+soak runs the GUI's data paths without Tk (shared pool, task store, DbWorker, change feed
+polling, ReminderEngine and NotificationCenter) while writer threads replay add / modify /
+done / delete traffic and list, search and due reads. Writer 0 goes through the worker like
+GUI edits; the others act as other processes (the CLI, a second window) with their own
+connections, so their writes reach the app through the change log. Every --interval seconds
+a JSON line reports throughput, latency percentiles, reminder lag, memory, open connections
+and WAL size; a summary line follows at the end. The exit code is 1 when an operation failed
+or a connection was left open after shutdown.
+
+The reminder clock starts a minute before midnight, so every soak includes the midnight burst
+of "due today" and "due tomorrow" reminders.
+"""
+import argparse
+import heapq
+import json
+import os
+import random
+import sys
+import threading
+import time
+from datetime import date, datetime, timedelta
+
+import scoring
+import task_db
+from changefeed import ChangeFeed, latest_seq
+from metrics import METRICS, Metrics
+from notifications import NotificationCenter
+from reminders import LEAD_TIMES, ReminderEngine
+from task_ai import ModelLoader, PriorityCache, PriorityClassifier
+from task_service import TaskService
+from task_store import TaskStore
+from workers import DbWorker, UiQueue
+
+SEED = 42
+GENERATE_BATCH_SIZE = 10000
+# Writer threads, and operations per second across all of them (0: as fast as they go)
+WRITERS = 4
+RATE = 50.0
+# Seconds between report lines; the first WARMUP fraction of them is left out of the growth figures
+INTERVAL = 10.0
+WARMUP = 0.1
+# Seconds of simulated time before the reminder clock reaches midnight
+MIDNIGHT_AFTER = 60
+# Harness bookkeeping is bounded so it does not show up in the memory figures: writers edit,
+# complete and delete a random sample of at most MAX_TARGETS pending tasks, and a write's time
+# (for the reminder lag) is kept until its reminder fires or for WRITE_MEMORY seconds
+MAX_TARGETS = 10000
+WRITE_MEMORY = 600
+# As in task_scheduler (not imported: that module needs Tk)
+PAGE_SIZE = 100
+CHANGE_POLL_MS = 1000
+
+# Share of each operation in the replayed traffic
+OPERATION_MIX = {
+    "add": 0.30,
+    "modify": 0.25,
+    "complete": 0.20,
+    "delete": 0.05,
+    "page": 0.10,
+    "search": 0.05,
+    "due": 0.05,
+}
+
+# Task text: a verb and its object for the title; the description adds who, when and sometimes urgency
+ACTIONS = [
+    ("Prepare", ["quarterly report", "sales deck", "budget review", "release notes", "board slides"]),
+    ("Call", ["the client", "the bank", "mom", "the landlord", "the plumber", "the insurance company"]),
+    ("Email", ["the supplier", "HR", "the project team", "the accountant"]),
+    ("Fix", ["login bug", "build pipeline", "printer", "leaking tap", "flaky test"]),
+    ("Book", ["dentist appointment", "flights", "meeting room", "car service", "restaurant"]),
+    ("Pay", ["rent", "electricity bill", "invoice", "credit card", "taxes"]),
+    ("Review", ["pull request", "contract", "design mockups", "interview notes", "expense claims"]),
+    ("Buy", ["groceries", "birthday present", "printer ink", "train tickets"]),
+    ("Renew", ["passport", "gym membership", "domain name", "car insurance"]),
+    ("Plan", ["team offsite", "sprint", "holiday", "move", "weekly menu"]),
+]
+DETAILS = ["before the {when}", "with {who}", "for {who}", "and send a summary to {who}",
+           "as discussed in the {when}", "{verb} {thing}, then check with {who}"]
+PEOPLE = ["Alex", "Sam", "the team", "finance", "the client", "Priya", "Jordan", "management"]
+OCCASIONS = ["weekly sync", "board meeting", "release", "end of the month", "trip", "review"]
+# Phrases with the classifier's High keywords and Medium lemmas (inflected forms need the model)
+URGENT_PREFIXES = ["Urgent:", "Critical -", "Important:", "Hard deadline,"]
+SOON_SUFFIXES = ["needed soon", "team priority", "major item", "one of this week's priorities",
+                 "soonest possible"]
+SEARCH_WORDS = ["report", "client", "invoice", "rent", "review", "flights", "budget", "team", "urg", "pass"]
+
+
+def realistic_description(rnd, verb, thing):
+    roll = rnd.random()
+    if roll < 0.15:
+        return ""
+    detail = rnd.choice(DETAILS).format(who=rnd.choice(PEOPLE), when=rnd.choice(OCCASIONS),
+                                        verb=verb.lower(), thing=thing)
+    if roll < 0.23:
+        return f"{rnd.choice(URGENT_PREFIXES)} {detail}"
+    if roll < 0.35:
+        return f"{detail}, {rnd.choice(SOON_SUFFIXES)}"
+    return detail
+
+
+def realistic_due(rnd, today):
+    """A due date around today: a long tail of past tasks, most in the next weeks, few far out"""
+    roll = rnd.random()
+    if roll < 0.35:
+        offset = -min(int(rnd.expovariate(1 / 60)) + 1, 730)
+    elif roll < 0.75:
+        offset = int(rnd.expovariate(1 / 5))
+    elif roll < 0.95:
+        offset = rnd.randint(14, 90)
+    else:
+        offset = rnd.randint(91, 365)
+    due = today + timedelta(days=offset)
+    if rnd.random() < 0.05:
+        following = (due.replace(day=28) + timedelta(days=4)).replace(day=1)
+        due = following - timedelta(days=1)
+    elif due.weekday() >= 5 and rnd.random() < 0.7:
+        due -= timedelta(days=due.weekday() - 4)
+    return due
+
+
+def realistic_task(rnd, today):
+    """(title, description, due_date, status, completed_at, estimate_hours) of one task"""
+    verb, things = rnd.choice(ACTIONS)
+    thing = rnd.choice(things)
+    due = realistic_due(rnd, today)
+    done = rnd.random() < (0.9 if due < today else 0.08)
+    completed_at = None
+    if done:
+        due_epoch = task_db.date_to_epoch(due.strftime(task_db.DATE_FORMAT))
+        completed_at = due_epoch - rnd.randint(0, 3 * 86400) + rnd.randint(8 * 3600, 18 * 3600)
+        completed_at = min(completed_at, task_db.datetime_to_epoch(datetime.now()))
+    estimate = rnd.choice((0.5, 1.0, 1.0, 2.0, 2.0, 3.0, 4.0, 8.0)) if rnd.random() < 0.4 else None
+    return (f"{verb} {thing}", realistic_description(rnd, verb, thing), due.strftime(task_db.DATE_FORMAT),
+            "Completed" if done else "Pending", completed_at, estimate)
+
+
+def generate(path, count, seed=SEED, progress=None):
+    """Add count realistic tasks to the database at path (created if missing); returns the count
+
+    Rows are classified with the keyword tiers and scored for today, as the app would have.
+    """
+    rnd = random.Random(seed)
+    today = date.today()
+    today_epoch = scoring.today_epoch()
+    pool = task_db.ConnectionPool(path)
+    classifier = PriorityClassifier()
+    try:
+        with pool.write() as conn:
+            task_db.init_schema(conn)
+        written = 0
+        while written < count:
+            tasks = [realistic_task(rnd, today) for _ in range(min(GENERATE_BATCH_SIZE, count - written))]
+            descriptions = [task[1] for task in tasks]
+            features = [scoring.text_features(description) for description in descriptions]
+            scores, reasons = scoring.score_tasks(features, [task_db.date_to_epoch(task[2]) for task in tasks],
+                                                  [task[3] for task in tasks], today_epoch)
+            last_id = pool.insert_tasks([
+                (title, description, due_date, priority, ai_reason, score, feature_bits)
+                for (title, description, due_date, _, _, _), (priority, _), ai_reason, score, feature_bits
+                in zip(tasks, classifier.prioritize_batch(descriptions), reasons, scores.tolist(), features)
+            ])
+            with pool.write() as conn:
+                conn.executemany(
+                    "UPDATE tasks SET status=?, completed_at=?, estimate_hours=? WHERE id=?",
+                    [(status, completed_at, estimate, last_id + i)
+                     for i, (_, _, _, status, completed_at, estimate) in enumerate(tasks, start=1)
+                     if status != "Pending" or estimate is not None]
+                )
+            written += len(tasks)
+            if progress is not None:
+                progress(written)
+        with pool.write() as conn:
+            # Every score above is for today, and no feed has read the change log of a new database yet
+            conn.execute("DELETE FROM score_state")
+            conn.execute("INSERT INTO score_state (day) VALUES (?)", (today_epoch,))
+            conn.execute("DELETE FROM task_changes")
+    finally:
+        pool.close()
+    return written
+
+
+def rss_mb():
+    """Resident memory in MB (Linux); elsewhere the peak from getrusage, or None where neither exists"""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 2 ** 20
+    except (OSError, ValueError, AttributeError):
+        pass
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / 2 ** 20 if sys.platform == "darwin" else peak / 1024
+
+
+def open_files():
+    try:
+        return len(os.listdir("/proc/self/fd"))
+    except OSError:
+        return None
+
+
+def refresh_page(service):
+    """What TaskScheduler.refresh_tasks fetches: the count and the first page"""
+    return service.count_tasks(), service.fetch_page(None, PAGE_SIZE)
+
+
+def poll_changes(service, feed):
+    return service.poll_changes(feed)
+
+
+class HeadlessRoot:
+    """Stand-in for the Tk root: after() callbacks run one at a time on a single "ui" thread
+
+    As in Tk's event loop, a slow callback delays every later one; how late each callback
+    starts is passed to record as "soak ui lag". Like Tk, after() may only be called from the
+    thread that created the root or from a callback, so other threads must go through a UiQueue.
+    """
+
+    def __init__(self, record):
+        self.record = record
+        self._owner = threading.current_thread()
+        self._cond = threading.Condition()
+        self._timers = []
+        self._sequence = 0
+        self._stopped = False
+        self._thread = threading.Thread(target=self._run, name="ui", daemon=True)
+        self._thread.start()
+
+    def after(self, delay_ms, fn, *args):
+        if threading.current_thread() not in (self._owner, self._thread):
+            raise RuntimeError(f"after() called from thread {threading.current_thread().name}")
+        with self._cond:
+            self._sequence += 1
+            heapq.heappush(self._timers, (time.perf_counter() + delay_ms / 1000, self._sequence, fn, args))
+            self._cond.notify()
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while not self._stopped and (not self._timers or self._timers[0][0] > time.perf_counter()):
+                    self._cond.wait(self._timers[0][0] - time.perf_counter() if self._timers else None)
+                if self._stopped:
+                    return
+                due, _, fn, args = heapq.heappop(self._timers)
+            self.record("soak ui lag", time.perf_counter() - due)
+            try:
+                fn(*args)
+            except Exception as e:
+                print(f"[Soak] UI callback failed: {e}", file=sys.stderr)
+
+    def stop(self):
+        with self._cond:
+            self._stopped = True
+            self._cond.notify()
+        self._thread.join()
+
+
+class Soak:
+    """The app's data paths wired as TaskScheduler.init_database does, plus traffic and sampling"""
+
+    def __init__(self, path, writers=WRITERS, rate=RATE, use_model=True, seed=SEED):
+        self.path = path
+        self.writers = writers
+        self.rate = rate
+        self.seed = seed
+        self.window = Metrics()
+        self.root = HeadlessRoot(self.record)
+        self.pool = task_db.ConnectionPool(path)
+        with self.pool.write() as conn:
+            task_db.init_schema(conn)
+        self.nlp_loader = ModelLoader()
+        if use_model:
+            self.nlp_loader.wait()
+        self.priority_cache = PriorityCache(path)
+        self.classifier = PriorityClassifier(self.priority_cache)
+        self.store = TaskStore()
+        service = lambda: TaskService(path, self.classifier, self.nlp_loader, pool=self.pool, store=self.store)
+        self.ui = UiQueue(self.root)
+        self.worker = DbWorker(self.ui, service)
+        self.export_worker = DbWorker(self.ui, service)
+        with self.pool.read() as conn:
+            self.feed = ChangeFeed(latest_seq(conn))
+            self._targets = [row[0] for row in conn.execute(
+                "SELECT id FROM tasks WHERE status='Pending' ORDER BY random() LIMIT ?", (MAX_TARGETS,)
+            )]
+        self._lock = threading.Lock()
+        self._rnd = random.Random(seed)
+        self.export_worker.submit(TaskService.load_store)
+        # Naive epoch seconds like reminders._now_epoch, shifted so midnight comes MIDNIGHT_AFTER seconds in
+        now = task_db.datetime_to_epoch(datetime.now())
+        self._clock_offset = (now // 86400 + 1) * 86400 - MIDNIGHT_AFTER - time.time()
+        self.notifications = NotificationCenter(self.ui, self.on_digest)
+        self.reminders = ReminderEngine(path, self.on_reminder, LEAD_TIMES, clock=self.clock)
+        self._written_at = {}
+        self._stopping = threading.Event()
+        self._threads = []
+        self.samples = []
+
+    def clock(self):
+        return time.time() + self._clock_offset
+
+    def record(self, name, seconds):
+        METRICS.record(name, seconds)
+        self.window.record(name, seconds)
+
+    def count(self, name, n=1):
+        METRICS.count(name, n)
+        self.window.count(name, n)
+
+    def start(self):
+        self.started = time.perf_counter()
+        self.started_clock = self.clock()
+        self.reminders.start()
+        self.root.after(CHANGE_POLL_MS, self.poll_changes)
+        for number in range(self.writers):
+            thread = threading.Thread(target=self._write, args=(number,), name=f"writer-{number}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def stop(self):
+        self._stopping.set()
+        for thread in self._threads:
+            thread.join()
+        self.worker.shutdown()
+        self.export_worker.shutdown()
+        self.reminders.stop()
+        self.root.stop()
+        self.pool.close()
+        self.priority_cache.close()
+
+    # Reminders and digests, as TaskScheduler.on_reminder posts them
+
+    def on_reminder(self, task_id, title, due_epoch, lead):
+        """Lag: from when the reminder could first fire (its time, the write that armed it, or the start) to now
+
+        The write's time only matters for this first reminder: later ones fire after it anyway.
+        """
+        now = self.clock()
+        with self._lock:
+            written = self._written_at.pop(task_id, None)
+        since = max(due_epoch - lead, written or self.started_clock)
+        self.record("soak reminder lag", max(now - since, 0))
+        if now >= due_epoch:
+            self.notifications.post(task_id, f"'{title}' is due or overdue!")
+        else:
+            self.notifications.post(task_id, f"'{title}' is due on {task_db.epoch_to_date(due_epoch)}!")
+
+    def on_digest(self, count, lines):
+        self.count("soak digest reminders", count)
+
+    # Change feed, as TaskScheduler.poll_changes applies it
+
+    def poll_changes(self):
+        if not self._stopping.is_set():
+            self.worker.submit(poll_changes, self.feed, on_done=self.on_changes,
+                               on_error=lambda error: self.root.after(CHANGE_POLL_MS, self.poll_changes))
+
+    def on_changes(self, result):
+        rows, deleted_ids, reset = result
+        self.root.after(0 if self.feed.more else CHANGE_POLL_MS, self.poll_changes)
+        if reset:
+            if not self._stopping.is_set():
+                self.export_worker.submit(self._rebuild_reminders)
+            return
+        for row in rows:
+            if row[5] == "Pending":
+                self.reminders.schedule(row[0], row[1], row[3])
+            else:
+                self.reminders.cancel(row[0])
+        for task_id in deleted_ids:
+            self.reminders.cancel(task_id)
+        self.count("soak changes applied", len(rows) + len(deleted_ids))
+
+    def _rebuild_reminders(self, service):
+        with service.pool.read() as conn:
+            self.reminders.rebuild(conn)
+
+    # Traffic
+
+    def _pick(self, rnd, remove):
+        with self._lock:
+            if not self._targets:
+                return None
+            index = rnd.randrange(len(self._targets))
+            task_id = self._targets[index]
+            if remove:
+                self._targets[index] = self._targets[-1]
+                self._targets.pop()
+            return task_id
+
+    def _operation(self, rnd, op):
+        """(TaskService method, args) for one operation, or None when there is no task to act on"""
+        if op in ("add", "modify"):
+            title, description, due_date, _, _, estimate = realistic_task(rnd, date.today())
+            if op == "add":
+                return TaskService.add_task, (title, description, due_date, estimate)
+            task_id = self._pick(rnd, remove=False)
+            return task_id and (TaskService.update_task, (task_id, title, description, due_date, estimate))
+        if op in ("complete", "delete"):
+            task_id = self._pick(rnd, remove=True)
+            return task_id and (TaskService.complete_task if op == "complete" else TaskService.delete_task, (task_id,))
+        if op == "page":
+            return refresh_page, ()
+        if op == "search":
+            return TaskService.search_tasks, (rnd.choice(SEARCH_WORDS),)
+        return TaskService.due_tasks, (1,)
+
+    def _written(self, op, args, result, at):
+        """Remember what the write armed, for the pending pool and the reminder lag
+
+        Called before the reminder can be armed (at is when the write started), so the lag of
+        a reminder the write made due at once is measured from the write.
+        """
+        if op not in ("add", "modify", "complete", "delete"):
+            return
+        task_id = int(result[0] if op == "add" else args[0])
+        with self._lock:
+            # Re-inserted, so the dict stays in write order for _forget_writes
+            self._written_at.pop(task_id, None)
+            if op in ("add", "modify") and result is not None:
+                self._written_at[task_id] = at
+            if op != "add":
+                return
+            if len(self._targets) < MAX_TARGETS:
+                self._targets.append(task_id)
+            else:
+                self._targets[self._rnd.randrange(MAX_TARGETS)] = task_id
+
+    def _forget_writes(self):
+        """Drop write times older than WRITE_MEMORY (their reminders were not due yet)"""
+        cutoff = self.clock() - WRITE_MEMORY
+        with self._lock:
+            while self._written_at:
+                task_id = next(iter(self._written_at))
+                if self._written_at[task_id] >= cutoff:
+                    break
+                del self._written_at[task_id]
+
+    def _apply_own(self, op, args, result, at):
+        """On the ui thread, what the GUI does after its own edit (on_task_added and friends)"""
+        self._written(op, args, result, at)
+        if op in ("add", "modify"):
+            if result is not None and result[5] == "Pending":
+                self.reminders.schedule(result[0], result[1], result[3])
+        elif op in ("complete", "delete"):
+            self.reminders.cancel(args[0])
+
+    def _write(self, number):
+        rnd = random.Random(self.seed + number)
+        operations, weights = list(OPERATION_MIX), list(OPERATION_MIX.values())
+        # Writer 0 is the app itself; the others have their own connections, like separate processes
+        service = None if number == 0 else TaskService(self.path, nlp_loader=self.nlp_loader)
+        next_at = time.perf_counter()
+        try:
+            while not self._stopping.is_set():
+                if self.rate > 0:
+                    next_at += rnd.expovariate(self.rate / self.writers)
+                    delay = next_at - time.perf_counter()
+                    if delay > 0 and self._stopping.wait(delay):
+                        break
+                op = rnd.choices(operations, weights)[0]
+                call = self._operation(rnd, op)
+                if not call:
+                    continue
+                method, args = call
+                started = time.perf_counter()
+                at = self.clock()
+                try:
+                    if service is None:
+                        own = lambda result, op=op, args=args, at=at: self._apply_own(op, args, result, at)
+                        self.worker.submit(method, *args, on_done=own).result()
+                    else:
+                        self._written(op, args, method(service, *args), at)
+                except Exception as e:
+                    self.count("soak errors")
+                    print(f"[Soak] {op} failed: {e}", file=sys.stderr)
+                    continue
+                self.record(f"soak op {op}", time.perf_counter() - started)
+        finally:
+            if service is not None:
+                service.close()
+
+    # Sampling
+
+    def sample(self):
+        """One report line: this interval's throughput and latencies, and the current resource use"""
+        self._forget_writes()
+        window, self.window = self.window, Metrics()
+        snapshot = window.snapshot()
+        timers, counters = snapshot["timers"], snapshot["counters"]
+        elapsed = time.perf_counter() - self.started
+        since = self.samples[-1]["elapsed_s"] if self.samples else 0.0
+        ops = sum(timer["count"] for name, timer in timers.items() if name.startswith("soak op "))
+        lag = timers.get("soak reminder lag", {})
+        with self.pool.read() as conn:
+            behind = latest_seq(conn) - self.feed.seq
+        wal = self.path + "-wal"
+        reminders = self.reminders.stats()
+        sample = {
+            "elapsed_s": round(elapsed, 1),
+            "ops": ops,
+            "ops_per_s": round(ops / max(elapsed - since, 1e-9), 1),
+            "errors": counters.get("soak errors", 0),
+            "latency_ms": {name[len("soak op "):]: {key[:-3]: round(timer[key], 3) for key in ("p50_ms", "p95_ms", "p99_ms", "max_ms")}
+                           for name, timer in timers.items() if name.startswith("soak op ")},
+            "reminders": lag.get("count", 0),
+            "reminder_lag_ms": {key[:-3]: round(lag[key], 1) for key in ("p50_ms", "p95_ms", "max_ms")} if lag else None,
+            "ui_lag_p95_ms": round(timers["soak ui lag"]["p95_ms"], 3) if "soak ui lag" in timers else None,
+            "changes_applied": counters.get("soak changes applied", 0),
+            "changes_behind": behind,
+            "rss_mb": rss_mb(),
+            "python_blocks": sys.getallocatedblocks(),
+            "open_connections": task_db.open_connections(),
+            "open_files": open_files(),
+            "wal_mb": round(os.path.getsize(wal) / 2 ** 20, 2) if os.path.exists(wal) else 0.0,
+            "tasks": self.store.count() if self.store.loaded else None,
+            "armed_reminders": reminders["tasks"],
+            "fired_tasks": reminders["fired_tasks"],
+            # The harness's own state, bounded by MAX_TARGETS and WRITE_MEMORY
+            "harness_entries": len(self._targets) + len(self._written_at),
+        }
+        self.samples.append(sample)
+        add = sample["latency_ms"].get("add", {})
+        print(f"[Soak] {elapsed:.0f} s: {ops} ops ({sample['ops_per_s']:.0f}/s), add p95 {add.get('p95', 0):.1f} ms, "
+              f"{sample['reminders']} reminders, {sample['changes_behind']} changes behind, "
+              f"rss {sample['rss_mb'] or 0:.0f} MB, {sample['open_connections']} connections, "
+              f"WAL {sample['wal_mb']:.1f} MB", file=sys.stderr)
+        return sample
+
+    def summary(self, leaked):
+        """Totals over the whole run, growth after the warmup, and the connections left open"""
+        snapshot = METRICS.snapshot()
+        timers = snapshot["timers"]
+        steady = self.samples[int(len(self.samples) * WARMUP):] or self.samples
+        hours = (steady[-1]["elapsed_s"] - steady[0]["elapsed_s"]) / 3600 if len(steady) > 1 else 0
+        growth = {}
+        for key in ("rss_mb", "python_blocks", "open_connections", "open_files", "wal_mb", "armed_reminders",
+                    "fired_tasks", "harness_entries"):
+            first, last = steady[0][key] if steady else None, steady[-1][key] if steady else None
+            if first is None or last is None:
+                continue
+            growth[key] = {"first": first, "last": last, "per_hour": round((last - first) / hours, 2) if hours else None}
+        pick = lambda timer: {key[:-3]: round(timer[key], 3) for key in ("p50_ms", "p95_ms", "p99_ms", "max_ms")}
+        return {
+            "summary": True,
+            "duration_s": round(time.perf_counter() - self.started, 1),
+            "ops": sum(timer["count"] for name, timer in timers.items() if name.startswith("soak op ")),
+            "errors": snapshot["counters"].get("soak errors", 0),
+            "latency_ms": {name[len("soak op "):]: pick(timer) for name, timer in timers.items() if name.startswith("soak op ")},
+            "queries_ms": {name[len("db "):]: dict(pick(timer), count=timer["count"])
+                           for name, timer in timers.items() if name.startswith("db ")},
+            "reminders": timers.get("soak reminder lag", {}).get("count", 0),
+            "reminder_lag_ms": pick(timers["soak reminder lag"]) if "soak reminder lag" in timers else None,
+            "growth": growth,
+            "leaked_connections": leaked,
+        }
+
+
+def soak(path, minutes, writers=WRITERS, rate=RATE, interval=INTERVAL, use_model=True, output=None, seed=SEED):
+    """Run the soak for minutes, writing JSON lines to output (a file object); returns the summary"""
+    baseline = task_db.open_connections()
+    run = Soak(path, writers, rate, use_model, seed)
+    print(f"[Soak] {writers} writers at {rate or 'max'} ops/s for {minutes:g} min on {path}", file=sys.stderr)
+    run.start()
+    deadline = run.started + minutes * 60
+    next_sample = run.started + interval
+    try:
+        while (now := time.perf_counter()) < deadline:
+            time.sleep(max(min(next_sample, deadline) - now, 0))
+            if time.perf_counter() >= next_sample:
+                line = run.sample()
+                if output is not None:
+                    output.write(json.dumps(line) + "\n")
+                    output.flush()
+                next_sample += interval
+    except KeyboardInterrupt:
+        print("[Soak] Interrupted, stopping", file=sys.stderr)
+    run.stop()
+    summary = run.summary(task_db.open_connections() - baseline)
+    if output is not None:
+        output.write(json.dumps(summary) + "\n")
+    return summary
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Generate realistic task databases and soak-test the scheduler")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    generator = commands.add_parser("generate", help="add realistic tasks to a database (created if missing)")
+    generator.add_argument("path")
+    generator.add_argument("--tasks", type=int, default=100000, help="tasks to add (default: %(default)s)")
+    generator.add_argument("--seed", type=int, default=SEED)
+
+    soaker = commands.add_parser("soak", help="replay concurrent traffic against the app's data paths, headless")
+    soaker.add_argument("path", help="database to run against (it is modified; generate one first)")
+    soaker.add_argument("--minutes", type=float, default=10.0, help="how long to run (default: %(default)s)")
+    soaker.add_argument("--writers", type=int, default=WRITERS, help="concurrent writer threads (default: %(default)s)")
+    soaker.add_argument("--rate", type=float, default=RATE,
+                        help="operations per second across all writers, 0 for no limit (default: %(default)s)")
+    soaker.add_argument("--interval", type=float, default=INTERVAL, help="seconds between report lines (default: %(default)s)")
+    soaker.add_argument("--output", help="write the JSON lines here instead of stdout")
+    soaker.add_argument("--no-model", action="store_true", help="skip loading SpaCy (keyword tiers only)")
+    soaker.add_argument("--seed", type=int, default=SEED)
+    args = parser.parse_args(argv)
+
+    if args.command == "generate":
+        started = time.perf_counter()
+        progress = lambda written: print(f"\r{written}/{args.tasks} tasks...", end="", file=sys.stderr, flush=True)
+        written = generate(args.path, args.tasks, args.seed, progress)
+        print(file=sys.stderr)
+        print(f"Generated {written} tasks in {args.path} in {time.perf_counter() - started:.1f} s")
+        return 0
+
+    if not os.path.exists(args.path):
+        print(f"No database at {args.path}; create one with: python loadgen.py generate {args.path}", file=sys.stderr)
+        return 2
+    if args.writers < 1:
+        print("Error: --writers must be at least 1", file=sys.stderr)
+        return 2
+    output = open(args.output, "w", encoding="utf-8") if args.output else sys.stdout
+    try:
+        summary = soak(args.path, args.minutes, args.writers, args.rate, args.interval, not args.no_model, output, args.seed)
+    finally:
+        if args.output:
+            output.close()
+    print(f"[Soak] {summary['ops']} operations, {summary['errors']} errors, {summary['reminders']} reminders, "
+          f"{summary['leaked_connections']} connections left open", file=sys.stderr)
+    return 1 if summary["errors"] or summary["leaked_connections"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,217 @@
+import json
+import os
+import sys
+import threading
+import time
+from bisect import bisect_left
+from collections import Counter
+
+# Histogram bucket upper bounds in seconds: doubling from 10 µs to ~168 s, plus an overflow bucket
+BUCKET_BOUNDS = tuple(0.00001 * 2 ** i for i in range(25))
+# Seconds between periodic JSON dumps
+DUMP_INTERVAL = 60
+# Seconds between profiler samples
+PROFILE_INTERVAL = 0.005
+
+
+class Histogram:
+    """Latency histogram with fixed log-scale buckets (constant memory, O(log buckets) per sample)"""
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.buckets = [0] * (len(BUCKET_BOUNDS) + 1)
+
+    def add(self, seconds):
+        self.count += 1
+        self.total += seconds
+        if seconds > self.max:
+            self.max = seconds
+        self.buckets[bisect_left(BUCKET_BOUNDS, seconds)] += 1
+
+    def percentile(self, fraction):
+        """Upper bound of the bucket that holds the given fraction of samples (capped at the max)"""
+        rank = fraction * self.count
+        seen = 0
+        for bound, count in zip(BUCKET_BOUNDS, self.buckets):
+            seen += count
+            if count and seen >= rank:
+                return min(bound, self.max)
+        return self.max
+
+    def summary(self):
+        return {
+            "count": self.count,
+            "total_ms": self.total * 1000,
+            "mean_ms": self.total / self.count * 1000 if self.count else 0.0,
+            "p50_ms": self.percentile(0.5) * 1000,
+            "p95_ms": self.percentile(0.95) * 1000,
+            "p99_ms": self.percentile(0.99) * 1000,
+            "max_ms": self.max * 1000,
+        }
+
+
+class Metrics:
+    """Named latency histograms and counters, safe to update from any thread
+
+    Recording a sample is a perf_counter pair plus one locked dict lookup (a microsecond or two),
+    so it stays on for every statement and call it measures.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.histograms = {}
+        self.counters = Counter()
+        self.sources = {}
+        self.started = time.time()
+        self._dump_stop = None
+
+    def record(self, name, seconds):
+        with self._lock:
+            histogram = self.histograms.get(name)
+            if histogram is None:
+                histogram = self.histograms[name] = Histogram()
+            histogram.add(seconds)
+
+    def count(self, name, n=1):
+        with self._lock:
+            self.counters[name] += n
+
+    def add_source(self, prefix, fn):
+        """Include fn()'s {key: number} in every snapshot's counters, as "prefix key"
+
+        For counts a component already keeps (classifier tiers, cache hits), so the hot path
+        does not pay for counting twice.
+        """
+        self.sources[prefix] = fn
+
+    def reset(self):
+        with self._lock:
+            self.histograms = {}
+            self.counters = Counter()
+            self.started = time.time()
+
+    def snapshot(self):
+        with self._lock:
+            timers = {name: histogram.summary() for name, histogram in sorted(self.histograms.items())}
+            counters = dict(self.counters)
+        for prefix, fn in list(self.sources.items()):
+            counters.update((f"{prefix} {key}", value) for key, value in fn().items())
+        counters = dict(sorted(counters.items()))
+        return {
+            "time": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "uptime_s": time.time() - self.started,
+            "timers": timers,
+            "counters": counters,
+        }
+
+    def dump(self, path, extra=None):
+        """Write a snapshot as JSON; the file is replaced atomically so readers never see half of it"""
+        snapshot = self.snapshot()
+        if extra:
+            snapshot.update(extra)
+        partial = path + ".tmp"
+        with open(partial, "w", encoding="utf-8") as f:
+            json.dump(snapshot, f, indent=2)
+        os.replace(partial, path)
+
+    def start_dump(self, path, interval=DUMP_INTERVAL):
+        """Dump to path every interval seconds (and once more on stop_dump) from a daemon thread"""
+        self.stop_dump()
+        stop = self._dump_stop = threading.Event()
+
+        def run():
+            while not stop.wait(interval):
+                try:
+                    self.dump(path)
+                except OSError as e:
+                    print(f"[Metrics] Could not write {path}: {e}", file=sys.stderr)
+            self.dump(path)
+
+        self._dump_thread = threading.Thread(target=run, name="metrics-dump", daemon=True)
+        self._dump_thread.start()
+
+    def stop_dump(self):
+        if self._dump_stop is not None:
+            self._dump_stop.set()
+            self._dump_thread.join()
+            self._dump_stop = None
+
+
+class SamplingProfiler:
+    """Opt-in statistical profiler: a thread that samples every other thread's stack
+
+    Nothing runs while it is stopped. When started it wakes every interval seconds and records
+    each thread's call stack (file:function frames, thread name at the root), which is cheap
+    enough to leave on while reproducing a slowdown.
+    """
+
+    def __init__(self, interval=PROFILE_INTERVAL):
+        self.interval = interval
+        self.stacks = Counter()
+        self.sample_count = 0
+        self._stop = None
+        self._thread = None
+
+    @property
+    def running(self):
+        return self._thread is not None
+
+    def start(self):
+        if self._thread is not None:
+            return
+        self.stacks = Counter()
+        self.sample_count = 0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="profiler", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        if self._thread is None:
+            return
+        self._stop.set()
+        self._thread.join()
+        self._thread = None
+
+    def _run(self):
+        me = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            names = {thread.ident: thread.name for thread in threading.enumerate()}
+            for ident, frame in sys._current_frames().items():
+                if ident == me:
+                    continue
+                stack = []
+                while frame is not None:
+                    code = frame.f_code
+                    stack.append(f"{os.path.basename(code.co_filename)}:{code.co_name}")
+                    frame = frame.f_back
+                stack.append(names.get(ident, str(ident)))
+                self.stacks[tuple(reversed(stack))] += 1
+            self.sample_count += 1
+
+    def report(self, top=20):
+        """[(frame, self samples, total samples)] for the frames seen most often on top of a stack"""
+        own, total = Counter(), Counter()
+        for stack, count in self.stacks.items():
+            own[stack[-1]] += count
+            for frame in set(stack[1:]):
+                total[frame] += count
+        return [(frame, count, total[frame]) for frame, count in own.most_common(top)]
+
+    def write_folded(self, path):
+        """Collapsed stacks ("thread;frame;frame count"), the input format of flamegraph tools"""
+        with open(path, "w", encoding="utf-8") as f:
+            for stack, count in self.stacks.most_common():
+                f.write(f"{';'.join(stack)} {count}\n")
+
+    def print_report(self, top=20, file=None):
+        file = file or sys.stdout
+        print(f"\n=== Profile: {self.sample_count} samples every {self.interval * 1000:.0f} ms ===", file=file)
+        for frame, own, total in self.report(top):
+            print(f"{own:8} {total:8}  {frame}", file=file)
+        print("=================\n", file=file)
+
+
+METRICS = Metrics()
+PROFILER = SamplingProfiler()
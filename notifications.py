@@ -0,0 +1,138 @@
+import threading
+import time
+
+from metrics import METRICS
+
+# Seconds reminders are collected before they are shown together
+DIGEST_WINDOW = 2.0
+# Least seconds between two digests
+MIN_INTERVAL = 30.0
+# Reminders listed in one digest; the rest are only counted
+MAX_DIGEST_LINES = 8
+# Distinct reminders held between digests; past it new ones are dropped and counted
+MAX_PENDING = 1000
+# Seconds before the same reminder for the same task is shown again
+REPEAT_AFTER = 12 * 3600
+# Milliseconds a toast stays up unless clicked away
+TOAST_MS = 15000
+
+
+class NotificationCenter:
+    """Coalesces reminders from any thread into rate-limited digests shown on the Tk thread
+
+    post() only touches a dict under a lock: a reminder replaces any earlier one for the same task
+    still waiting, and one already shown within REPEAT_AFTER is dropped. The first reminder of a
+    window schedules a single call through ui (a workers.UiQueue, as post() runs on the reminder
+    thread), no sooner than MIN_INTERVAL after the previous digest, which hands everything
+    collected to show(count, lines). So however many reminders arrive, the UI thread runs one
+    callback and draws at most MAX_DIGEST_LINES lines per digest.
+    """
+
+    def __init__(self, ui, show, window=DIGEST_WINDOW, min_interval=MIN_INTERVAL,
+                 max_lines=MAX_DIGEST_LINES, max_pending=MAX_PENDING, repeat_after=REPEAT_AFTER,
+                 clock=time.monotonic):
+        self.ui = ui
+        self.show = show
+        self.window = window
+        self.min_interval = min_interval
+        self.max_lines = max_lines
+        self.max_pending = max_pending
+        self.repeat_after = repeat_after
+        self.clock = clock
+        self._lock = threading.Lock()
+        self._pending = {}
+        self._shown = {}
+        self._dropped = 0
+        self._scheduled = False
+        self._last_digest = float("-inf")
+
+    def post(self, key, message):
+        """Queue message about key (a task id); safe to call from any thread"""
+        now = self.clock()
+        with self._lock:
+            shown_at = self._shown.get((key, message))
+            if shown_at is not None and now - shown_at < self.repeat_after:
+                METRICS.count("notify repeat suppressed")
+                return
+            if key not in self._pending and len(self._pending) >= self.max_pending:
+                self._dropped += 1
+                METRICS.count("notify dropped")
+                return
+            self._pending.pop(key, None)  # an updated reminder moves to the end, the digest is in arrival order
+            self._pending[key] = message
+            METRICS.count("notify posted")
+            if self._scheduled:
+                return
+            self._scheduled = True
+            delay = max(self.window, self._last_digest + self.min_interval - now)
+        self.ui.after(int(delay * 1000), self._flush)
+
+    def _flush(self):
+        started = time.perf_counter()
+        now = self.clock()
+        with self._lock:
+            items = list(self._pending.items())
+            dropped = self._dropped
+            self._pending = {}
+            self._dropped = 0
+            self._scheduled = False
+            self._last_digest = now
+            self._shown = {shown: at for shown, at in self._shown.items() if now - at < self.repeat_after}
+            for item in items:
+                self._shown[item] = now
+        if items:
+            self.show(len(items) + dropped, [message for _, message in items[:self.max_lines]])
+            METRICS.count("notify digests")
+        METRICS.record("ui notify digest", time.perf_counter() - started)
+
+
+class Toast:
+    """One non-modal, borderless window in the bottom-right corner, reused for every digest
+
+    A new digest replaces the text of a toast still on screen instead of stacking another one.
+    Click it to dismiss; otherwise it hides itself after TOAST_MS.
+    """
+
+    def __init__(self, root, title="Task Reminder", duration=TOAST_MS):
+        self.root = root
+        self.title = title
+        self.duration = duration
+        self.window = None
+        self._hide_after = None
+
+    def _build(self):
+        import ttkbootstrap as tb  # only the toast needs Tk; NotificationCenter also runs headless (loadgen.py)
+        window = self.window = tb.Toplevel(self.root)
+        window.overrideredirect(True)
+        window.attributes("-topmost", True)
+        frame = tb.Frame(window, padding=12, bootstyle="dark")
+        frame.pack(fill="both", expand=True)
+        self.heading = tb.Label(frame, font=("Segoe UI", 11, "bold"), bootstyle="inverse-dark")
+        self.heading.pack(anchor="w")
+        self.body = tb.Label(frame, font=("Segoe UI", 10), justify="left", wraplength=360, bootstyle="inverse-dark")
+        self.body.pack(anchor="w", pady=(6, 0))
+        for widget in (window, frame, self.heading, self.body):
+            widget.bind("<Button-1>", lambda event: self.hide())
+
+    def show(self, count, lines):
+        if self.window is None or not self.window.winfo_exists():
+            self._build()
+        self.heading.configure(text=self.title if count == 1 else f"{self.title}: {count} tasks")
+        more = count - len(lines)
+        self.body.configure(text="\n".join(lines + ([f"...and {more} more"] if more else [])))
+        window = self.window
+        window.update_idletasks()
+        x = window.winfo_screenwidth() - window.winfo_reqwidth() - 20
+        y = window.winfo_screenheight() - window.winfo_reqheight() - 60
+        window.geometry(f"+{x}+{y}")
+        window.deiconify()
+        if self._hide_after is not None:
+            self.root.after_cancel(self._hide_after)
+        self._hide_after = self.root.after(self.duration, self.hide)
+
+    def hide(self):
+        if self._hide_after is not None:
+            self.root.after_cancel(self._hide_after)
+            self._hide_after = None
+        if self.window is not None and self.window.winfo_exists():
+            self.window.withdraw()
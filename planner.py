@@ -0,0 +1,215 @@
+from bisect import bisect_left
+from datetime import datetime
+from functools import lru_cache
+
+import task_db
+
+# Work hours available per day
+DAILY_CAPACITY = 8.0
+# Hours assumed for a task without an estimate
+DEFAULT_ESTIMATE = 1.0
+# Orderings: earliest deadline first, or least slack per unit of priority weight first
+ORDERS = ("edf", "weighted")
+PRIORITY_WEIGHTS = {"High": 4.0, "Medium": 2.0, "Low": 1.0}
+# Target tasks per block; a block is split at twice this size
+BLOCK_SIZE = 256
+# Slack below this (hours) counts as a miss, so rounding never flags an exact fit
+EPSILON = 1e-9
+
+
+def day_of(epoch):
+    return epoch // 86400
+
+
+@lru_cache(maxsize=4096)
+def date_of(day):
+    return task_db.epoch_to_date(day * 86400)
+
+
+class PlanTask:
+    __slots__ = ("id", "title", "due_day", "priority", "hours", "budget", "key")
+
+    def __init__(self, task_id, title, due_day, priority, hours, budget, key):
+        self.id = task_id
+        self.title = title
+        self.due_day = due_day
+        self.priority = priority
+        self.hours = hours
+        self.budget = budget
+        self.key = key
+
+
+class Block:
+    """A run of consecutive plan entries with its total hours and smallest margin
+
+    margin = budget - hours done within the block up to and including the task. A task is late
+    when its margin is below the hours of all earlier blocks, so a block whose smallest margin
+    is not below that offset has no late task and is skipped without looking inside, and the
+    sorted margins give the number of late tasks in the block with one bisect.
+    """
+
+    __slots__ = ("keys", "tasks", "total", "margins")
+
+    def __init__(self, tasks):
+        self.tasks = tasks
+        self.keys = [task.key for task in tasks]
+        self.refresh()
+
+    def refresh(self):
+        done = 0.0
+        margins = []
+        for task in self.tasks:
+            done += task.hours
+            margins.append(task.budget - done)
+        margins.sort()
+        self.total = done
+        self.margins = margins
+
+    def late_count(self, offset):
+        return bisect_left(self.margins, offset - EPSILON)
+
+
+class Planner:
+    """Orders pending tasks into a work plan at a daily capacity and reports deadline misses
+
+    Work starts at the beginning of `today` and runs capacity hours a day in plan order, so a
+    task's budget is the capacity from today through its due date and it is late when the work
+    before and including it exceeds that. With "edf" (earliest deadline first, higher priority
+    first on the same day) the plan has a late task only when no order fits every deadline.
+    "weighted" orders by slack (budget minus own hours) divided by the priority weight, so
+    High tasks go first unless a Low one is close to its deadline.
+
+    The plan is kept in sorted blocks of about BLOCK_SIZE tasks with their hour totals, so
+    update() and remove() re-sort and re-sum one block instead of the whole plan, and late()
+    only opens blocks that can contain a miss.
+    """
+
+    def __init__(self, capacity=DAILY_CAPACITY, order="edf", today=None, default_estimate=DEFAULT_ESTIMATE):
+        if capacity <= 0:
+            raise ValueError("Daily capacity must be a positive number of hours!")
+        if order not in ORDERS:
+            raise ValueError(f"Unknown plan order '{order}'")
+        self.capacity = capacity
+        self.order = order
+        self.today = day_of(task_db.datetime_to_epoch(datetime.now())) if today is None else today
+        self.default_estimate = default_estimate
+        self._tasks = {}
+        self._blocks = []
+        self._last_keys = []
+
+    def _task(self, task_id, title, due_epoch, priority, hours):
+        task_id = int(task_id)
+        due_day = day_of(due_epoch)
+        hours = self.default_estimate if hours is None else hours
+        budget = self.capacity * (due_day - self.today + 1)
+        weight = PRIORITY_WEIGHTS.get(priority, 1.0)
+        if self.order == "edf":
+            key = (due_day, -weight, task_id)
+        else:
+            slack = budget - hours
+            key = (slack / weight if slack >= 0 else slack * weight, due_day, task_id)
+        return PlanTask(task_id, title, due_day, priority, hours, budget, key)
+
+    def load(self, rows):
+        """Replace the plan with (id, title, due_epoch, priority, estimate_hours) rows of pending tasks"""
+        tasks = sorted((self._task(*row) for row in rows if row[2] is not None), key=lambda task: task.key)
+        self._tasks = {task.id: task for task in tasks}
+        self._blocks = [Block(tasks[i:i + BLOCK_SIZE]) for i in range(0, len(tasks), BLOCK_SIZE)]
+        self._last_keys = [block.keys[-1] for block in self._blocks]
+
+    def __len__(self):
+        return len(self._tasks)
+
+    def _find_block(self, key):
+        return min(bisect_left(self._last_keys, key), len(self._blocks) - 1)
+
+    def update(self, task_id, title, due_date, priority, hours):
+        """Add or change one task (e.g. after an edit); only its old and new blocks are recomputed
+
+        hours=None keeps the hours already planned for the task (DEFAULT_ESTIMATE for a new one).
+        """
+        old = self._tasks.get(int(task_id))
+        if hours is None and old is not None:
+            hours = old.hours
+        self.remove(task_id)
+        task = self._task(task_id, title, task_db.date_to_epoch(due_date), priority, hours)
+        self._tasks[task.id] = task
+        if not self._blocks:
+            self._blocks.append(Block([task]))
+            self._last_keys.append(task.key)
+            return
+        index = self._find_block(task.key)
+        block = self._blocks[index]
+        position = bisect_left(block.keys, task.key)
+        block.keys.insert(position, task.key)
+        block.tasks.insert(position, task)
+        if len(block.tasks) >= 2 * BLOCK_SIZE:
+            self._blocks[index:index + 1] = [Block(block.tasks[:BLOCK_SIZE]), Block(block.tasks[BLOCK_SIZE:])]
+            self._last_keys[index:index + 1] = [b.keys[-1] for b in self._blocks[index:index + 2]]
+        else:
+            block.refresh()
+            self._last_keys[index] = block.keys[-1]
+
+    def remove(self, task_id):
+        """Drop a task that was completed or deleted (no-op for tasks not in the plan)"""
+        task = self._tasks.pop(int(task_id), None)
+        if task is None:
+            return
+        index = self._find_block(task.key)
+        block = self._blocks[index]
+        position = bisect_left(block.keys, task.key)
+        del block.keys[position]
+        del block.tasks[position]
+        if block.tasks:
+            block.refresh()
+            self._last_keys[index] = block.keys[-1]
+        else:
+            del self._blocks[index]
+            del self._last_keys[index]
+
+    def _entry(self, position, task, finish):
+        finish_day = self.today + max(int(-(-finish // self.capacity)) - 1, 0)
+        return (position, task.id, task.title, date_of(task.due_day), task.priority,
+                task.hours, date_of(finish_day), task.budget - finish)
+
+    def plan(self, limit=None):
+        """Plan entries in work order: (position, id, title, due_date, priority, hours, finish_date, slack_hours)
+
+        A negative slack is the number of hours the task will be late.
+        """
+        entries = []
+        done = 0.0
+        for block in self._blocks:
+            for task in block.tasks:
+                if limit is not None and len(entries) >= limit:
+                    return entries
+                done += task.hours
+                entries.append(self._entry(len(entries) + 1, task, done))
+        return entries
+
+    def late(self, limit=None):
+        """Entries (as in plan()) of the tasks that will miss their due date, in work order"""
+        entries = []
+        done = 0.0
+        position = 0
+        for block in self._blocks:
+            if not block.late_count(done):
+                done += block.total
+                position += len(block.tasks)
+                continue
+            for task in block.tasks:
+                done += task.hours
+                position += 1
+                if task.budget - done < -EPSILON:
+                    entries.append(self._entry(position, task, done))
+                    if limit is not None and len(entries) >= limit:
+                        return entries
+        return entries
+
+    def summary(self):
+        """(tasks, total hours, days of work at capacity, late tasks)"""
+        total = late = 0
+        for block in self._blocks:
+            late += block.late_count(total)
+            total += block.total
+        return len(self._tasks), total, total / self.capacity, late
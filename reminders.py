@@ -0,0 +1,181 @@
+import heapq
+import itertools
+import sys
+import threading
+import time
+from datetime import datetime
+
+import task_db
+from metrics import METRICS
+
+# Seconds before the due date at which a reminder fires (a day ahead, then on the day)
+LEAD_TIMES = (24 * 3600, 0)
+
+
+def _now_epoch():
+    return task_db.datetime_to_epoch(datetime.now())
+
+
+class ReminderEngine:
+    """Event-driven reminders: a min-heap of fire times and a thread that sleeps until the next one
+
+    The heap uses lazy deletion: every schedule() gives the task's entries a new version, schedule()
+    and cancel() only update self._versions, and entries of older versions are dropped when they
+    reach the top. Fired reminders are recorded in reminder_log so
+    each (task, due date, lead time) fires exactly once, also across restarts. In memory
+    self._fired only holds them per armed task and for its current due date, so it shrinks
+    again on cancel() and when a task gets a new date.
+    """
+
+    def __init__(self, db_path, notify, lead_times=LEAD_TIMES, clock=_now_epoch):
+        self.db_path = db_path
+        self.notify = notify
+        self.lead_times = sorted(set(lead_times), reverse=True)
+        self.clock = clock
+        self.fired_count = 0
+        self._heap = []
+        self._versions = {}
+        self._next_version = itertools.count()
+        self._fired = {}
+        self._cond = threading.Condition()
+        self._stopped = False
+        self._thread = None
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        with self._cond:
+            self._stopped = True
+            self._cond.notify()
+        if self._thread is not None:
+            self._thread.join()
+
+    def rebuild(self, conn):
+        """Reload every pending task with a single indexed query"""
+        started = time.perf_counter()
+        with self._cond:
+            rows = conn.execute(
+                "SELECT id, title, due_epoch FROM tasks WHERE status='Pending' AND due_epoch IS NOT NULL"
+            ).fetchall()
+            fired = conn.execute('''
+                SELECT l.task_id, l.due_epoch, l.lead FROM reminder_log l JOIN tasks t ON t.id = l.task_id
+                WHERE t.status='Pending' AND t.due_epoch = l.due_epoch
+            ''').fetchall()
+            self._versions = {}
+            self._fired = {}
+            for task_id, due_epoch, lead in fired:
+                self._fired.setdefault(task_id, set()).add((due_epoch, lead))
+            now = self.clock()
+            self._heap = [entry for row in rows for entry in self._entries(*row, now)]
+            heapq.heapify(self._heap)
+            self._cond.notify()
+        METRICS.record("reminder rebuild", time.perf_counter() - started)
+
+    def _entries(self, task_id, title, due_epoch, now):
+        """Heap entries for one task; of the lead times already passed only the latest fires"""
+        version = self._versions[task_id] = next(self._next_version)
+        fired = self._fired.get(task_id)
+        if fired:
+            fired = {key for key in fired if key[0] == due_epoch}  # those of an earlier due date cannot fire again
+            if fired:
+                self._fired[task_id] = fired
+            else:
+                del self._fired[task_id]
+        entries = []
+        passed = None
+        for lead in self.lead_times:
+            fire_at = due_epoch - lead
+            if fire_at > now:
+                entries.append((fire_at, task_id, lead, due_epoch, version, title))
+            else:
+                passed = (fire_at, task_id, lead, due_epoch, version, title)
+        if passed is not None and (due_epoch, passed[2]) not in (fired or ()):
+            entries.append(passed)
+        return entries
+
+    def schedule(self, task_id, title, due_date):
+        """Arm (or re-arm after an edit) the reminders of a pending task"""
+        with self._cond:
+            for entry in self._entries(int(task_id), title, task_db.date_to_epoch(due_date), self.clock()):
+                heapq.heappush(self._heap, entry)
+            if len(self._heap) > 2 * len(self._versions) * len(self.lead_times) + 64:
+                self._heap = [entry for entry in self._heap if self._is_live(entry)]
+                heapq.heapify(self._heap)
+            self._cond.notify()
+
+    def cancel(self, task_id):
+        """Forget a task that was completed or deleted"""
+        with self._cond:
+            self._versions.pop(int(task_id), None)
+            self._fired.pop(int(task_id), None)
+
+    def _is_live(self, entry):
+        return self._versions.get(entry[1]) == entry[4]
+
+    def _drop_stale(self):
+        while self._heap and not self._is_live(self._heap[0]):
+            heapq.heappop(self._heap)
+
+    def stats(self):
+        """Armed tasks, heap entries (stale ones included), reminders fired so far and tasks remembered in _fired"""
+        with self._cond:
+            return {"tasks": len(self._versions), "heap": len(self._heap), "fired": self.fired_count,
+                    "fired_tasks": len(self._fired)}
+
+    def next_fire_time(self):
+        with self._cond:
+            self._drop_stale()
+            return self._heap[0][0] if self._heap else None
+
+    def _wait_for_due(self):
+        """Sleep until the earliest reminder is due; returns the due entries or None when stopped"""
+        with self._cond:
+            while True:
+                if self._stopped:
+                    return None
+                self._drop_stale()
+                if self._heap and self._heap[0][0] <= self.clock():
+                    break
+                self._cond.wait(self._heap[0][0] - self.clock() if self._heap else None)
+            now = self.clock()
+            due = []
+            while self._heap and self._heap[0][0] <= now:
+                entry = heapq.heappop(self._heap)
+                if not self._is_live(entry):
+                    continue
+                fired = self._fired.setdefault(entry[1], set())
+                if (entry[3], entry[2]) not in fired:
+                    fired.add((entry[3], entry[2]))
+                    due.append(entry)
+            return due
+
+    def _run(self):
+        conn = task_db.connect(self.db_path)
+        try:
+            self.rebuild(conn)
+            while True:
+                due = self._wait_for_due()
+                if due is None:
+                    return
+                started = time.perf_counter()
+                now = self.clock()
+                for fire_at, task_id, lead, due_epoch, _, title in due:
+                    METRICS.record("reminder lateness", max(now - fire_at, 0))
+                    try:
+                        self.notify(task_id, title, due_epoch, lead)
+                    except Exception as e:
+                        print(f"[Reminder Thread Error]: {e}", file=sys.stderr)
+                self.fired_count += len(due)
+                conn.executemany(
+                    "INSERT OR IGNORE INTO reminder_log (task_id, due_epoch, lead, fired_at) VALUES (?, ?, ?, ?)",
+                    [(task_id, due_epoch, lead, fire_at) for fire_at, task_id, lead, due_epoch, _, title in due]
+                )
+                conn.commit()
+                METRICS.count("reminder fired", len(due))
+                METRICS.record("reminder tick", time.perf_counter() - started)
+        except Exception as e:
+            print(f"[Reminder Thread Error]: {e}", file=sys.stderr)
+        finally:
+            conn.close()
@@ -0,0 +1,125 @@
+import os
+import sys
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+import task_db
+from task_ai import BATCH_SIZE, MODEL_NAME, UNUSED_PIPES, PriorityClassifier, model_fingerprint
+
+# Task ids per job handed to a worker process
+CHUNK_SIZE = 2000
+# Jobs queued per worker so none sits idle while the parent applies results
+JOBS_PER_WORKER = 2
+
+# Per-process state, set up once by _init_worker
+_worker = {}
+
+
+def _load_model(model_name):
+    """Load the model, or raise ValueError: without it every ambiguous task would get a keyword guess"""
+    try:
+        import spacy
+        return spacy.load(model_name, disable=UNUSED_PIPES)
+    except (ImportError, OSError) as e:
+        raise ValueError(f"Reprioritizing needs the SpaCy model '{model_name}': {e}") from e
+
+
+def _init_worker(db_path, model_name):
+    """Load the model and open a read connection once per worker process"""
+    _worker["nlp"] = _load_model(model_name)
+    _worker["classifier"] = PriorityClassifier()
+    _worker["conn"] = task_db.connect(db_path)
+
+
+def _rescore(first_id, end_id, batch_size):
+    """Classify tasks with first_id <= id < end_id; returns (rows read, changed rows)
+
+    Changed rows are (new priority, id, priority read, description read), ready for the guarded
+    UPDATE in reprioritize_all. ai_reason explains the task's score (scoring.py), so only the
+    priority bucket is rewritten.
+    """
+    rows = _worker["conn"].execute(
+        "SELECT id, description, priority FROM tasks WHERE id >= ? AND id < ?",
+        (first_id, end_id)
+    ).fetchall()
+    results = _worker["classifier"].prioritize_batch([row[1] or "" for row in rows], _worker["nlp"], batch_size)
+    changed = [(priority, row[0], row[2], row[1]) for row, (priority, _) in zip(rows, results) if priority != row[2]]
+    return len(rows), changed
+
+
+def reprioritize_all(pool, workers=None, chunk_size=CHUNK_SIZE, batch_size=BATCH_SIZE, progress=None,
+                     model_name=MODEL_NAME):
+    """Rescore every task on a pool of worker processes; returns (processed, changed, skipped)
+
+    Id ranges of chunk_size are classified in parallel, each worker reading its own range, and
+    only rows whose priority changed come back. They are applied as they arrive with
+    one executemany UPDATE per chunk, in the same transaction as the checkpoint: the highest id
+    below which every chunk is done. An interrupted run resumes from there as long as the
+    keyword lists and model are unchanged. progress(processed, changed, total) is called after
+    every chunk.
+    A run over a large table takes a while, so the UPDATE only applies while the task still has
+    the priority and description the worker read; a task edited meanwhile keeps its edit and
+    is counted as skipped.
+    Raises ValueError before starting any worker when the model cannot be loaded.
+    """
+    fingerprint = model_fingerprint(_load_model(model_name))
+    workers = workers or os.cpu_count() or 1
+    executor = ProcessPoolExecutor(workers, initializer=_init_worker, initargs=(pool.db_path, model_name))
+    try:
+        with pool.write() as conn:
+            conn.execute("DELETE FROM reprioritize_progress WHERE fingerprint != ?", (fingerprint,))
+            row = conn.execute(
+                "SELECT last_id, processed, changed, skipped FROM reprioritize_progress WHERE fingerprint=?",
+                (fingerprint,)
+            ).fetchone()
+        last_id, processed, changed, skipped = row or (0, 0, 0, 0)
+        if row is not None:
+            print(f"[Reprioritize] Resuming after task {last_id} ({processed} already processed)",
+                  file=sys.stderr)
+        with pool.read() as conn:
+            max_id, remaining = conn.execute(
+                "SELECT COALESCE(MAX(id), 0), COUNT(*) FROM tasks WHERE id > ?", (last_id,)
+            ).fetchone()
+        total = processed + remaining
+
+        starts = iter(range(last_id + 1, max_id + 1, chunk_size))
+        next_start = last_id + 1  # lowest chunk not yet applied
+        finished = {}  # chunk start -> (rows read, rows changed, rows skipped), for chunks applied out of order
+        running = {}
+        seen, updated = processed, changed
+        while True:
+            while len(running) < workers * JOBS_PER_WORKER and (start := next(starts, None)) is not None:
+                running[executor.submit(_rescore, start, start + chunk_size, batch_size)] = start
+            if not running:
+                break
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                start = running.pop(future)
+                count, rows = future.result()
+                with pool.write() as conn:
+                    # rowcount, not total_changes: that also counts the change log rows the triggers add
+                    applied = conn.executemany(
+                        "UPDATE tasks SET priority=? WHERE id=? AND priority=? AND description IS ?", rows
+                    ).rowcount if rows else 0
+                    finished[start] = (count, applied, len(rows) - applied)
+                    seen += count
+                    updated += applied
+                    while next_start in finished:
+                        count, changes, skips = finished.pop(next_start)
+                        processed += count
+                        changed += changes
+                        skipped += skips
+                        next_start += chunk_size
+                    conn.execute('''
+                        INSERT OR REPLACE INTO reprioritize_progress (fingerprint, last_id, processed, changed, skipped)
+                        VALUES (?, ?, ?, ?, ?)
+                    ''', (fingerprint, min(next_start - 1, max_id), processed, changed, skipped))
+                if progress is not None:
+                    progress(seen, updated, total)
+
+        with pool.write() as conn:
+            conn.execute("DELETE FROM reprioritize_progress WHERE fingerprint=?", (fingerprint,))
+        if skipped:
+            print(f"[Reprioritize] Left {skipped} tasks edited during the run as they were", file=sys.stderr)
+        return processed, changed, skipped
+    finally:
+        executor.shutdown(wait=True, cancel_futures=True)
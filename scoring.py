@@ -0,0 +1,217 @@
+import sys
+import time
+from datetime import datetime
+from functools import lru_cache
+
+import numpy as np
+
+import task_db
+from metrics import METRICS
+from task_ai import HIGH_KEYWORDS, MEDIUM_LEMMAS, keyword_hits
+
+# Score contribution of each HIGH keyword and MEDIUM lemma found in the description
+HIGH_WEIGHT = 3.0
+MEDIUM_WEIGHT = 1.5
+# A task due today adds DUE_WEIGHT, halving every DUE_HALF_LIFE days further out; nothing from
+# DUE_HORIZON days on. Overdue tasks add up to OVERDUE_WEIGHT more, reached after OVERDUE_DAYS.
+DUE_WEIGHT = 4.0
+DUE_HALF_LIFE = 7.0
+DUE_HORIZON = 60
+OVERDUE_WEIGHT = 2.0
+OVERDUE_DAYS = 14
+# Completed tasks keep their keyword score but sink below every pending one
+COMPLETED_WEIGHT = -20.0
+# Contributions named in ai_reason, largest first
+REASON_FEATURES = 3
+# Task ids per rescore_all transaction
+RESCORE_CHUNK_SIZE = 50000
+
+# Bit i of score_features is feature i; the due and status terms follow as the last two columns
+FEATURE_NAMES = tuple(f"'{word}'" for word in HIGH_KEYWORDS + MEDIUM_LEMMAS)
+FEATURE_WEIGHTS = np.array([HIGH_WEIGHT] * len(HIGH_KEYWORDS) + [MEDIUM_WEIGHT] * len(MEDIUM_LEMMAS))
+FEATURE_BITS = np.arange(len(FEATURE_NAMES))
+# Days are clamped to [-OVERDUE_DAYS - 1, DUE_HORIZON]; a (features, days, completed) key is packed in one integer
+DAY_OFFSET = OVERDUE_DAYS + 1
+DAY_SLOTS = DAY_OFFSET + DUE_HORIZON + 1
+
+
+def text_features(description):
+    """score_features bitmask of a description"""
+    high, medium = keyword_hits(description or "")
+    bits = 0
+    for i in high:
+        bits |= 1 << i
+    for i in medium:
+        bits |= 1 << (len(HIGH_KEYWORDS) + i)
+    return bits
+
+
+def today_epoch(now=None):
+    """Midnight of today, in the same timezone-naive epoch as due_epoch"""
+    return task_db.date_to_epoch((now or datetime.now()).strftime(task_db.DATE_FORMAT))
+
+
+def _due_phrase(days):
+    if days < -OVERDUE_DAYS:
+        return f"overdue by more than {OVERDUE_DAYS} days"
+    if days < 0:
+        return f"overdue by {-days} day{'s' if days < -1 else ''}"
+    if days == 0:
+        return "due today"
+    if days == 1:
+        return "due tomorrow"
+    return f"due in {days} days"
+
+
+def _explain(score, contributions, days):
+    order = np.argsort(-np.abs(contributions), kind="stable")[:REASON_FEATURES]
+    parts = []
+    for column in order:
+        value = contributions[column]
+        if abs(value) < 0.005:
+            break
+        if column < len(FEATURE_NAMES):
+            name = FEATURE_NAMES[column]
+        elif column == len(FEATURE_NAMES):
+            name = _due_phrase(days)
+        else:
+            name = "completed"
+        parts.append(f"{name} {value:+.2f}")
+    return f"Score {score:.2f}: " + (", ".join(parts) if parts else "no keywords, not due soon")
+
+
+def score_tasks(features, due_epochs, statuses, today=None):
+    """Scores and ai_reason texts for many tasks: (float64 array, list of str)
+
+    A score depends only on the feature bits, the days to the due date clamped to
+    [-OVERDUE_DAYS - 1, DUE_HORIZON] and whether the task is completed, so however many tasks are
+    passed, each distinct combination is computed (and its reason formatted) once: the keys
+    are packed into integers, np.unique finds the combinations and its inverse index spreads
+    their results back over the tasks.
+    """
+    today = today_epoch() if today is None else today
+    features = np.asarray(features, dtype=np.int64)
+    due = np.array([np.nan if epoch is None else epoch for epoch in due_epochs], dtype=np.float64)
+    days = np.where(np.isnan(due), DUE_HORIZON, np.floor((due - today) / 86400))
+    days = np.clip(days, -DAY_OFFSET, DUE_HORIZON).astype(np.int64)
+    completed = np.fromiter((status == "Completed" for status in statuses), dtype=bool, count=len(features))
+    keys = (features * DAY_SLOTS + days + DAY_OFFSET) * 2 + completed
+    unique, inverse = np.unique(keys, return_inverse=True)
+    scores, reasons = _score_keys(unique)
+    return scores[inverse], list(reasons[inverse])
+
+
+def _score_keys(unique):
+    key_completed = (unique % 2).astype(bool)
+    key_days = (unique // 2) % DAY_SLOTS - DAY_OFFSET
+    key_features = unique // 2 // DAY_SLOTS
+    keyword = ((key_features[:, None] >> FEATURE_BITS) & 1) * FEATURE_WEIGHTS
+    upcoming = np.where(key_days < DUE_HORIZON, DUE_WEIGHT * 0.5 ** (np.maximum(key_days, 0) / DUE_HALF_LIFE), 0.0)
+    overdue = OVERDUE_WEIGHT * np.minimum(np.maximum(-key_days, 0), OVERDUE_DAYS) / OVERDUE_DAYS
+    due_term = np.where(key_completed, 0.0, upcoming + overdue)
+    status_term = np.where(key_completed, COMPLETED_WEIGHT, 0.0)
+    contributions = np.column_stack([keyword, due_term, status_term]).round(2)
+    scores = contributions.sum(axis=1).round(2)
+    reasons = np.array([_explain(score, row, day) for score, row, day in zip(scores, contributions, key_days)],
+                       dtype=object)
+    return scores, reasons
+
+
+@lru_cache(maxsize=4096)
+def _score_key(key):
+    scores, reasons = _score_keys(np.array([key], dtype=np.int64))
+    return float(scores[0]), reasons[0]
+
+
+def score_task(features, due_epoch, status, today=None):
+    """(score, ai_reason) of one task, as score_tasks computes it
+
+    Packs the key in plain Python and caches each key's result: the NumPy call costs ~0.3 ms,
+    more than the rest of a single add or edit.
+    """
+    today = today_epoch() if today is None else today
+    days = DUE_HORIZON if due_epoch is None else min(max((due_epoch - today) // 86400, -DAY_OFFSET), DUE_HORIZON)
+    return _score_key((features * DAY_SLOTS + days + DAY_OFFSET) * 2 + (status == "Completed"))
+
+
+def _rescore_rows(pool, rows, today):
+    """Score rows read by rescore_all and write those that changed; returns the (ai_reason, id) pairs written"""
+    features = [row[1] if row[1] is not None else text_features(row[6]) for row in rows]
+    scores, reasons = score_tasks(features, [row[2] for row in rows], [row[3] for row in rows], today)
+    updates = [
+        (score, reason, feature_bits, row[0], row[1], row[2], row[3])
+        for row, score, reason, feature_bits in zip(rows, scores.tolist(), reasons, features)
+        if (score, reason, feature_bits) != (row[4], row[5], row[1])
+    ]
+    if not updates:
+        return []
+    with pool.write() as conn:
+        # rowcount, not total_changes: that also counts the change log rows the triggers add
+        applied = conn.executemany('''
+            UPDATE tasks SET score=?, ai_reason=?, score_features=?
+            WHERE id=? AND score_features IS ? AND due_epoch IS ? AND status IS ?
+        ''', updates).rowcount
+        if applied != len(updates):
+            # Some tasks were edited after they were read and kept their own score; report only ours
+            updates = [update for update in updates if conn.execute(
+                "SELECT 1 FROM tasks WHERE id=? AND ai_reason IS ?", (update[3], update[1])
+            ).fetchone()]
+    return [(update[1], update[3]) for update in updates]
+
+
+def rescore_all(pool, now=None, full=False, chunk_size=RESCORE_CHUNK_SIZE, progress=None, on_chunk=None):
+    """Bring the stored scores up to date with today's date; returns (scored, changed)
+
+    Completed tasks are scored once, on completion, and every add or edit scores its task, so
+    only pending tasks whose clamped days to the due date differ from the last run's can
+    change: those due from OVERDUE_DAYS + 1 days before the last run's day (or today, if
+    earlier) to DUE_HORIZON days after today. A normal run reads just that window through the
+    (status, due_epoch) index, about 76 days of tasks. The first run after schema version 7,
+    or one with full=True, reads every pending or unscored task in id ranges of chunk_size
+    instead and computes missing features from the descriptions.
+
+    Rows are scored chunk_size at a time with score_tasks and only those whose score or reason
+    changed are written, one transaction per chunk. Reads happen without the write lock, so an
+    UPDATE only applies while the row still has the features, due date and status it was
+    scored with; a task edited meanwhile keeps the score its edit gave it.
+    on_chunk([(ai_reason, id)]) gets the rows written and progress(scored, changed) is called
+    after every chunk.
+    """
+    started = time.perf_counter()
+    today = today_epoch(now)
+    with pool.read() as conn:
+        last = conn.execute("SELECT day FROM score_state").fetchone()
+        max_id = conn.execute("SELECT COALESCE(MAX(id), 0) FROM tasks").fetchone()[0]
+    if full or last is None:
+        queries = [('''
+            SELECT id, score_features, due_epoch, status, score, ai_reason,
+                   CASE WHEN score_features IS NULL THEN description END
+            FROM tasks
+            WHERE id BETWEEN ? AND ? AND (status='Pending' OR score IS NULL OR score_features IS NULL)
+        ''', (start, start + chunk_size - 1)) for start in range(1, max_id + 1, chunk_size)]
+    else:
+        queries = [('''
+            SELECT id, score_features, due_epoch, status, score, ai_reason,
+                   CASE WHEN score_features IS NULL THEN description END
+            FROM tasks
+            WHERE status='Pending' AND due_epoch BETWEEN ? AND ?
+        ''', (min(last[0], today) - DAY_OFFSET * 86400, max(last[0], today) + DUE_HORIZON * 86400))]
+    scored = changed = 0
+    for query, params in queries:
+        with pool.read() as conn:
+            cursor = conn.execute(query, params)
+            while rows := cursor.fetchmany(chunk_size):
+                written = _rescore_rows(pool, rows, today)
+                if written and on_chunk is not None:
+                    on_chunk(written)
+                scored += len(rows)
+                changed += len(written)
+                if progress is not None:
+                    progress(scored, changed)
+    with pool.write() as conn:
+        conn.execute("DELETE FROM score_state")
+        conn.execute("INSERT INTO score_state (day) VALUES (?)", (today,))
+    METRICS.record("score rescore_all", time.perf_counter() - started)
+    print(f"[Score] Rescored {scored} tasks ({changed} changed) in {time.perf_counter() - started:.2f} s",
+          file=sys.stderr)
+    return scored, changed
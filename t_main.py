@@ -2,27 +2,21 @@ import tkinter as tk
 from tkinter import ttk, messagebox
 import mysql.connector
 import threading
-import spacy
-from datetime import datetime
+import time
 import ttkbootstrap as tb  # Modern UI
-
-# Load NLP model
-try:
-    nlp = spacy.load("en_core_web_sm")
-except OSError:
-    messagebox.showerror("Error", "SpaCy model not found! Run: python -m spacy download en_core_web_sm")
-    exit()
+import task_mysql
+from notifications import NotificationCenter, Toast
+from task_ai import ModelLoader, PriorityClassifier
+from task_service import TaskService
+from workers import UiQueue
 
 # MySQL Database Connection
+# Server, credentials and pool size come from the TASKS_MYSQL_* environment variables (see task_mysql.py)
 def connect_database():
     try:
-        conn = mysql.connector.connect(
-            host="localhost",        # Change if your MySQL server is remote
-            user="root",             # Replace with your MySQL username
-            password="password",     # Replace with your MySQL password
-            database="task_scheduler"
-        )
-        return conn
+        pool = task_mysql.ConnectionPool()
+        task_mysql.init_schema(pool)
+        return pool
     except mysql.connector.Error as err:
         messagebox.showerror("Database Error", f"Error: {err}")
         exit()
@@ -37,47 +31,39 @@ class TaskScheduler:
         # Set theme
         self.style = tb.Style("darkly")
 
+        # The loader and checker threads hand their callbacks to the Tk thread through this queue
+        self.ui = UiQueue(self.root)
+
+        # Load the NLP model off the UI thread; keyword priorities are used until it is ready
+        self.nlp_loader = ModelLoader(on_error=self.on_model_error)
+        self.classifier = PriorityClassifier()
+        self.root.after_idle(self.nlp_loader.start)
+
         self.init_database()
         self.create_gui()
 
+        # Every hourly check re-finds the same tasks; the center shows each one once per digest
+        self.notifications = NotificationCenter(self.ui, Toast(self.root).show)
+
         # Start background thread for checking tasks
         self.checker_thread = threading.Thread(target=self.check_tasks, daemon=True)
         self.checker_thread.start()
 
     def init_database(self):
         """Initialize MySQL Database"""
-        self.conn = connect_database()
-        self.cursor = self.conn.cursor()
-        self.cursor.execute('''
-            CREATE TABLE IF NOT EXISTS tasks (
-                id INT AUTO_INCREMENT PRIMARY KEY,
-                title VARCHAR(255) NOT NULL,
-                description TEXT,
-                due_date DATE NOT NULL,
-                priority VARCHAR(50) NOT NULL,
-                status VARCHAR(50) DEFAULT 'Pending',
-                ai_reason TEXT
-            )
-        ''')
-        self.conn.commit()
+        self.pool = connect_database()
+        self.service = TaskService(classifier=self.classifier, nlp_loader=self.nlp_loader, pool=self.pool)
 
     def ai_prioritize_task(self, description):
         """Use NLP to determine task priority"""
-        doc = nlp(description.lower())
-        priority = "Low"
-        if any(word in description.lower() for word in ["urgent", "critical", "deadline", "important"]):
-            priority = "High"
-        elif any(token.lemma_ in ["soon", "priority", "major"] for token in doc):
-            priority = "Medium"
-        return priority, "NLP-based priority assignment"
-
-    def validate_date(self, date_str):
-        """Validate date format (YYYY-MM-DD)"""
-        try:
-            datetime.strptime(date_str, "%Y-%m-%d")
-            return True
-        except ValueError:
-            return False
+        return self.service.ai_prioritize_task(description)
+
+    def on_model_error(self, error):
+        """Report a missing SpaCy model without blocking startup"""
+        self.ui.after(0, lambda: messagebox.showerror("Error", "SpaCy model not found! Run: python -m spacy download en_core_web_sm"))
+
+    def on_database_error(self, error):
+        messagebox.showerror("Database Error", f"Error: {error}")
 
     def create_gui(self):
         """Create the GUI"""
@@ -125,22 +111,14 @@ class TaskScheduler:
         description = self.desc_var.get().strip()
         due_date = self.date_var.get().strip()
 
-        if not title or not due_date:
-            messagebox.showerror("Error", "Title and Due Date are required!")
+        try:
+            self.service.add_task(title, description, due_date)
+        except ValueError as e:
+            messagebox.showerror("Error", str(e))
             return
-        
-        if not self.validate_date(due_date):
-            messagebox.showerror("Error", "Invalid date format! Use YYYY-MM-DD.")
+        except mysql.connector.Error as e:
+            self.on_database_error(e)
             return
-
-        priority, ai_reason = self.ai_prioritize_task(description)
-
-        self.cursor.execute('''
-            INSERT INTO tasks (title, description, due_date, priority, status, ai_reason)
-            VALUES (%s, %s, %s, %s, %s, %s)
-        ''', (title, description, due_date, priority, "Pending", ai_reason))
-
-        self.conn.commit()
         self.refresh_tasks()
 
     def modify_task(self):
@@ -155,25 +133,70 @@ class TaskScheduler:
         new_description = self.desc_var.get().strip()
         new_due_date = self.date_var.get().strip()
 
-        if not new_title or not new_due_date:
-            messagebox.showerror("Error", "Title and Due Date are required!")
+        try:
+            self.service.update_task(task_id, new_title, new_description, new_due_date)
+        except ValueError as e:
+            messagebox.showerror("Error", str(e))
+            return
+        except mysql.connector.Error as e:
+            self.on_database_error(e)
+            return
+        self.refresh_tasks()
+
+    def mark_task_done(self):
+        """Mark selected task as completed"""
+        selected_item = self.tree.selection()
+        if not selected_item:
+            messagebox.showerror("Error", "Select a task to mark as done!")
             return
 
-        self.cursor.execute('''
-            UPDATE tasks SET title=%s, description=%s, due_date=%s WHERE id=%s
-        ''', (new_title, new_description, new_due_date, task_id))
+        task_id = self.tree.item(selected_item, "values")[0]
+        try:
+            self.service.complete_task(task_id)
+        except mysql.connector.Error as e:
+            self.on_database_error(e)
+            return
+        self.refresh_tasks()
 
-        self.conn.commit()
+    def delete_task(self):
+        """Delete selected task"""
+        selected_item = self.tree.selection()
+        if not selected_item:
+            messagebox.showerror("Error", "Select a task to delete!")
+            return
+
+        task_id = self.tree.item(selected_item, "values")[0]
+        try:
+            self.service.delete_task(task_id)
+        except mysql.connector.Error as e:
+            self.on_database_error(e)
+            return
         self.refresh_tasks()
 
     def refresh_tasks(self):
         """Refresh task list"""
         self.tree.delete(*self.tree.get_children())
-        self.cursor.execute("SELECT id, title, description, due_date, priority, status FROM tasks ORDER BY priority DESC, due_date ASC")
-        for task in self.cursor.fetchall():
-            self.tree.insert("", "end", values=task)
+        try:
+            # Streams from an unbuffered cursor, fetchmany() chunk by chunk
+            for task in self.service.iter_tasks(display_order=True):
+                self.tree.insert("", "end", values=task[:6])
+        except mysql.connector.Error as e:
+            self.on_database_error(e)
+
+    def check_tasks(self):
+        """Background thread to check for upcoming tasks"""
+        while True:
+            try:
+                for task_id, title, due_date in self.service.due_tasks(days=1):
+                    self.notifications.post(task_id, f"'{title}' is due on {due_date}!")
+            except mysql.connector.Error as e:
+                print(f"[Reminder Thread Error]: {e}")
+            threading.Event().wait(3600)  # Check every hour
 
 if __name__ == "__main__":
+    startup_began = time.perf_counter()
     root = tb.Window(themename="superhero")
     app = TaskScheduler(root)
+    root.after_idle(lambda: print(f"[Startup] Window ready in {(time.perf_counter() - startup_began) * 1000:.0f} ms"))
     root.mainloop()
+    app.pool.close()
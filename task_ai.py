@@ -0,0 +1,346 @@
+import hashlib
+import json
+import re
+import sys
+import threading
+import time
+from collections import Counter, OrderedDict
+
+import task_db
+from metrics import METRICS
+
+MODEL_NAME = "en_core_web_sm"
+
+HIGH_KEYWORDS = ["urgent", "critical", "deadline", "important"]
+MEDIUM_LEMMAS = ["soon", "priority", "major"]
+
+# The lemma check only needs the tagger/lemmatizer, so skip the expensive components
+UNUSED_PIPES = ["parser", "ner"]
+BATCH_SIZE = 256
+CACHE_SIZE = 10000
+
+NLP_REASON = "NLP-based priority assignment"
+KEYWORD_REASON = "Keyword-based priority assignment"
+NO_MATCH_REASON = "No priority keywords found"
+
+# Classifier tiers, cheapest first
+TIER_KEYWORD = "keyword"
+TIER_NO_MATCH = "no-match"
+TIER_CACHE = "cache"
+TIER_MODEL = "model"
+TIER_FALLBACK = "fallback"
+
+_WORD_RE = re.compile(r"[a-z]+")
+
+
+class ModelLoader:
+    """Loads the SpaCy model in a background thread so the GUI can start right away"""
+
+    def __init__(self, name=MODEL_NAME, on_error=None):
+        self.name = name
+        self.on_error = on_error
+        self.nlp = None
+        self.error = None
+        self.load_time = None
+        self._ready = threading.Event()
+        self._lock = threading.Lock()
+        self._thread = None
+
+    def start(self):
+        """Start loading the model in the background (no-op if already started)"""
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._load, daemon=True)
+                self._thread.start()
+
+    def _load(self):
+        started = time.perf_counter()
+        try:
+            import spacy
+            self.nlp = spacy.load(self.name, disable=UNUSED_PIPES)
+            self.load_time = time.perf_counter() - started
+            METRICS.record("nlp load", self.load_time)
+            print(f"[NLP] Model '{self.name}' loaded in {self.load_time * 1000:.0f} ms", file=sys.stderr)
+        except (ImportError, OSError) as e:
+            self.error = e
+            print(f"[NLP] Could not load model '{self.name}': {e}", file=sys.stderr)
+            if self.on_error:
+                self.on_error(e)
+        finally:
+            self._ready.set()
+
+    @property
+    def ready(self):
+        return self.nlp is not None
+
+    def wait(self, timeout=None):
+        """Block until loading finished; returns the model or None if it failed"""
+        self.start()
+        self._ready.wait(timeout)
+        return self.nlp
+
+
+def _singular(word):
+    if word.endswith("ies"):
+        return word[:-3] + "y"
+    if word.endswith("s"):
+        return word[:-1]
+    return word
+
+
+def keyword_prioritize(description):
+    """Approximate the NLP priority with plain word matching while the model is loading"""
+    text = description.lower()
+    if any(word in text for word in HIGH_KEYWORDS):
+        return "High", KEYWORD_REASON
+    for word in _WORD_RE.findall(text):
+        if word in MEDIUM_LEMMAS or _singular(word) in MEDIUM_LEMMAS:
+            return "Medium", KEYWORD_REASON
+    return "Low", KEYWORD_REASON
+
+
+def keyword_hits(description):
+    """Indexes of the HIGH_KEYWORDS (substrings) and MEDIUM_LEMMAS (words, plurals included) in a description
+
+    The same matching as keyword_prioritize, reporting every hit instead of stopping at the first.
+    """
+    text = description.lower()
+    high = [i for i, word in enumerate(HIGH_KEYWORDS) if word in text]
+    medium = {MEDIUM_LEMMAS.index(lemma) for word in _WORD_RE.findall(text)
+              for lemma in (word, _singular(word)) if lemma in MEDIUM_LEMMAS}
+    return high, sorted(medium)
+
+
+def normalize_description(description):
+    """Lowercase and collapse whitespace; neither changes the priority decision"""
+    return " ".join(description.lower().split())
+
+
+def model_fingerprint(nlp):
+    """Identify the keyword lists and model version a cached decision was made with"""
+    meta = getattr(nlp, "meta", {})
+    payload = json.dumps([HIGH_KEYWORDS, MEDIUM_LEMMAS, UNUSED_PIPES, meta.get("name"), meta.get("version")])
+    return hashlib.sha1(payload.encode("utf-8")).hexdigest()
+
+
+class PriorityCache:
+    """Bounded LRU cache of NLP priority decisions, persisted in an SQLite side table"""
+
+    def __init__(self, db_path, maxsize=CACHE_SIZE):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._fingerprint = None
+        self._nlp = None
+        self._lock = threading.Lock()
+        self.conn = task_db.connect(db_path, check_same_thread=False)
+        self.conn.execute('''
+            CREATE TABLE IF NOT EXISTS priority_cache (
+                key TEXT PRIMARY KEY,
+                fingerprint TEXT NOT NULL,
+                priority TEXT NOT NULL,
+                ai_reason TEXT,
+                last_used REAL
+            )
+        ''')
+        self.conn.commit()
+        self._stored = self.conn.execute("SELECT COUNT(*) FROM priority_cache").fetchone()[0]
+
+    @staticmethod
+    def key(description):
+        return hashlib.sha1(normalize_description(description).encode("utf-8")).hexdigest()
+
+    def _bind(self, nlp):
+        """Drop every entry made with other keyword lists or another model version"""
+        if nlp is self._nlp:
+            return
+        self._nlp = nlp
+        fingerprint = model_fingerprint(nlp)
+        if fingerprint == self._fingerprint:
+            return
+        self._fingerprint = fingerprint
+        self._entries.clear()
+        self.conn.execute("DELETE FROM priority_cache WHERE fingerprint != ?", (fingerprint,))
+        self.conn.commit()
+        rows = self.conn.execute(
+            "SELECT key, priority, ai_reason FROM priority_cache ORDER BY last_used DESC LIMIT ?",
+            (self.maxsize,)
+        ).fetchall()
+        for key, priority, ai_reason in reversed(rows):
+            self._entries[key] = (priority, ai_reason)
+        self._stored = self.conn.execute("SELECT COUNT(*) FROM priority_cache").fetchone()[0]
+
+    def get(self, description, nlp):
+        key = self.key(description)
+        with self._lock:
+            self._bind(nlp)
+            result = self._entries.get(key)
+            if result is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return result
+
+    def put_many(self, items, nlp):
+        """Store (description, (priority, ai_reason)) pairs"""
+        now = time.time()
+        rows = []
+        with self._lock:
+            self._bind(nlp)
+            for description, (priority, ai_reason) in items:
+                key = self.key(description)
+                self._entries[key] = (priority, ai_reason)
+                self._entries.move_to_end(key)
+                rows.append((key, self._fingerprint, priority, ai_reason, now))
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+            if not rows:
+                return
+            self.conn.executemany('''
+                INSERT OR REPLACE INTO priority_cache (key, fingerprint, priority, ai_reason, last_used)
+                VALUES (?, ?, ?, ?, ?)
+            ''', rows)
+            self._stored += len(rows)
+            if self._stored > 2 * self.maxsize:
+                self.conn.execute(
+                    "DELETE FROM priority_cache WHERE key NOT IN "
+                    "(SELECT key FROM priority_cache ORDER BY last_used DESC LIMIT ?)",
+                    (self.maxsize,)
+                )
+                self._stored = self.maxsize
+            self.conn.commit()
+
+    def put(self, description, nlp, result):
+        self.put_many([(description, result)], nlp)
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "size": len(self._entries),
+        }
+
+    def close(self):
+        self.conn.close()
+
+
+def _stem(lemma):
+    """Shortest prefix shared by the inflected forms of a lemma (priority -> priorit)"""
+    return lemma[:-1] if lemma[-1] in "ey" else lemma
+
+
+class PriorityClassifier:
+    """Tiered priority classifier that only runs SpaCy on ambiguous descriptions
+
+    1. keyword  - one compiled regex pass decides High (substring match, as before)
+                  and Medium when a lemma appears verbatim as a word
+    2. no-match - no word can lemmatize to a Medium lemma, so the answer is Low
+    3. cache    - an earlier model decision for the same normalized text
+    4. model    - SpaCy lemma check (fallback: keyword guess while the model loads)
+    """
+
+    def __init__(self, cache=None):
+        self.cache = cache
+        self.tier_counts = Counter()
+        self._lock = threading.Lock()  # classify() runs on every worker thread; guards tier_counts
+        self._high_re = re.compile("|".join(map(re.escape, HIGH_KEYWORDS)))
+        self._medium_re = re.compile(r"\b(?:%s)\b" % "|".join(map(re.escape, MEDIUM_LEMMAS)))
+        self._candidate_re = re.compile("|".join(re.escape(_stem(lemma)) for lemma in MEDIUM_LEMMAS))
+
+    def _fast_path(self, text):
+        """Return (priority, reason, tier) when the model is not needed, else None"""
+        match = self._high_re.search(text)
+        if match:
+            return "High", f"Keyword match: '{match.group()}'", TIER_KEYWORD
+        match = self._medium_re.search(text)
+        if match:
+            return "Medium", f"Keyword match: '{match.group()}'", TIER_KEYWORD
+        if not self._candidate_re.search(text):
+            return "Low", NO_MATCH_REASON, TIER_NO_MATCH
+        return None
+
+    def needs_model(self, description):
+        """True when only the SpaCy lemma check can decide this description"""
+        return self._fast_path(description.lower()) is None
+
+    @staticmethod
+    def _lemma_priority(doc):
+        if any(token.lemma_ in MEDIUM_LEMMAS for token in doc):
+            return "Medium", NLP_REASON
+        return "Low", NLP_REASON
+
+    def classify(self, description, nlp=None):
+        """Return (priority, ai_reason, tier) for one description"""
+        text = description.lower()
+        decided = self._fast_path(text)
+        if decided is None:
+            if nlp is None:
+                decided = keyword_prioritize(description) + (TIER_FALLBACK,)
+            elif self.cache is not None and (cached := self.cache.get(description, nlp)) is not None:
+                decided = cached + (TIER_CACHE,)
+            else:
+                model_started = time.perf_counter()
+                result = self._lemma_priority(nlp(text, disable=UNUSED_PIPES))
+                METRICS.record("nlp model", time.perf_counter() - model_started)
+                if self.cache is not None:
+                    self.cache.put(description, nlp, result)
+                decided = result + (TIER_MODEL,)
+        with self._lock:
+            self.tier_counts[decided[2]] += 1
+        return decided
+
+    def classify_batch(self, descriptions, nlp=None, batch_size=BATCH_SIZE, n_process=1):
+        """Classify many descriptions, sending only the ambiguous ones through nlp.pipe"""
+        started = time.perf_counter()
+        texts = [description.lower() for description in descriptions]
+        results = [self._fast_path(text) for text in texts]
+        pending = [i for i, result in enumerate(results) if result is None]
+        if nlp is None:
+            for i in pending:
+                results[i] = keyword_prioritize(descriptions[i]) + (TIER_FALLBACK,)
+            pending = []
+        elif self.cache is not None:
+            misses = []
+            for i in pending:
+                cached = self.cache.get(descriptions[i], nlp)
+                if cached is None:
+                    misses.append(i)
+                else:
+                    results[i] = cached + (TIER_CACHE,)
+            pending = misses
+        if pending:
+            pipe_started = time.perf_counter()
+            docs = nlp.pipe((texts[i] for i in pending), batch_size=batch_size, n_process=n_process, disable=UNUSED_PIPES)
+            for i, doc in zip(pending, docs):
+                results[i] = self._lemma_priority(doc) + (TIER_MODEL,)
+            METRICS.record("nlp pipe", time.perf_counter() - pipe_started)
+            if self.cache is not None:
+                self.cache.put_many([(descriptions[i], results[i][:2]) for i in pending], nlp)
+        tiers = Counter(result[2] for result in results)
+        with self._lock:
+            self.tier_counts.update(tiers)
+        METRICS.record("nlp classify_batch", time.perf_counter() - started)
+        return results
+
+    def prioritize(self, description, nlp=None):
+        """Use NLP to determine task priority"""
+        return self.classify(description, nlp)[:2]
+
+    def prioritize_batch(self, descriptions, nlp=None, batch_size=BATCH_SIZE, n_process=1):
+        """Prioritize many descriptions at once; same results as prioritize()"""
+        return [result[:2] for result in self.classify_batch(descriptions, nlp, batch_size, n_process)]
+
+    def tier_stats(self):
+        """Copy of tier_counts as a dict, safe to read while other threads classify"""
+        with self._lock:
+            return dict(self.tier_counts)
+
+    def model_skip_rate(self):
+        """Fraction of classifications that never reached the SpaCy pipeline"""
+        counts = self.tier_stats()
+        total = sum(counts.values())
+        return 1 - counts.get(TIER_MODEL, 0) / total if total else 0.0
@@ -0,0 +1,282 @@
+"""Command-line front end for the task scheduler (no GUI, SpaCy loaded only when needed)
+
+    python task_cli.py add "Write report" 2026-11-01 -d "urgent quarterly numbers"
+    python task_cli.py list --status Pending
+    python task_cli.py list --by-score
+    python task_cli.py search "quarterly rep"
+    python task_cli.py complete 42
+    python task_cli.py due --days 1
+    python task_cli.py estimate 42 3.5
+    python task_cli.py plan --capacity 6 --late
+    python task_cli.py import backlog.csv
+    python task_cli.py reprioritize --workers 8
+    python task_cli.py rescore
+    python task_cli.py archive --days 30
+    python task_cli.py search "quarterly rep" --archived
+    python task_cli.py export tasks.jsonl --status Completed --due-from 2026-01-01
+    python task_cli.py export - --format csv > tasks.csv
+    python task_cli.py changes --since 1200 --follow
+"""
+import argparse
+import csv
+import json
+import sys
+import time
+
+import archive
+import changefeed
+import planner
+import reprioritize
+from metrics import METRICS, PROFILER
+from task_service import (DB_PATH, EXPORT_FORMATS, IMPORT_BATCH_SIZE, SEARCH_LIMIT, TASK_COLUMNS, TaskService,
+                          format_task)
+
+
+def cmd_add(service, args):
+    row = service.add_task(args.title.strip(), args.description.strip(), args.due_date.strip(), args.estimate)
+    print(f"Added task {row[0]} with priority {row[4]}")
+
+
+def cmd_estimate(service, args):
+    if not service.set_estimate(args.task_id, args.hours):
+        print(f"No task with ID {args.task_id}", file=sys.stderr)
+        return 1
+    print(f"Task {args.task_id} estimate set" if args.hours.strip() else f"Task {args.task_id} estimate cleared")
+
+
+def cmd_plan(service, args):
+    plan = service.build_plan(args.capacity, args.order)
+    entries = plan.late(args.limit) if args.late else plan.plan(args.limit)
+    for position, task_id, title, due_date, priority, hours, finish_date, slack in entries:
+        status = f"LATE by {-slack:.1f} h" if slack < -planner.EPSILON else f"{slack:.1f} h slack"
+        print(f"{position:6}. [{task_id}] {title} ({priority}, {hours:g} h) due {due_date}, done {finish_date}, {status}")
+    tasks, hours, days, late = plan.summary()
+    print(f"{tasks} pending tasks, {hours:g} h of work = {days:.1f} days at {args.capacity:g} h/day; "
+          f"{late} will miss their due date", file=sys.stderr)
+
+
+def cmd_list(service, args):
+    for row in service.iter_tasks(args.status, args.priority, args.due_from, args.due_to, display_order=True,
+                                  by_score=args.by_score):
+        print(format_task(row))
+
+
+def cmd_search(service, args):
+    for row in service.search_tasks(args.text, args.limit, args.archived):
+        print(format_task(row))
+
+
+def cmd_complete(service, args):
+    if not service.complete_task(args.task_id):
+        print(f"No pending task with ID {args.task_id}", file=sys.stderr)
+        return 1
+    print(f"Task {args.task_id} marked as completed")
+
+
+def cmd_delete(service, args):
+    if not service.delete_task(args.task_id):
+        print(f"No task with ID {args.task_id}", file=sys.stderr)
+        return 1
+    print(f"Task {args.task_id} deleted")
+
+
+def cmd_due(service, args):
+    for task_id, title, due_date in service.due_tasks(args.days):
+        print(f"Task Reminder: [{task_id}] '{title}' is due on {due_date}")
+
+
+def cmd_import(service, args):
+    def progress(imported, skipped):
+        print(f"\r{imported} imported, {skipped} skipped...", end="", file=sys.stderr, flush=True)
+
+    def on_invalid(number, message):
+        print(f"\nSkipping record {number}: {message}", file=sys.stderr)
+
+    try:
+        imported, skipped = service.import_tasks(args.path, args.batch_size, progress, on_invalid)
+    except (OSError, UnicodeDecodeError, csv.Error) as e:
+        print(f"\nError: import stopped, {e}", file=sys.stderr)
+        return 1
+    print(file=sys.stderr)
+    print(f"Imported {imported} tasks ({skipped} skipped)")
+
+
+def cmd_reprioritize(service, args):
+    def progress(processed, changed, total):
+        print(f"\r{processed}/{total} rescored, {changed} changed...", end="", file=sys.stderr, flush=True)
+
+    processed, changed, skipped = service.reprioritize_all(args.workers, args.chunk_size, progress)
+    print(file=sys.stderr)
+    print(f"Rescored {processed} tasks ({changed} changed, {skipped} edited meanwhile and left as they were)")
+
+
+def cmd_rescore(service, args):
+    def progress(scored, changed):
+        print(f"\r{scored} scored, {changed} changed...", end="", file=sys.stderr, flush=True)
+
+    scored, changed = service.rescore_tasks(progress=progress)
+    print(file=sys.stderr)
+    print(f"Scored {scored} tasks ({changed} changed)")
+
+
+def cmd_archive(service, args):
+    def progress(archived):
+        print(f"\r{archived} archived...", end="", file=sys.stderr, flush=True)
+
+    archived = service.archive_completed(args.days, args.batch_size, progress)
+    print(file=sys.stderr)
+    print(f"Archived {archived} tasks completed more than {args.days} days ago "
+          f"({service.count_archived()} in the archive, {service.count_tasks()} live)")
+
+
+def cmd_export(service, args):
+    count = service.export_tasks(args.path, args.format, status=args.status, priority=args.priority,
+                                 due_from=args.due_from, due_to=args.due_to, include_archived=args.archived)
+    print(f"Exported {count} tasks", file=sys.stderr if args.path == "-" else sys.stdout)
+
+
+def cmd_changes(service, args):
+    if args.prune:
+        print(f"Pruned {service.prune_changes(args.retention)} change log entries")
+        return
+    feed = changefeed.ChangeFeed(service.latest_change() if args.since is None else args.since)
+    try:
+        while True:
+            since = feed.seq
+            rows, deleted_ids, reset = service.poll_changes(feed)
+            if reset:
+                print(f"Changes after {since} were pruned: export everything, then continue with "
+                      f"--since {feed.seq}", file=sys.stderr)
+                return 1
+            for row in rows:
+                print(json.dumps({"op": "upsert", **dict(zip(TASK_COLUMNS, row)), "estimate_hours": row[7]}))
+            for task_id in deleted_ids:
+                print(json.dumps({"op": "delete", "id": task_id}))
+            if feed.more:
+                continue
+            if not args.follow:
+                break
+            sys.stdout.flush()
+            time.sleep(args.interval)
+    except KeyboardInterrupt:
+        pass
+    print(f"Up to change {feed.seq} (continue with --since {feed.seq})", file=sys.stderr)
+
+
+def add_filters(parser):
+    parser.add_argument("--status", choices=["Pending", "Completed"])
+    parser.add_argument("--priority", choices=["High", "Medium", "Low"])
+    parser.add_argument("--due-from", help="earliest due date, YYYY-MM-DD")
+    parser.add_argument("--due-to", help="latest due date, YYYY-MM-DD")
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description="AI Task Scheduler (command line)")
+    parser.add_argument("--db", default=DB_PATH, help="SQLite database file (default: %(default)s)")
+    parser.add_argument("--metrics-file", help="write timings and counters as JSON here on exit")
+    parser.add_argument("--profile", action="store_true", help="sample stacks while running and print a profile to stderr")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    add = commands.add_parser("add", help="add a task")
+    add.add_argument("title")
+    add.add_argument("due_date", help="YYYY-MM-DD")
+    add.add_argument("-d", "--description", default="")
+    add.add_argument("-e", "--estimate", help="effort in hours, for the plan")
+    add.set_defaults(func=cmd_add)
+
+    estimate = commands.add_parser("estimate", help="set a task's effort estimate in hours (\"\" to clear)")
+    estimate.add_argument("task_id", type=int)
+    estimate.add_argument("hours")
+    estimate.set_defaults(func=cmd_estimate)
+
+    plan = commands.add_parser("plan", help="order pending tasks into a work plan and show deadline misses")
+    plan.add_argument("--capacity", type=float, default=planner.DAILY_CAPACITY, help="work hours per day (default: %(default)s)")
+    plan.add_argument("--order", choices=planner.ORDERS, default="edf",
+                      help="earliest deadline first, or least slack per priority weight (default: %(default)s)")
+    plan.add_argument("--late", action="store_true", help="only the tasks that will miss their due date")
+    plan.add_argument("--limit", type=int, help="show at most this many tasks")
+    plan.set_defaults(func=cmd_plan)
+
+    listing = commands.add_parser("list", help="list tasks in priority order")
+    add_filters(listing)
+    listing.add_argument("--by-score", action="store_true", help="highest score first instead of priority, due date")
+    listing.set_defaults(func=cmd_list)
+
+    search = commands.add_parser("search", help="full-text search over titles and descriptions, best matches first")
+    search.add_argument("text")
+    search.add_argument("--limit", type=int, default=SEARCH_LIMIT)
+    search.add_argument("--archived", action="store_true", help="also search archived tasks")
+    search.set_defaults(func=cmd_search)
+
+    complete = commands.add_parser("complete", help="mark a task as done")
+    complete.add_argument("task_id", type=int)
+    complete.set_defaults(func=cmd_complete)
+
+    delete = commands.add_parser("delete", help="delete a task")
+    delete.add_argument("task_id", type=int)
+    delete.set_defaults(func=cmd_delete)
+
+    due = commands.add_parser("due", help="print reminders for pending tasks due soon (for cron)")
+    due.add_argument("--days", type=int, default=1)
+    due.set_defaults(func=cmd_due)
+
+    importer = commands.add_parser("import", help="import tasks from a .csv or .jsonl file")
+    importer.add_argument("path")
+    importer.add_argument("--batch-size", type=int, default=IMPORT_BATCH_SIZE, help="rows per transaction")
+    importer.set_defaults(func=cmd_import)
+
+    rescore = commands.add_parser("reprioritize", help="rescore every task with the current keyword lists and model "
+                                                       "(resumes an interrupted run)")
+    rescore.add_argument("--workers", type=int, help="worker processes (default: one per CPU)")
+    rescore.add_argument("--chunk-size", type=int, default=reprioritize.CHUNK_SIZE, help="task ids per job")
+    rescore.set_defaults(func=cmd_reprioritize)
+
+    scorer = commands.add_parser("rescore", help="update every task's score for today's date (run nightly, e.g. from cron)")
+    scorer.set_defaults(func=cmd_rescore)
+
+    archiver = commands.add_parser("archive", help="move tasks completed a while ago to the archive database")
+    archiver.add_argument("--days", type=int, default=archive.ARCHIVE_AFTER_DAYS,
+                          help="archive tasks completed more than this many days ago (default: %(default)s)")
+    archiver.add_argument("--batch-size", type=int, default=archive.ARCHIVE_BATCH_SIZE, help="tasks per transaction")
+    archiver.set_defaults(func=cmd_archive)
+
+    exporter = commands.add_parser("export", help="stream tasks to a .csv/.jsonl file or - for stdout")
+    exporter.add_argument("path")
+    exporter.add_argument("--format", choices=EXPORT_FORMATS, help="default: from the file extension")
+    add_filters(exporter)
+    exporter.add_argument("--archived", action="store_true", help="also export archived tasks (after the live ones)")
+    exporter.set_defaults(func=cmd_export)
+
+    changes = commands.add_parser("changes", help="print tasks added, changed or deleted after a change number, as JSON lines")
+    changes.add_argument("--since", type=int, help="last change number already seen (default: the newest)")
+    changes.add_argument("--follow", action="store_true", help="keep polling for new changes until interrupted")
+    changes.add_argument("--interval", type=float, default=1.0, help="seconds between polls with --follow")
+    changes.add_argument("--prune", action="store_true", help="instead, drop change log entries older than --retention")
+    changes.add_argument("--retention", type=int, default=changefeed.RETENTION_SECONDS,
+                         help="seconds of changes kept by --prune (default: %(default)s)")
+    changes.set_defaults(func=cmd_changes)
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    if args.profile:
+        PROFILER.start()
+    service = TaskService(args.db, wait_for_model=True)
+    METRICS.add_source("nlp tier", service.classifier.tier_stats)
+    try:
+        return args.func(service, args)
+    except ValueError as e:
+        print(f"Error: {e}", file=sys.stderr)
+        return 2
+    finally:
+        service.close()
+        if args.profile:
+            PROFILER.stop()
+            PROFILER.print_report(file=sys.stderr)
+        if args.metrics_file:
+            METRICS.dump(args.metrics_file)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,443 @@
+import calendar
+import os
+import queue
+import re
+import sqlite3
+import sys
+import threading
+import time
+import weakref
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from functools import lru_cache
+
+from metrics import METRICS
+
+DATE_FORMAT = "%Y-%m-%d"
+
+# WAL lets readers run while the writer commits; with synchronous=NORMAL a commit only
+# appends to the WAL (fsync happens at checkpoints), which is still crash-safe in WAL mode.
+PRAGMAS = (
+    ("journal_mode", "WAL"),
+    ("synchronous", "NORMAL"),
+    ("cache_size", -32000),        # KiB, i.e. 32 MB page cache per connection
+    ("mmap_size", 268435456),      # 256 MB memory-mapped reads
+    ("temp_store", "MEMORY"),
+    ("busy_timeout", 5000),
+)
+# Prepared statements kept per connection; all queries use constant SQL text so they are reused
+STATEMENT_CACHE_SIZE = 256
+READER_COUNT = 4
+# Auto-checkpoints copy the WAL back but can only restart it at a moment no reader is using it;
+# with several processes reading nonstop that moment never comes and the WAL grows without end.
+# Every WAL_CHECK_INTERVAL commits the writer checks the WAL, and past WAL_LIMIT bytes waits
+# (up to busy_timeout) for the readers to let go and truncates it.
+WAL_CHECK_INTERVAL = 500
+WAL_LIMIT = 64 * 2 ** 20
+# Every connection opened by connect() that is still referenced somewhere, for leak checks
+_connections = weakref.WeakSet()
+_connections_lock = threading.Lock()
+
+PRIORITY_RANKS = {"High": 1, "Medium": 2, "Low": 3}
+
+CREATE_TASKS = '''
+    CREATE TABLE IF NOT EXISTS tasks (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        title TEXT NOT NULL,
+        description TEXT,
+        due_date TEXT NOT NULL,
+        priority TEXT NOT NULL,
+        status TEXT DEFAULT 'Pending',
+        ai_reason TEXT
+    )
+'''
+
+# Each entry upgrades the schema from version N-1 to N (tracked in PRAGMA user_version).
+# Never edit a released migration; append a new one instead.
+MIGRATIONS = [
+    # 1: typed sort/filter columns plus indexes for refresh_tasks and check_tasks.
+    # The columns are generated from priority/due_date, so no writer has to maintain them.
+    [
+        '''
+        ALTER TABLE tasks ADD COLUMN priority_rank INTEGER
+            GENERATED ALWAYS AS (CASE priority WHEN 'High' THEN 1 WHEN 'Medium' THEN 2 WHEN 'Low' THEN 3 END) VIRTUAL
+        ''',
+        '''
+        ALTER TABLE tasks ADD COLUMN due_epoch INTEGER
+            GENERATED ALWAYS AS (CAST(strftime('%s', due_date) AS INTEGER)) VIRTUAL
+        ''',
+        "CREATE INDEX IF NOT EXISTS idx_tasks_status_due ON tasks (status, due_epoch)",
+        "CREATE INDEX IF NOT EXISTS idx_tasks_rank_due ON tasks (priority_rank, due_epoch)",
+    ],
+    # 2: reminders already delivered, so each one fires once across restarts
+    [
+        '''
+        CREATE TABLE IF NOT EXISTS reminder_log (
+            task_id INTEGER NOT NULL,
+            due_epoch INTEGER NOT NULL,
+            lead INTEGER NOT NULL,
+            fired_at INTEGER,
+            PRIMARY KEY (task_id, due_epoch, lead)
+        )
+        ''',
+    ],
+    # 3: full-text index over title and description (external content: the text lives only in tasks).
+    # Triggers keep it in sync; status-only updates do not touch it. Title matches rank 10x higher.
+    # A row in fts_paused turns the insert trigger off for ConnectionPool.insert_tasks.
+    [
+        '''
+        CREATE VIRTUAL TABLE IF NOT EXISTS tasks_fts USING fts5(
+            title, description,
+            content='tasks', content_rowid='id',
+            tokenize='unicode61 remove_diacritics 2', prefix='2 3'
+        )
+        ''',
+        "CREATE TABLE IF NOT EXISTS fts_paused (paused INTEGER)",
+        '''
+        CREATE TRIGGER IF NOT EXISTS tasks_fts_insert AFTER INSERT ON tasks
+        WHEN NOT EXISTS (SELECT 1 FROM fts_paused) BEGIN
+            INSERT INTO tasks_fts (rowid, title, description) VALUES (new.id, new.title, new.description);
+        END
+        ''',
+        '''
+        CREATE TRIGGER IF NOT EXISTS tasks_fts_delete AFTER DELETE ON tasks BEGIN
+            INSERT INTO tasks_fts (tasks_fts, rowid, title, description) VALUES ('delete', old.id, old.title, old.description);
+        END
+        ''',
+        '''
+        CREATE TRIGGER IF NOT EXISTS tasks_fts_update AFTER UPDATE OF title, description ON tasks BEGIN
+            INSERT INTO tasks_fts (tasks_fts, rowid, title, description) VALUES ('delete', old.id, old.title, old.description);
+            INSERT INTO tasks_fts (rowid, title, description) VALUES (new.id, new.title, new.description);
+        END
+        ''',
+        "INSERT INTO tasks_fts (tasks_fts, rank) VALUES ('rank', 'bm25(10.0, 1.0)')",
+        "INSERT INTO tasks_fts (tasks_fts) VALUES ('rebuild')",
+    ],
+    # 4: checkpoint of an interrupted reprioritize run (every id <= last_id has been rescored
+    # with the keyword lists and model identified by fingerprint)
+    [
+        '''
+        CREATE TABLE IF NOT EXISTS reprioritize_progress (
+            fingerprint TEXT PRIMARY KEY,
+            last_id INTEGER NOT NULL,
+            processed INTEGER NOT NULL DEFAULT 0,
+            changed INTEGER NOT NULL DEFAULT 0
+        )
+        ''',
+    ],
+    # 5: optional effort estimate in hours for planner.Planner (NULL: planner.DEFAULT_ESTIMATE)
+    [
+        "ALTER TABLE tasks ADD COLUMN estimate_hours REAL",
+    ],
+    # 6: when a task was completed (epoch seconds), so archive.py can tell how long it has been done.
+    # NULL for tasks completed before this version; the archiver falls back to their due date.
+    [
+        "ALTER TABLE tasks ADD COLUMN completed_at INTEGER",
+    ],
+    # 7: continuous priority score from scoring.py, indexed for listing a status by score, and the
+    # keyword features it was computed from (a bitmask), so the nightly rescoring never re-reads
+    # the text; score_state holds the day of the last rescoring. Existing rows stay NULL until
+    # the first scoring.rescore_all fills them in.
+    [
+        "ALTER TABLE tasks ADD COLUMN score REAL",
+        "ALTER TABLE tasks ADD COLUMN score_features INTEGER",
+        "CREATE INDEX IF NOT EXISTS idx_tasks_status_score ON tasks (status, score)",
+        "CREATE TABLE IF NOT EXISTS score_state (day INTEGER NOT NULL)",
+    ],
+    # 8: change log for changefeed.ChangeFeed. Triggers record every insert, delete and update of a
+    # displayed column, from any connection or process, under a monotonic sequence number
+    # (AUTOINCREMENT never reuses one, also after changefeed.prune). changed_at is for pruning.
+    [
+        '''
+        CREATE TABLE IF NOT EXISTS task_changes (
+            seq INTEGER PRIMARY KEY AUTOINCREMENT,
+            task_id INTEGER NOT NULL,
+            op TEXT NOT NULL,
+            changed_at INTEGER NOT NULL DEFAULT (CAST(strftime('%s', 'now') AS INTEGER))
+        )
+        ''',
+        '''
+        CREATE TRIGGER IF NOT EXISTS tasks_changes_insert AFTER INSERT ON tasks BEGIN
+            INSERT INTO task_changes (task_id, op) VALUES (new.id, 'insert');
+        END
+        ''',
+        '''
+        CREATE TRIGGER IF NOT EXISTS tasks_changes_update
+        AFTER UPDATE OF title, description, due_date, priority, status, ai_reason ON tasks BEGIN
+            INSERT INTO task_changes (task_id, op) VALUES (new.id, 'update');
+        END
+        ''',
+        '''
+        CREATE TRIGGER IF NOT EXISTS tasks_changes_delete AFTER DELETE ON tasks BEGIN
+            INSERT INTO task_changes (task_id, op) VALUES (old.id, 'delete');
+        END
+        ''',
+    ],
+    # 9: rows a reprioritize run left alone because the task was edited after a worker read it
+    [
+        "ALTER TABLE reprioritize_progress ADD COLUMN skipped INTEGER NOT NULL DEFAULT 0",
+    ],
+    # 10: log estimate changes too, so other processes' plans pick them up
+    [
+        "DROP TRIGGER IF EXISTS tasks_changes_update",
+        '''
+        CREATE TRIGGER tasks_changes_update
+        AFTER UPDATE OF title, description, due_date, priority, status, ai_reason, estimate_hours ON tasks BEGIN
+            INSERT INTO task_changes (task_id, op) VALUES (new.id, 'update');
+        END
+        ''',
+    ],
+]
+
+SCHEMA_VERSION = len(MIGRATIONS)
+
+# Completed tasks moved out of the live table by archive.py, in a second database file attached
+# to every pool connection as "archive". Rows are only ever appended and read back, so the table
+# has no generated columns or secondary indexes, just the full-text index search needs.
+ARCHIVE_SCHEMA = [
+    '''
+    CREATE TABLE IF NOT EXISTS archive.tasks (
+        id INTEGER PRIMARY KEY,
+        title TEXT NOT NULL,
+        description TEXT,
+        due_date TEXT NOT NULL,
+        priority TEXT NOT NULL,
+        status TEXT,
+        ai_reason TEXT,
+        estimate_hours REAL,
+        completed_at INTEGER,
+        archived_at INTEGER NOT NULL
+    )
+    ''',
+    '''
+    CREATE VIRTUAL TABLE IF NOT EXISTS archive.tasks_fts USING fts5(
+        title, description,
+        content='tasks', content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2', prefix='2 3'
+    )
+    ''',
+    "INSERT INTO archive.tasks_fts (tasks_fts, rank) VALUES ('rank', 'bm25(10.0, 1.0)')",
+]
+
+
+@lru_cache(maxsize=STATEMENT_CACHE_SIZE)
+def statement_name(sql):
+    """Metric name of a statement: its SQL on one line, shortened"""
+    text = " ".join(sql.split())
+    return "db " + (text if len(text) <= 80 else text[:77] + "...")
+
+
+class InstrumentedConnection(sqlite3.Connection):
+    """sqlite3 connection that records the latency of every execute/executemany in METRICS
+
+    The time covers running the statement up to its first row; rows fetched later are not included.
+    """
+
+    def execute(self, sql, parameters=()):
+        started = time.perf_counter()
+        try:
+            return super().execute(sql, parameters)
+        finally:
+            METRICS.record(statement_name(sql), time.perf_counter() - started)
+
+    def executemany(self, sql, seq_of_parameters):
+        started = time.perf_counter()
+        try:
+            return super().executemany(sql, seq_of_parameters)
+        finally:
+            METRICS.record(statement_name(sql), time.perf_counter() - started)
+
+
+def archive_path(db_path):
+    """File of the archive database that belongs to db_path: tasks.db -> tasks_archive.db"""
+    root, extension = os.path.splitext(db_path)
+    return f"{root}_archive{extension or '.db'}"
+
+
+def connect(db_path, check_same_thread=True, archive=None):
+    """Open a connection with the tuned pragmas applied, attaching the archive file if one is given"""
+    conn = sqlite3.connect(db_path, check_same_thread=check_same_thread, cached_statements=STATEMENT_CACHE_SIZE,
+                           factory=InstrumentedConnection)
+    for name, value in PRAGMAS:
+        conn.execute(f"PRAGMA {name} = {value}")
+    if archive is not None:
+        conn.execute("ATTACH DATABASE ? AS archive", (archive,))
+        conn.execute("PRAGMA archive.synchronous = NORMAL")  # per schema: the PRAGMAS above only set main's
+    with _connections_lock:
+        _connections.add(conn)
+    return conn
+
+
+def open_connections():
+    """Connections from connect() that are neither closed nor garbage-collected (a growing count is a leak)"""
+    with _connections_lock:
+        connections = list(_connections)
+    count = 0
+    for conn in connections:
+        try:
+            conn.total_changes
+        except sqlite3.ProgrammingError:  # closed
+            continue
+        count += 1
+    return count
+
+
+class ConnectionPool:
+    """A single writer connection plus a small pool of reader connections
+
+    SQLite allows one writer at a time, so writes are serialized on a lock instead of failing
+    with "database is locked"; in WAL mode readers never wait for it. Connections may be used
+    from any thread, but only by one thread at a time (the pool guarantees that). Unless
+    archive=False, every connection has the archive database (archive_path) attached.
+    """
+
+    def __init__(self, db_path, readers=READER_COUNT, archive=True):
+        self.db_path = db_path
+        self.archive_path = archive_path(db_path) if archive else None
+        self._writer = connect(db_path, check_same_thread=False, archive=self.archive_path)
+        self._write_lock = threading.Lock()
+        self._readers = queue.LifoQueue()
+        for _ in range(readers):
+            self._readers.put(connect(db_path, check_same_thread=False, archive=self.archive_path))
+        self.size = readers
+        self._commits = 0
+
+    @contextmanager
+    def write(self):
+        """Yield the writer connection inside a transaction (commit on success, rollback on error)"""
+        with self._write_lock:
+            try:
+                yield self._writer
+                self._writer.commit()
+            except BaseException:
+                self._writer.rollback()
+                raise
+            self._commits += 1
+            if self._commits % WAL_CHECK_INTERVAL == 0:
+                self._limit_wal()
+
+    def _limit_wal(self):
+        try:
+            size = os.path.getsize(self.db_path + "-wal")
+        except OSError:
+            return
+        if size <= WAL_LIMIT:
+            return
+        started = time.perf_counter()
+        busy = self._writer.execute("PRAGMA main.wal_checkpoint(TRUNCATE)").fetchone()[0]
+        METRICS.count("db wal truncated" if not busy else "db wal truncate busy")
+        print(f"[DB] WAL at {size / 2 ** 20:.0f} MB, {'truncated' if not busy else 'still in use, not truncated'} "
+              f"in {time.perf_counter() - started:.2f} s", file=sys.stderr)
+
+    def insert_tasks(self, rows):
+        """Insert (title, description, due_date, priority, ai_reason, score, score_features) rows as pending tasks
+        in one transaction
+
+        Returns the highest id before the insert; the new rows got the ids after it.
+        FTS5 flushes its pending terms at every trigger savepoint, so indexing row by row made
+        bulk inserts ~15x slower. Here the insert trigger is paused and the new rows are indexed
+        with one statement; the pause is never visible outside the transaction.
+        """
+        with self.write() as conn:
+            last_id = conn.execute("SELECT COALESCE(MAX(id), 0) FROM tasks").fetchone()[0]
+            conn.execute("INSERT INTO fts_paused VALUES (1)")
+            conn.executemany('''
+                INSERT INTO tasks (title, description, due_date, priority, status, ai_reason, score, score_features)
+                VALUES (?, ?, ?, ?, 'Pending', ?, ?, ?)
+            ''', rows)
+            conn.execute("DELETE FROM fts_paused")
+            conn.execute(
+                "INSERT INTO tasks_fts (rowid, title, description) SELECT id, title, description FROM tasks WHERE id > ?",
+                (last_id,)
+            )
+        return last_id
+
+    @contextmanager
+    def read(self):
+        conn = self._readers.get()
+        try:
+            yield conn
+        finally:
+            self._readers.put(conn)
+
+    def close(self):
+        with self._write_lock:
+            self._writer.close()
+        for _ in range(self.size):
+            self._readers.get().close()
+
+
+def schema_version(conn):
+    return conn.execute("PRAGMA user_version").fetchone()[0]
+
+
+def migrate(conn):
+    """Upgrade an existing database in place; each migration runs in its own transaction"""
+    version = schema_version(conn)
+    for target, statements in enumerate(MIGRATIONS[version:], start=version + 1):
+        conn.execute("BEGIN")
+        try:
+            for statement in statements:
+                conn.execute(statement)
+            conn.execute(f"PRAGMA user_version = {target}")
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        print(f"[DB] Migrated schema to version {target}", file=sys.stderr)
+    return schema_version(conn)
+
+
+def has_archive(conn):
+    return any(row[1] == "archive" for row in conn.execute("PRAGMA database_list"))
+
+
+def init_schema(conn):
+    """Create the tasks table if needed and bring it up to SCHEMA_VERSION (and the archive schema, if attached)"""
+    conn.execute(CREATE_TASKS)
+    conn.commit()
+    version = migrate(conn)
+    if has_archive(conn):
+        conn.execute("PRAGMA archive.journal_mode = WAL")
+        for statement in ARCHIVE_SCHEMA:
+            conn.execute(statement)
+        conn.commit()
+    return version
+
+
+def fts_query(text):
+    """FTS5 MATCH expression for search-box text: every word must match, the last one as a prefix
+
+    Words are quoted, so FTS5 operators typed by the user (AND, NEAR, *, ...) are taken literally.
+    Returns None when the text has no searchable words.
+    """
+    words = re.findall(r"\w+", text)
+    if not words:
+        return None
+    return " ".join(f'"{word}"' for word in words) + "*"
+
+
+def date_to_epoch(date_str):
+    """Same value as the due_epoch column: midnight of the date, timezone-naive"""
+    return calendar.timegm(datetime.strptime(date_str, DATE_FORMAT).timetuple())
+
+
+def datetime_to_epoch(moment):
+    return calendar.timegm(moment.timetuple())
+
+
+def epoch_to_date(epoch):
+    return (datetime(1970, 1, 1) + timedelta(seconds=epoch)).strftime(DATE_FORMAT)
+
+
+def sort_key(task_id, priority_rank, due_epoch):
+    """Python equivalent of ORDER BY priority_rank, due_epoch, id (NULLs first, like SQLite)"""
+    return (
+        0 if priority_rank is None else priority_rank,
+        float("-inf") if due_epoch is None else due_epoch,
+        int(task_id),
+    )
+
+
+def task_sort_key(task_id, priority, due_date):
+    return sort_key(task_id, PRIORITY_RANKS.get(priority), date_to_epoch(due_date))
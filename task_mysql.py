@@ -0,0 +1,269 @@
+import os
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from datetime import date
+from functools import lru_cache
+
+import mysql.connector
+from mysql.connector import pooling
+from mysql.connector.constants import ClientFlag
+
+from metrics import METRICS
+from task_db import statement_name
+
+# Connection settings; override with environment variables instead of editing the code
+MYSQL_CONFIG = {
+    "host": os.environ.get("TASKS_MYSQL_HOST", "localhost"),
+    "port": int(os.environ.get("TASKS_MYSQL_PORT", "3306")),
+    "user": os.environ.get("TASKS_MYSQL_USER", "root"),
+    "password": os.environ.get("TASKS_MYSQL_PASSWORD", ""),
+    "database": os.environ.get("TASKS_MYSQL_DATABASE", "task_scheduler"),
+}
+POOL_SIZE = int(os.environ.get("TASKS_MYSQL_POOL_SIZE", "5"))
+# Tries (and seconds between them) to get a working connection after the server went away
+RECONNECT_ATTEMPTS = 3
+RECONNECT_DELAY = 1.0
+
+CREATE_TASKS = '''
+    CREATE TABLE IF NOT EXISTS tasks (
+        id INT AUTO_INCREMENT PRIMARY KEY,
+        title VARCHAR(255) NOT NULL,
+        description TEXT,
+        due_date DATE NOT NULL,
+        priority VARCHAR(50) NOT NULL,
+        status VARCHAR(50) DEFAULT 'Pending',
+        ai_reason TEXT
+    )
+'''
+
+# Same idea as task_db.MIGRATIONS, tracked in a schema_version table because MySQL has no
+# user_version. DDL commits implicitly in MySQL, so keep each migration to one ALTER statement.
+MIGRATIONS = [
+    # 1: the generated sort/filter columns and indexes task_db adds in its migration 1.
+    # 719528 is TO_DAYS('1970-01-01'); UNIX_TIMESTAMP() is not allowed here (depends on time_zone).
+    [
+        '''
+        ALTER TABLE tasks
+            ADD COLUMN priority_rank TINYINT
+                AS (CASE priority WHEN 'High' THEN 1 WHEN 'Medium' THEN 2 WHEN 'Low' THEN 3 END) VIRTUAL,
+            ADD COLUMN due_epoch BIGINT
+                AS ((TO_DAYS(due_date) - 719528) * 86400) VIRTUAL,
+            ADD INDEX idx_tasks_status_due (status, due_epoch),
+            ADD INDEX idx_tasks_rank_due (priority_rank, due_epoch)
+        ''',
+    ],
+    # 2: effort estimate for the planner, as task_db migration 5
+    [
+        "ALTER TABLE tasks ADD COLUMN estimate_hours DOUBLE",
+    ],
+    # 3: completion time, as task_db migration 6 (archiving itself is SQLite-only)
+    [
+        "ALTER TABLE tasks ADD COLUMN completed_at BIGINT",
+    ],
+    # 4: priority score and its keyword features, as task_db migration 7 (written on every add, edit
+    # and completion; the nightly scoring.rescore_all pass is SQLite-only)
+    [
+        '''
+        ALTER TABLE tasks
+            ADD COLUMN score DOUBLE,
+            ADD COLUMN score_features INT,
+            ADD INDEX idx_tasks_status_score (status, score)
+        ''',
+    ],
+]
+
+SCHEMA_VERSION = len(MIGRATIONS)
+
+
+@lru_cache(maxsize=256)
+def _format_style(sql):
+    """Rewrite SQLite's ? placeholders to mysql.connector's %s"""
+    return sql.replace("?", "%s")
+
+
+def _row(row):
+    # DATE columns come back as datetime.date; the SQLite path (and the GUI) use YYYY-MM-DD text
+    if row is None:
+        return None
+    return tuple(value.isoformat() if isinstance(value, date) else value for value in row)
+
+
+class Cursor:
+    """Cursor wrapper returning rows in the same form as sqlite3"""
+
+    def __init__(self, cursor):
+        self._cursor = cursor
+
+    @property
+    def lastrowid(self):
+        return self._cursor.lastrowid
+
+    @property
+    def rowcount(self):
+        return self._cursor.rowcount
+
+    def fetchone(self):
+        return _row(self._cursor.fetchone())
+
+    def fetchmany(self, size):
+        return [_row(row) for row in self._cursor.fetchmany(size)]
+
+    def fetchall(self):
+        return [_row(row) for row in self._cursor.fetchall()]
+
+    def close(self):
+        self._cursor.close()
+
+
+class Connection:
+    """A pooled mysql.connector connection with the sqlite3 shortcut methods TaskService uses
+
+    Cursors are unbuffered, so rows stay on the server until fetched: fetchmany() streams a large
+    listing chunk by chunk instead of loading the whole result set into memory.
+    """
+
+    def __init__(self, conn):
+        self._conn = conn
+
+    def execute(self, sql, params=()):
+        started = time.perf_counter()
+        try:
+            cursor = self._conn.cursor()
+            cursor.execute(_format_style(sql), tuple(params))
+            return Cursor(cursor)
+        finally:
+            METRICS.record(statement_name(sql), time.perf_counter() - started)
+
+    def executemany(self, sql, rows):
+        started = time.perf_counter()
+        try:
+            cursor = self._conn.cursor()
+            cursor.executemany(_format_style(sql), list(rows))
+            return Cursor(cursor)
+        finally:
+            METRICS.record(statement_name(sql), time.perf_counter() - started)
+
+    def commit(self):
+        self._conn.commit()
+
+    def rollback(self):
+        self._conn.rollback()
+
+
+class ConnectionPool:
+    """MySQL counterpart of task_db.ConnectionPool (same read()/write() interface)
+
+    Wraps mysql.connector.pooling.MySQLConnectionPool. That pool raises instead of waiting when
+    every connection is in use, so checkouts are bounded by a semaphore. A connection that lost
+    its server is reconnected on checkout, retrying RECONNECT_ATTEMPTS times. InnoDB handles
+    concurrent writers itself, so unlike SQLite there is no write lock.
+    """
+
+    def __init__(self, config=None, size=POOL_SIZE, reconnect_attempts=RECONNECT_ATTEMPTS,
+                 reconnect_delay=RECONNECT_DELAY):
+        self.size = size
+        self.reconnect_attempts = reconnect_attempts
+        self.reconnect_delay = reconnect_delay
+        self._pool = pooling.MySQLConnectionPool(
+            pool_name=f"tasks-{id(self)}",
+            pool_size=size,
+            pool_reset_session=True,
+            # Lets a connection be reused after a listing was abandoned half-read
+            consume_results=True,
+            autocommit=False,
+            # rowcount counts matched rows, as in SQLite, not only the ones actually changed
+            client_flags=[ClientFlag.FOUND_ROWS],
+            **(config or MYSQL_CONFIG)
+        )
+        self._slots = threading.BoundedSemaphore(size)
+
+    def _checkout(self):
+        self._slots.acquire()
+        for attempt in range(1, self.reconnect_attempts + 1):
+            try:
+                return self._pool.get_connection()
+            except (mysql.connector.InterfaceError, mysql.connector.OperationalError) as e:
+                if attempt == self.reconnect_attempts:
+                    self._slots.release()
+                    raise
+                print(f"[DB] Reconnecting to MySQL ({attempt}/{self.reconnect_attempts}): {e}", file=sys.stderr)
+                time.sleep(self.reconnect_delay)
+            except BaseException:
+                self._slots.release()
+                raise
+
+    def _checkin(self, conn):
+        try:
+            conn.close()  # returns it to the pool
+        except mysql.connector.Error as e:
+            print(f"[DB] Could not reset a MySQL connection, it reconnects on next use: {e}", file=sys.stderr)
+        finally:
+            self._slots.release()
+
+    @contextmanager
+    def write(self):
+        """Yield a connection inside a transaction (commit on success, rollback on error)"""
+        conn = self._checkout()
+        try:
+            yield Connection(conn)
+            conn.commit()
+        except BaseException:
+            try:
+                conn.rollback()
+            except mysql.connector.Error:
+                pass  # the connection is gone, and the transaction with it
+            raise
+        finally:
+            self._checkin(conn)
+
+    def insert_tasks(self, rows):
+        """Insert (title, description, due_date, priority, ai_reason, score, score_features) rows as pending tasks
+        in one transaction
+
+        Returns the highest id before the insert, like task_db.ConnectionPool.insert_tasks.
+        """
+        with self.write() as conn:
+            last_id = conn.execute("SELECT COALESCE(MAX(id), 0) FROM tasks").fetchone()[0]
+            conn.executemany('''
+                INSERT INTO tasks (title, description, due_date, priority, status, ai_reason, score, score_features)
+                VALUES (?, ?, ?, ?, 'Pending', ?, ?, ?)
+            ''', rows)
+        return last_id
+
+    @contextmanager
+    def read(self):
+        conn = self._checkout()
+        try:
+            yield Connection(conn)
+        finally:
+            self._checkin(conn)
+
+    def close(self):
+        """Disconnect every pooled connection, waiting for those in use to be returned first"""
+        for _ in range(self.size):
+            self._slots.acquire()
+            try:
+                self._pool.get_connection().disconnect()
+            except mysql.connector.Error:
+                pass  # lost its server and could not reconnect: nothing left to close
+
+
+def schema_version(conn):
+    conn.execute("CREATE TABLE IF NOT EXISTS schema_version (version INT NOT NULL)")
+    return conn.execute("SELECT COALESCE(MAX(version), 0) FROM schema_version").fetchone()[0]
+
+
+def init_schema(pool):
+    """Create the tasks table if needed and bring it up to SCHEMA_VERSION"""
+    with pool.write() as conn:
+        conn.execute(CREATE_TASKS)
+        version = schema_version(conn)
+    for target, statements in enumerate(MIGRATIONS[version:], start=version + 1):
+        with pool.write() as conn:
+            for statement in statements:
+                conn.execute(statement)
+            conn.execute("INSERT INTO schema_version (version) VALUES (?)", (target,))
+        print(f"[DB] Migrated MySQL schema to version {target}", file=sys.stderr)
+    return max(version, SCHEMA_VERSION)
@@ -2,16 +2,10 @@ import tkinter as tk
 from tkinter import ttk, messagebox
 import sqlite3
 import threading
-import spacy
+import time
 from datetime import datetime
 import ttkbootstrap as tb  # Modern UI
-
-# Load NLP model
-try:
-    nlp = spacy.load("en_core_web_sm")
-except OSError:
-    messagebox.showerror("Error", "SpaCy model not found! Run: python -m spacy download en_core_web_sm")
-    exit()
+from task_ai import ModelLoader, PriorityClassifier
 
 class TaskScheduler:
     def __init__(self, root):
@@ -26,6 +20,11 @@ class TaskScheduler:
         self.init_database()
         self.create_gui()
 
+        # Load the NLP model off the UI thread; keyword priorities are used until it is ready
+        self.nlp_loader = ModelLoader(on_error=self.on_model_error)
+        self.classifier = PriorityClassifier()
+        self.root.after_idle(self.nlp_loader.start)
+
         # Start background thread for checking tasks
         self.checker_thread = threading.Thread(target=self.check_tasks, daemon=True)
         self.checker_thread.start()
@@ -49,13 +48,11 @@ class TaskScheduler:
 
     def ai_prioritize_task(self, description):
         """Use NLP to determine task priority"""
-        doc = nlp(description.lower())
-        priority = "Low"
-        if any(word in description.lower() for word in ["urgent", "critical", "deadline", "important"]):
-            priority = "High"
-        elif any(token.lemma_ in ["soon", "priority", "major"] for token in doc):
-            priority = "Medium"
-        return priority, "NLP-based priority assignment"
+        return self.classifier.prioritize(description, self.nlp_loader.nlp)
+
+    def on_model_error(self, error):
+        """Report a missing SpaCy model without blocking startup"""
+        self.root.after(0, lambda: messagebox.showerror("Error", "SpaCy model not found! Run: python -m spacy download en_core_web_sm"))
 
     def validate_date(self, date_str):
         """Validate date format (YYYY-MM-DD)"""
@@ -196,7 +193,9 @@ class TaskScheduler:
             threading.Event().wait(3600)  # Check every hour
 
 if __name__ == "__main__":
+    startup_began = time.perf_counter()
     root = tb.Window(themename="superhero")
     app = TaskScheduler(root)
+    root.after_idle(lambda: print(f"[Startup] Window ready in {(time.perf_counter() - startup_began) * 1000:.0f} ms"))
     root.mainloop()
 
@@ -1,17 +1,39 @@
 import tkinter as tk
-from tkinter import ttk, messagebox
-import sqlite3
-import threading
-import spacy
-from datetime import datetime
+from tkinter import ttk, messagebox, filedialog
+import os
+import sys
+import time
+from bisect import bisect_left
+from datetime import date, datetime, timedelta
 import ttkbootstrap as tb
-
-# Load NLP model
-try:
-    nlp = spacy.load("en_core_web_sm")
-except OSError:
-    messagebox.showerror("Error", "SpaCy model not found! Please install it using:\npip install spacy\npython -m spacy download en_core_web_sm")
-    exit()
+import task_db
+from changefeed import ChangeFeed, latest_seq
+from metrics import DUMP_INTERVAL, METRICS, PROFILER
+from notifications import NotificationCenter, Toast
+from planner import DAILY_CAPACITY, EPSILON, ORDERS
+from reminders import ReminderEngine, LEAD_TIMES
+from task_ai import ModelLoader, PriorityCache, PriorityClassifier
+from task_service import DB_PATH, SEARCH_LIMIT, TaskService, parse_estimate, validate_task
+from task_store import TaskStore
+from workers import DbWorker, UiQueue
+
+# The task list is fetched in keyset-paginated pages as the user scrolls
+PAGE_SIZE = 100
+PREFETCH_ROWS = 50
+# Typing pause before the search box queries the full-text index
+SEARCH_DELAY_MS = 250
+# How often the stats window re-reads METRICS
+STATS_REFRESH_MS = 1000
+# Choices of the status filter above the list ("All" shows every task)
+STATUS_FILTERS = ("All", "Pending", "Completed")
+# Plan entries shown in the plan window
+PLAN_ROWS = 500
+# How often long-completed tasks are moved to the archive database (also once at startup)
+ARCHIVE_INTERVAL_MS = 3600 * 1000
+# Scores are brought up to date at startup and this long after every midnight
+RESCORE_AFTER_MIDNIGHT_MS = 60 * 1000
+# How often the change log is polled for writes made by other processes
+CHANGE_POLL_MS = 1000
 
 class TaskScheduler:
     def __init__(self, root):
@@ -24,43 +46,57 @@ class TaskScheduler:
         self.style.configure("Treeview.Heading", font=("Segoe UI", 10, "bold"))
         self.style.configure("Treeview", rowheight=30, font=("Segoe UI", 10))
 
+        # Worker, loader and reminder threads hand their callbacks to the Tk thread through this queue
+        self.ui = UiQueue(self.root)
+
+        # Load the NLP model off the UI thread; keyword priorities are used until it is ready
+        self.nlp_loader = ModelLoader(on_error=self.on_model_error)
+        self.root.after_idle(self.nlp_loader.start)
+
         self.init_database()
         self.create_gui()
 
-        self.checker_thread = threading.Thread(target=self.check_tasks, daemon=True)
-        self.checker_thread.start()
+        # Reminders are coalesced into one non-modal digest at a time instead of a dialog each
+        self.notifications = NotificationCenter(self.ui, Toast(self.root).show)
+        self.reminders = ReminderEngine(DB_PATH, self.on_reminder, LEAD_TIMES)
+        self.reminders.start()
+        self.root.after(CHANGE_POLL_MS, self.poll_changes)
+
+        METRICS.add_source("nlp tier", self.classifier.tier_stats)
+        METRICS.add_source("ai cache", self.priority_cache.stats)
+        METRICS.add_source("reminders", self.reminders.stats)
+        # Periodic JSON dump of the metrics, e.g. TASK_METRICS_FILE=metrics.json
+        metrics_file = os.environ.get("TASK_METRICS_FILE")
+        if metrics_file:
+            METRICS.start_dump(metrics_file, float(os.environ.get("TASK_METRICS_INTERVAL", DUMP_INTERVAL)))
 
     def init_database(self):
-        self.conn = sqlite3.connect('tasks.db')
-        self.cursor = self.conn.cursor()
-        self.cursor.execute('''
-            CREATE TABLE IF NOT EXISTS tasks (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                title TEXT NOT NULL,
-                description TEXT,
-                due_date TEXT NOT NULL,
-                priority TEXT NOT NULL,
-                status TEXT DEFAULT 'Pending',
-                ai_reason TEXT
-            )
-        ''')
-        self.conn.commit()
-
-    def ai_prioritize_task(self, description):
-        doc = nlp(description.lower())
-        priority = "Low"
-        if any(word in description.lower() for word in ["urgent", "critical", "deadline", "important"]):
-            priority = "High"
-        elif any(token.lemma_ in ["soon", "priority", "major"] for token in doc):
-            priority = "Medium"
-        return priority, "NLP-based priority assignment"
-
-    def validate_date(self, date_str):
-        try:
-            datetime.strptime(date_str, "%Y-%m-%d")
-            return True
-        except ValueError:
-            return False
+        # One WAL writer plus a few readers, shared by the worker threads below
+        self.pool = task_db.ConnectionPool(DB_PATH)
+        with self.pool.write() as conn:
+            task_db.init_schema(conn)
+        # All other database and NLP work runs on worker threads, each through its own TaskService
+        self.priority_cache = PriorityCache(DB_PATH)
+        self.classifier = PriorityClassifier(self.priority_cache)
+        # Every task in memory once loaded; until then the list pages come from SQL
+        self.store = TaskStore()
+        service = lambda: TaskService(DB_PATH, self.classifier, self.nlp_loader, pool=self.pool, store=self.store)
+        self.worker = DbWorker(self.ui, service)
+        # Long streaming reads (exports, console dumps) get their own worker so edits never queue behind them
+        self.export_worker = DbWorker(self.ui, service)
+        # Searches as the user types, so they never wait behind edits or exports either
+        self.search_worker = DbWorker(self.ui, service)
+        # Other windows, the CLI and cron jobs write the same file; their changes arrive through the
+        # change log. The position is taken before anything is loaded, so no change is missed.
+        with self.pool.read() as conn:
+            self.changes = ChangeFeed(latest_seq(conn))
+        # Fill the task store in the background; the first page does not wait for it
+        self.export_worker.submit(TaskService.load_store)
+        self.archive_completed()
+        self.rescore_tasks()
+
+    def on_model_error(self, error):
+        self.ui.after(0, lambda: messagebox.showerror("Error", "SpaCy model not found! Please install it using:\npip install spacy\npython -m spacy download en_core_web_sm"))
 
     def create_gui(self):
         frame = tb.Frame(self.root, padding=20)
@@ -80,7 +116,10 @@ class TaskScheduler:
 
         tb.Label(frame, text="Due Date (YYYY-MM-DD):", font=("Segoe UI", 11)).grid(row=3, column=0, sticky="e", padx=5, pady=5)
         self.date_var = tk.StringVar()
-        tb.Entry(frame, textvariable=self.date_var, width=45).grid(row=3, column=1, columnspan=3, sticky="w", padx=5, pady=5)
+        tb.Entry(frame, textvariable=self.date_var, width=20).grid(row=3, column=1, sticky="w", padx=5, pady=5)
+        tb.Label(frame, text="Estimate (hours):", font=("Segoe UI", 11)).grid(row=3, column=2, sticky="e", padx=5, pady=5)
+        self.estimate_var = tk.StringVar()
+        tb.Entry(frame, textvariable=self.estimate_var, width=8).grid(row=3, column=3, sticky="w", padx=5, pady=5)
 
         # Buttons Frame
         button_frame = tb.Frame(frame)
@@ -91,19 +130,59 @@ class TaskScheduler:
         tb.Button(button_frame, text="Mark as Done", bootstyle="warning-outline", width=14, command=self.mark_task_done).pack(side="left", padx=6)
         tb.Button(button_frame, text="Delete Task", bootstyle="danger-outline", width=14, command=self.delete_task).pack(side="left", padx=6)
         tb.Button(button_frame, text="View in Console", bootstyle="info-outline", width=14, command=self.view_tasks_in_console).pack(side="left", padx=6)
+        tb.Button(button_frame, text="Export", bootstyle="info-outline", width=8, command=self.export_tasks).pack(side="left", padx=6)
+        tb.Button(button_frame, text="Plan", bootstyle="info-outline", width=8, command=self.show_plan).pack(side="left", padx=6)
+        tb.Button(button_frame, text="Reload", bootstyle="secondary-outline", width=8, command=self.refresh_tasks).pack(side="left", padx=6)
 
         # Task List Frame
         list_frame = tb.Frame(self.root, padding=(20, 10))
         list_frame.pack(fill="both", expand=True)
 
         columns = ("ID", "Title", "Description", "Due Date", "Priority", "Status")
+        status_bar = tb.Frame(list_frame)
+        status_bar.pack(side="bottom", fill="x")
+        self.status_var = tk.StringVar()
+        tb.Label(status_bar, textvariable=self.status_var, font=("Segoe UI", 9)).pack(side="left")
+        self.count_var = tk.StringVar()
+        tb.Label(status_bar, textvariable=self.count_var, font=("Segoe UI", 9)).pack(side="right")
+
+        search_bar = tb.Frame(list_frame)
+        search_bar.pack(side="top", fill="x")
+        tb.Label(search_bar, text="Search:", font=("Segoe UI", 11)).pack(side="left", padx=(0, 5))
+        self.search_var = tk.StringVar()
+        self.search_var.trace_add("write", self.on_search_changed)
+        tb.Entry(search_bar, textvariable=self.search_var, width=45).pack(side="left")
+        tb.Label(search_bar, text="Show:", font=("Segoe UI", 11)).pack(side="left", padx=(15, 5))
+        self.filter_var = tk.StringVar(value=STATUS_FILTERS[0])
+        filter_box = tb.Combobox(search_bar, textvariable=self.filter_var, values=STATUS_FILTERS, state="readonly", width=12)
+        filter_box.bind("<<ComboboxSelected>>", self.on_filter_changed)
+        filter_box.pack(side="left")
+        self.status_filter = None
+        # Search and export read the archived tasks too when this is ticked; the list never does
+        self.archived_var = tk.BooleanVar(value=False)
+        tb.Checkbutton(search_bar, text="Include archived", variable=self.archived_var,
+                       command=self.on_archived_toggled).pack(side="left", padx=(15, 0))
+        tb.Button(search_bar, text="Stats", bootstyle="secondary-outline", width=8, command=self.show_stats).pack(side="right")
+        self.stats_window = None
+        self.search_text = ""
+        self.search_after = None
+
         self.tree = ttk.Treeview(list_frame, columns=columns, show="headings", height=12)
+        self.scrollbar = ttk.Scrollbar(list_frame, orient="vertical", command=self.tree.yview)
+        self.tree.configure(yscrollcommand=self.on_tree_scroll)
 
         for col in columns:
             self.tree.heading(col, text=col, anchor="center")
             self.tree.column(col, width=120, anchor="center")
 
+        self.tree.tag_configure("pending", foreground="gray")
+
+        self.scrollbar.pack(side="right", fill="y", pady=10)
         self.tree.pack(fill="both", expand=True, pady=10)
+        self.plan_window = None
+        self.planner = None
+        self.list_generation = 0
+        self.reset_list_state()
         self.refresh_tasks()
 
     def add_task(self):
@@ -111,23 +190,24 @@ class TaskScheduler:
         description = self.desc_var.get().strip()
         due_date = self.date_var.get().strip()
 
-        if not title or not due_date:
-            messagebox.showerror("Error", "Title and Due Date are required!")
-            return
-        
-        if not self.validate_date(due_date):
-            messagebox.showerror("Error", "Invalid date format! Use YYYY-MM-DD.")
+        try:
+            validate_task(title, due_date)
+            estimate = parse_estimate(self.estimate_var.get())
+        except ValueError as e:
+            messagebox.showerror("Error", str(e))
             return
 
-        priority, ai_reason = self.ai_prioritize_task(description)
-
-        self.cursor.execute('''
-            INSERT INTO tasks (title, description, due_date, priority, status, ai_reason)
-            VALUES (?, ?, ?, ?, ?, ?)
-        ''', (title, description, due_date, priority, "Pending", ai_reason))
+        self.status_var.set(f"Adding '{title}'...")
+        self.worker.submit(TaskService.add_task, title, description, due_date, estimate,
+                           on_done=lambda values: self.on_task_added(values, estimate), on_error=self.on_task_error)
 
-        self.conn.commit()
-        self.refresh_tasks()
+    def on_task_added(self, values, estimate=None):
+        self.status_var.set("")
+        self.reminders.schedule(values[0], values[1], values[3])
+        if self.status_filter in (None, values[5]):
+            self.total_count += 1
+        self.upsert_row(values[0], values)
+        self.replan(values[0], values, estimate)
 
     def modify_task(self):
         selected_item = self.tree.selection()
@@ -140,23 +220,29 @@ class TaskScheduler:
         new_description = self.desc_var.get().strip()
         new_due_date = self.date_var.get().strip()
 
-        if not new_title or not new_due_date:
-            messagebox.showerror("Error", "Title and Due Date are required!")
-            return
-        
-        if not self.validate_date(new_due_date):
-            messagebox.showerror("Error", "Invalid date format! Use YYYY-MM-DD.")
+        try:
+            validate_task(new_title, new_due_date)
+            estimate = parse_estimate(self.estimate_var.get())
+        except ValueError as e:
+            messagebox.showerror("Error", str(e))
             return
 
-        new_priority, ai_reason = self.ai_prioritize_task(new_description)
-
-        self.cursor.execute('''
-            UPDATE tasks SET title=?, description=?, due_date=?, priority=?, ai_reason=?
-            WHERE id=?
-        ''', (new_title, new_description, new_due_date, new_priority, ai_reason, task_id))
-
-        self.conn.commit()
-        self.refresh_tasks()
+        self.mark_pending(task_id, "Saving")
+        self.worker.submit(TaskService.update_task, task_id, new_title, new_description, new_due_date, estimate,
+                           on_done=lambda values: self.on_task_modified(task_id, values, estimate),
+                           on_error=lambda error: self.on_task_error(error, task_id))
+
+    def on_task_modified(self, task_id, values, estimate=None):
+        self.status_var.set("")
+        if values is None:
+            # Deleted elsewhere meanwhile; the change feed removes the row
+            if self.tree.exists(task_id):
+                self.tree.item(task_id, tags=())
+            return
+        if values[5] == "Pending":
+            self.reminders.schedule(values[0], values[1], values[3])
+        self.upsert_row(values[0], values)
+        self.replan(values[0], values, estimate)
 
     def mark_task_done(self):
         selected_item = self.tree.selection()
@@ -165,9 +251,26 @@ class TaskScheduler:
             return
 
         task_id = self.tree.item(selected_item, "values")[0]
-        self.cursor.execute("UPDATE tasks SET status='Completed' WHERE id=?", (task_id,))
-        self.conn.commit()
-        self.refresh_tasks()
+        self.mark_pending(task_id, "Completing")
+        self.worker.submit(TaskService.complete_task, task_id,
+                           on_done=lambda changed: self.on_task_completed(task_id, changed),
+                           on_error=lambda error: self.on_task_error(error, task_id))
+
+    def on_task_completed(self, task_id, changed):
+        self.status_var.set("")
+        if not changed:
+            # Completed or deleted elsewhere meanwhile; the change feed brings the row up to date
+            if self.tree.exists(task_id):
+                self.tree.item(task_id, tags=())
+            return
+        self.reminders.cancel(task_id)
+        self.replan(task_id)
+        if self.status_filter == "Pending":
+            self.total_count -= 1
+            self.remove_row(task_id)
+        elif self.tree.exists(task_id):
+            self.tree.set(task_id, "Status", "Completed")
+            self.tree.item(task_id, tags=())
 
     def delete_task(self):
         selected_item = self.tree.selection()
@@ -176,70 +279,428 @@ class TaskScheduler:
             return
 
         task_id = self.tree.item(selected_item, "values")[0]
-        self.cursor.execute("DELETE FROM tasks WHERE id=?", (task_id,))
-        self.conn.commit()
+        self.mark_pending(task_id, "Deleting")
+        self.worker.submit(TaskService.delete_task, task_id,
+                           on_done=lambda deleted: self.on_task_deleted(task_id, deleted),
+                           on_error=lambda error: self.on_task_error(error, task_id))
+
+    def on_task_deleted(self, task_id, deleted):
+        self.status_var.set("")
+        self.reminders.cancel(task_id)
+        self.replan(task_id)
+        self.total_count -= deleted
+        self.remove_row(task_id)
+
+    def mark_pending(self, task_id, action):
+        """Grey out a row while the worker is writing it"""
+        self.tree.item(task_id, tags=("pending",))
+        self.status_var.set(f"{action} task {task_id}...")
+
+    def on_task_error(self, error, task_id=None):
+        self.status_var.set("")
+        if task_id is not None and self.tree.exists(task_id):
+            self.tree.item(task_id, tags=())
+        messagebox.showerror("Error", f"Could not save the task: {error}")
+
+    def on_search_changed(self, *args):
+        """Debounce typing: search once the text has been left alone for SEARCH_DELAY_MS"""
+        if self.search_after is not None:
+            self.root.after_cancel(self.search_after)
+        self.search_after = self.root.after(SEARCH_DELAY_MS, self.apply_search)
+
+    def apply_search(self):
+        self.search_after = None
+        text = self.search_var.get().strip()
+        if text != self.search_text:
+            self.search_text = text
+            self.refresh_tasks()
+
+    def on_archived_toggled(self):
+        if self.search_text:
+            self.refresh_tasks()
+
+    def on_filter_changed(self, *args):
+        choice = self.filter_var.get()
+        self.status_filter = None if choice == STATUS_FILTERS[0] else choice
         self.refresh_tasks()
 
     def refresh_tasks(self):
+        """Full rebuild of the task list (or search results); single edits go through upsert_row/remove_row"""
+        self.list_generation += 1
+        self.refresh_started = time.perf_counter()
+        if self.search_text:
+            generation = self.list_generation
+            self.status_var.set("Searching...")
+            self.search_worker.submit(TaskService.search_tasks, self.search_text, SEARCH_LIMIT, self.archived_var.get(),
+                                      self.status_filter,
+                                      on_done=lambda rows: self.on_search_results(generation, rows),
+                                      on_error=self.on_page_error)
+            return
+        self.page_pending = True
+        self.status_var.set("Loading tasks...")
+        self.worker.submit(self.fetch_first_page, self.list_generation, self.status_filter,
+                           on_done=self.on_first_page, on_error=self.on_page_error)
+
+    def fetch_first_page(self, service, generation, status):
+        return generation, service.count_tasks(status), service.fetch_page(None, PAGE_SIZE, status)
+
+    def on_first_page(self, result):
+        generation, total, rows = result
+        if generation != self.list_generation:
+            return
+        self.status_var.set("")
         self.tree.delete(*self.tree.get_children())
-        self.cursor.execute("""
-            SELECT id, title, description, due_date, priority, status 
-            FROM tasks 
-            ORDER BY 
-                CASE priority
-                    WHEN 'High' THEN 1
-                    WHEN 'Medium' THEN 2
-                    WHEN 'Low' THEN 3
-                END,
-                due_date ASC
-        """)
-        for task in self.cursor.fetchall():
-            self.tree.insert("", "end", values=task)
-
-    def show_notification(self, message):
-        def popup():
-            messagebox.showwarning("Task Reminder", message)
-        self.root.after(0, popup)
-
-    def check_tasks(self):
-        while True:
-            try:
-                conn = sqlite3.connect('tasks.db')
-                cursor = conn.cursor()
-
-                now = datetime.now()
-
-                cursor.execute("SELECT title, due_date FROM tasks WHERE status='Pending'")
-                tasks = cursor.fetchall()
-
-                for title, due_date in tasks:
-                    try:
-                        due_datetime = datetime.strptime(due_date, "%Y-%m-%d")
-                        delta = (due_datetime - now).days
-                        if delta <= 0:
-                            self.show_notification(f"Task Reminder: '{title}' is due or overdue!")
-                    except Exception as e:
-                        print(f"Error parsing task date: {e}")
-
-                conn.close()
-            except Exception as e:
-                print(f"[Reminder Thread Error]: {e}")
-
-            threading.Event().wait(3600)  # Wait for 1 hour
+        self.reset_list_state()
+        self.total_count = total
+        self.append_page(rows)
+        METRICS.record("ui refresh", time.perf_counter() - self.refresh_started)
+
+    def on_search_results(self, generation, rows):
+        if generation != self.list_generation:
+            return
+        self.status_var.set("")
+        self.tree.delete(*self.tree.get_children())
+        self.reset_list_state()
+        self.all_loaded = True  # ranked results arrive in one batch, there is nothing to page in
+        for task in rows:
+            self.tree.insert("", "end", iid=str(task[0]), values=task[:6])
+        self.update_count()
+        METRICS.record("ui search", time.perf_counter() - self.refresh_started)
+
+    def reset_list_state(self):
+        # Treeview item ids are the task ids; row_keys/sorted_keys mirror the loaded rows in display order
+        self.row_keys = {}
+        self.sorted_keys = []
+        self.page_cursor = None
+        self.page_pending = False
+        self.all_loaded = False
+        self.total_count = 0
+
+    def load_next_page(self):
+        if self.all_loaded:
+            return
+        self.page_pending = True
+        generation = self.list_generation
+        self.worker.submit(TaskService.fetch_page, self.page_cursor, PAGE_SIZE, self.status_filter,
+                           on_done=lambda rows: self.on_next_page(generation, rows), on_error=self.on_page_error)
+
+    def on_next_page(self, generation, rows):
+        if generation == self.list_generation:
+            self.append_page(rows)
+
+    def on_page_error(self, error):
+        self.page_pending = False
+        self.status_var.set(f"Could not load tasks: {error}")
+
+    def append_page(self, rows):
+        started = time.perf_counter()
+        self.page_pending = False
+        for task in rows:
+            key = task_db.sort_key(task[0], task[6], task[7])
+            self.row_keys[task[0]] = key
+            self.sorted_keys.append(key)
+            self.tree.insert("", "end", iid=str(task[0]), values=task[:6])
+        if rows:
+            last = rows[-1]
+            self.page_cursor = (last[6], last[7], last[0])
+        self.all_loaded = len(rows) < PAGE_SIZE
+        self.update_count()
+        METRICS.record("ui append_page", time.perf_counter() - started)
+
+    def on_tree_scroll(self, first, last):
+        self.scrollbar.set(first, last)
+        loaded = len(self.sorted_keys)
+        if not self.all_loaded and not self.page_pending and float(last) * loaded >= loaded - PREFETCH_ROWS:
+            self.load_next_page()
+
+    def update_count(self):
+        if self.search_text:
+            shown = len(self.tree.get_children())
+            self.count_var.set(f"Top {shown} matches" if shown >= SEARCH_LIMIT else f"{shown} matching tasks")
+        else:
+            shown = f"{self.status_filter.lower()} tasks" if self.status_filter else "tasks"
+            self.count_var.set(f"Showing {len(self.sorted_keys)} of {self.total_count} {shown}")
+
+    def past_loaded_window(self, key):
+        """True when a row sorts after everything fetched so far and will arrive with a later page"""
+        return not self.all_loaded and self.page_cursor is not None and key > task_db.sort_key(
+            self.page_cursor[2], self.page_cursor[0], self.page_cursor[1])
+
+    def upsert_row(self, task_id, values):
+        """Insert or update one row at its sorted position without touching the others"""
+        if self.search_text:
+            self.refresh_tasks()  # search results are ranked by relevance, so re-run the search
+            return
+        if self.status_filter not in (None, values[5]):
+            self.remove_row(task_id)
+            return
+        task_id = int(task_id)
+        key = task_db.task_sort_key(task_id, values[4], values[3])
+        old_key = self.row_keys.get(task_id)
+        if self.past_loaded_window(key):
+            if old_key is not None:
+                self.remove_row(task_id)
+            return
+        if old_key is not None:
+            del self.sorted_keys[bisect_left(self.sorted_keys, old_key)]
+        index = bisect_left(self.sorted_keys, key)
+        self.sorted_keys.insert(index, key)
+        self.row_keys[task_id] = key
+        if old_key is None:
+            self.tree.insert("", index, iid=str(task_id), values=values)
+        else:
+            self.tree.item(str(task_id), values=values, tags=())
+            if old_key != key:
+                self.tree.move(str(task_id), "", index)
+        self.update_count()
+
+    def remove_row(self, task_id):
+        task_id = int(task_id)
+        key = self.row_keys.pop(task_id, None)
+        if key is not None:
+            del self.sorted_keys[bisect_left(self.sorted_keys, key)]
+        if self.tree.exists(str(task_id)):
+            self.tree.delete(str(task_id))
+        self.update_count()
+
+    def show_plan(self):
+        """Work plan of the pending tasks at a daily capacity, with the ones that will miss their due date"""
+        if self.plan_window is not None and self.plan_window.winfo_exists():
+            self.plan_window.lift()
+            return
+        window = self.plan_window = tb.Toplevel(self.root)
+        window.title("Plan")
+        window.geometry("950x500")
+
+        controls = tb.Frame(window, padding=10)
+        controls.pack(side="top", fill="x")
+        tb.Label(controls, text="Hours per day:", font=("Segoe UI", 11)).pack(side="left", padx=(0, 5))
+        self.capacity_var = tk.StringVar(value=f"{DAILY_CAPACITY:g}")
+        tb.Entry(controls, textvariable=self.capacity_var, width=6).pack(side="left")
+        tb.Label(controls, text="Order:", font=("Segoe UI", 11)).pack(side="left", padx=(15, 5))
+        self.plan_order_var = tk.StringVar(value=ORDERS[0])
+        tb.Combobox(controls, textvariable=self.plan_order_var, values=ORDERS, state="readonly", width=10).pack(side="left")
+        self.late_only_var = tk.BooleanVar(value=False)
+        tb.Checkbutton(controls, text="Late only", variable=self.late_only_var, command=self.update_plan_view).pack(side="left", padx=15)
+        tb.Button(controls, text="Replan", bootstyle="primary-outline", width=10, command=self.rebuild_plan).pack(side="left")
+        self.plan_summary_var = tk.StringVar()
+        tb.Label(window, textvariable=self.plan_summary_var, font=("Segoe UI", 9)).pack(side="bottom", anchor="w", padx=10, pady=(0, 10))
+
+        columns = ("#", "ID", "Title", "Due Date", "Priority", "Hours", "Done By", "Slack h")
+        tree = self.plan_tree = ttk.Treeview(window, columns=columns, show="headings")
+        for col in columns:
+            tree.heading(col, text=col, anchor="center")
+            tree.column(col, width=90, anchor="center")
+        tree.column("Title", width=260, anchor="w")
+        tree.tag_configure("late", foreground="red")
+        tree.pack(fill="both", expand=True, padx=10, pady=(0, 10))
+        self.rebuild_plan()
+
+    def rebuild_plan(self):
+        try:
+            capacity = float(self.capacity_var.get())
+            if not capacity > 0:
+                raise ValueError
+        except ValueError:
+            messagebox.showerror("Error", "Hours per day must be a positive number!")
+            return
+        self.plan_summary_var.set("Planning...")
+        # On the edit worker: edits queued before the plan are in it, later ones arrive through replan()
+        self.worker.submit(TaskService.build_plan, capacity, self.plan_order_var.get(),
+                           on_done=self.on_plan_built, on_error=lambda error: self.plan_summary_var.set(f"Could not plan: {error}"))
+
+    def on_plan_built(self, planner):
+        self.planner = planner
+        self.update_plan_view()
+
+    def replan(self, task_id, values=None, estimate=None):
+        """Apply one changed task to the open plan (a few milliseconds, no database access)"""
+        if self.planner is None:
+            return
+        if values is None or values[5] != "Pending":
+            self.planner.remove(task_id)
+        else:
+            self.planner.update(task_id, values[1], values[3], values[4], estimate)
+        self.update_plan_view()
+
+    def update_plan_view(self):
+        if self.plan_window is None or not self.plan_window.winfo_exists():
+            self.planner = None
+            return
+        if self.planner is None:
+            return
+        entries = self.planner.late(PLAN_ROWS) if self.late_only_var.get() else self.planner.plan(PLAN_ROWS)
+        tree = self.plan_tree
+        tree.delete(*tree.get_children())
+        for position, task_id, title, due_date, priority, hours, finish_date, slack in entries:
+            tree.insert("", "end", values=(position, task_id, title, due_date, priority, f"{hours:g}", finish_date, f"{slack:.1f}"),
+                        tags=("late",) if slack < -EPSILON else ())
+        tasks, hours, days, late = self.planner.summary()
+        self.plan_summary_var.set(f"{tasks} pending tasks, {hours:g} h of work = {days:.1f} days at "
+                                  f"{self.planner.capacity:g} h/day; {late} will miss their due date")
+
+    def show_stats(self):
+        """Live view of the METRICS timers and counters, with the profiler toggle"""
+        if self.stats_window is not None and self.stats_window.winfo_exists():
+            self.stats_window.lift()
+            return
+        window = self.stats_window = tb.Toplevel(self.root)
+        window.title("Stats")
+        window.geometry("900x450")
+
+        buttons = tb.Frame(window, padding=10)
+        buttons.pack(side="bottom", fill="x")
+        tb.Button(buttons, text="Reset", bootstyle="secondary-outline", width=14, command=METRICS.reset).pack(side="left", padx=6)
+        tb.Button(buttons, text="Save JSON", bootstyle="info-outline", width=14, command=self.save_metrics).pack(side="left", padx=6)
+        self.profile_button = tb.Button(buttons, bootstyle="warning-outline", width=14, command=self.toggle_profiler)
+        self.profile_button.configure(text="Stop Profiler" if PROFILER.running else "Start Profiler")
+        self.profile_button.pack(side="left", padx=6)
+
+        columns = ("Metric", "Count", "Mean ms", "p50 ms", "p95 ms", "p99 ms", "Max ms")
+        tree = ttk.Treeview(window, columns=columns, show="headings")
+        for col in columns:
+            tree.heading(col, text=col, anchor="center")
+            tree.column(col, width=85, anchor="e")
+        tree.column("Metric", width=340, anchor="w")
+        tree.pack(fill="both", expand=True, padx=10, pady=(10, 0))
+        self.update_stats(tree)
+
+    def update_stats(self, tree):
+        if not tree.winfo_exists():
+            return
+        snapshot = METRICS.snapshot()
+        tree.delete(*tree.get_children())
+        for name, timer in snapshot["timers"].items():
+            tree.insert("", "end", values=(name, timer["count"], *(f"{timer[key]:.3f}" for key in
+                                           ("mean_ms", "p50_ms", "p95_ms", "p99_ms", "max_ms"))))
+        for name, count in snapshot["counters"].items():
+            tree.insert("", "end", values=(name, count, "", "", "", "", ""))
+        self.root.after(STATS_REFRESH_MS, self.update_stats, tree)
+
+    def save_metrics(self):
+        path = filedialog.asksaveasfilename(title="Save Metrics", defaultextension=".json", filetypes=[("JSON", "*.json")])
+        if path:
+            METRICS.dump(path)
+            self.status_var.set(f"Metrics saved to {path}")
+
+    def toggle_profiler(self):
+        """Start sampling stacks, or stop and print where the samples landed"""
+        if PROFILER.running:
+            PROFILER.stop()
+            PROFILER.print_report(file=sys.stderr)
+            self.status_var.set(f"Profile of {PROFILER.sample_count} samples printed to the console")
+        else:
+            PROFILER.start()
+            self.status_var.set("Profiler running...")
+        if self.stats_window is not None and self.stats_window.winfo_exists():
+            self.profile_button.configure(text="Stop Profiler" if PROFILER.running else "Start Profiler")
+
+    def on_reminder(self, task_id, title, due_epoch, lead):
+        if self.reminders.clock() >= due_epoch:
+            self.notifications.post(task_id, f"'{title}' is due or overdue!")
+        else:
+            self.notifications.post(task_id, f"'{title}' is due on {task_db.epoch_to_date(due_epoch)}!")
 
     def view_tasks_in_console(self):
+        self.export_worker.submit(self.print_tasks)
+
+    def print_tasks(self, service):
         try:
-            self.cursor.execute("SELECT * FROM tasks")
-            rows = self.cursor.fetchall()
             print("\n=== Task List ===")
-            for row in rows:
-                print(f"ID: {row[0]}, Title: {row[1]}, Description: {row[2]}, Due Date: {row[3]}, Priority: {row[4]}, Status: {row[5]}, AI Reason: {row[6]}")
+            service.write_tasks(sys.stdout, "text")
+            stats = self.priority_cache.stats()
+            print(f"AI cache: {stats['hits']} hits, {stats['misses']} misses, {stats['size']} entries")
+            print(f"AI tiers: {self.classifier.tier_stats()}, model skipped {self.classifier.model_skip_rate():.0%}")
             print("=================\n")
         except Exception as e:
             print(f"[Error reading tasks]: {e}")
 
+    def export_tasks(self):
+        path = filedialog.asksaveasfilename(
+            title="Export Tasks", defaultextension=".csv",
+            filetypes=[("CSV", "*.csv"), ("JSON Lines", "*.jsonl")]
+        )
+        if not path:
+            return
+        self.status_var.set("Exporting tasks...")
+        progress = lambda count: self.ui.after(0, self.status_var.set, f"Exporting tasks... {count} written")
+        self.export_worker.submit(TaskService.export_tasks, path, None, progress, include_archived=self.archived_var.get(),
+                                  on_done=lambda count: self.status_var.set(f"Exported {count} tasks to {path}"),
+                                  on_error=self.on_export_error)
+
+    def on_export_error(self, error):
+        self.status_var.set("")
+        messagebox.showerror("Error", f"Export failed: {error}")
+
+    def archive_completed(self):
+        """Archive in the background (batches, so edits still get the write lock in between), then again later"""
+        self.export_worker.submit(TaskService.archive_completed, on_done=self.on_archived)
+        self.export_worker.submit(TaskService.prune_changes)
+        self.root.after(ARCHIVE_INTERVAL_MS, self.archive_completed)
+
+    def on_archived(self, count):
+        if count:
+            self.refresh_tasks()
+
+    def rescore_tasks(self):
+        """Update the scores for the new day in the background (only rows that change are written)"""
+        self.export_worker.submit(TaskService.rescore_tasks)
+        tomorrow = datetime.combine(date.today() + timedelta(days=1), datetime.min.time())
+        delay_ms = int((tomorrow - datetime.now()).total_seconds() * 1000) + RESCORE_AFTER_MIDNIGHT_MS
+        self.root.after(delay_ms, self.rescore_tasks)
+
+    def poll_changes(self):
+        """Pick up writes made by other processes; on the edit worker, so they queue behind our own edits"""
+        self.worker.submit(self.fetch_changes, self.status_filter,
+                           on_done=self.on_changes, on_error=lambda error: self.root.after(CHANGE_POLL_MS, self.poll_changes))
+
+    def fetch_changes(self, service, status):
+        rows, deleted_ids, reset = service.poll_changes(self.changes)
+        if reset:
+            with service.pool.read() as conn:
+                self.reminders.rebuild(conn)
+        total = service.count_tasks(status) if rows or deleted_ids else None
+        return rows, deleted_ids, reset, status, total
+
+    def on_changes(self, result):
+        """Apply another process's changes to the list, reminders and plan, like our own edits"""
+        rows, deleted_ids, reset, status, total = result
+        self.root.after(0 if self.changes.more else CHANGE_POLL_MS, self.poll_changes)
+        if reset:
+            self.refresh_tasks()
+            if self.planner is not None:
+                self.rebuild_plan()
+            return
+        if not rows and not deleted_ids:
+            return
+        for row in rows:
+            if row[5] == "Pending":
+                self.reminders.schedule(row[0], row[1], row[3])
+                if self.planner is not None:
+                    self.planner.update(row[0], row[1], row[3], row[4],
+                                        row[7] if row[7] is not None else self.planner.default_estimate)
+            else:
+                self.reminders.cancel(row[0])
+                if self.planner is not None:
+                    self.planner.remove(row[0])
+            if not self.search_text:
+                self.upsert_row(row[0], row[:6])
+        for task_id in deleted_ids:
+            self.reminders.cancel(task_id)
+            if self.planner is not None:
+                self.planner.remove(task_id)
+            self.remove_row(task_id)
+        if self.search_text:
+            self.refresh_tasks()
+        elif status == self.status_filter:
+            self.total_count = total
+            self.update_count()
+        self.update_plan_view()
+
 # Entry point
 if __name__ == "__main__":
+    startup_began = time.perf_counter()
     root = tb.Window(themename="superhero")
     app = TaskScheduler(root)
+    root.after_idle(lambda: print(f"[Startup] Window ready in {(time.perf_counter() - startup_began) * 1000:.0f} ms"))
     root.mainloop()
@@ -0,0 +1,547 @@
+import csv
+import json
+import os
+import sys
+from datetime import datetime
+from itertools import chain, islice
+
+import archive
+import changefeed
+import reprioritize
+import scoring
+import task_db
+from planner import DAILY_CAPACITY, Planner
+from task_ai import ModelLoader, PriorityCache, PriorityClassifier, BATCH_SIZE
+
+DB_PATH = "tasks.db"
+
+TASK_COLUMNS = ("id", "title", "description", "due_date", "priority", "status", "ai_reason")
+
+# Rows classified and inserted per transaction by import_tasks
+IMPORT_BATCH_SIZE = 5000
+# Rows pulled per fetchmany() call when streaming listings and exports
+FETCH_CHUNK_SIZE = 1000
+
+EXPORT_FORMATS = ("csv", "jsonl", "text")
+
+# Most full-text matches returned by search_tasks
+SEARCH_LIMIT = 200
+
+# archive.tasks has no priority_rank column; this sorts it like ORDER BY priority_rank, due_epoch, id
+ARCHIVE_DISPLAY_ORDER = (" ORDER BY CASE priority WHEN 'High' THEN 1 WHEN 'Medium' THEN 2 WHEN 'Low' THEN 3 END,"
+                         " due_date, id")
+
+
+def validate_date(date_str):
+    """Validate date format (YYYY-MM-DD)"""
+    try:
+        datetime.strptime(date_str, task_db.DATE_FORMAT)
+        return True
+    except ValueError:
+        return False
+
+
+def validate_task(title, due_date):
+    """Raise ValueError with a user-facing message when a task cannot be saved"""
+    if not title or not due_date:
+        raise ValueError("Title and Due Date are required!")
+    if not validate_date(due_date):
+        raise ValueError("Invalid date format! Use YYYY-MM-DD.")
+
+
+def parse_estimate(text):
+    """Hours from a user-entered estimate; None when left empty"""
+    text = str(text).strip() if text is not None else ""
+    if not text:
+        return None
+    try:
+        hours = float(text)
+    except ValueError:
+        hours = 0.0
+    if not 0 < hours < float("inf"):
+        raise ValueError("Estimate must be a positive number of hours!")
+    return hours
+
+
+def read_records(path):
+    """Yield (record_number, dict, None) from a CSV or JSONL file one record at a time
+
+    A JSONL line that is not valid JSON or not an object comes out as (line_number, None, message)
+    so the caller can skip it and go on.
+    """
+    with open(path, newline="", encoding="utf-8") as f:
+        if os.path.splitext(path)[1].lower() == ".csv":
+            for number, record in enumerate(csv.DictReader(f), start=1):
+                yield number, record, None
+        else:
+            for number, line in enumerate(f, start=1):
+                if not line.strip():
+                    continue
+                try:
+                    record = json.loads(line)
+                except ValueError as e:
+                    yield number, None, f"Invalid JSON: {e}"
+                    continue
+                if isinstance(record, dict):
+                    yield number, record, None
+                else:
+                    yield number, None, "Expected a JSON object with title, description and due_date!"
+
+
+def record_field(record, name):
+    """A field of an imported record as a stripped string ("" when missing)"""
+    value = record.get(name)
+    return str(value).strip() if value is not None else ""
+
+
+def batched(iterable, size):
+    iterator = iter(iterable)
+    while batch := list(islice(iterator, size)):
+        yield batch
+
+
+def format_task(row):
+    """One-line console form of a task row"""
+    return f"ID: {row[0]}, Title: {row[1]}, Description: {row[2]}, Due Date: {row[3]}, Priority: {row[4]}, Status: {row[5]}, AI Reason: {row[6]}"
+
+
+class TaskService:
+    """Task storage and AI prioritization without any GUI dependency
+
+    Reads and writes go through a task_db.ConnectionPool (WAL, one writer, a few readers). Pass a
+    shared pool to let several instances (e.g. one per worker thread) use the same connections;
+    otherwise the instance opens and owns its own. The classifier and model loader can be shared
+    between instances too. With wait_for_model=True (CLI use) the SpaCy
+    model is loaded synchronously the first time a description actually needs it; otherwise
+    keyword priorities are used until a background load finishes.
+
+    With a task_store.TaskStore (shared like the pool), every write is applied to it as well, and
+    once load_store() has run, counts, list pages, get_task, display-order listings and due
+    checks are answered from memory instead of SQL.
+    """
+
+    def __init__(self, db_path=DB_PATH, classifier=None, nlp_loader=None, wait_for_model=False, pool=None,
+                 store=None):
+        self.db_path = db_path
+        self.owns_pool = pool is None
+        self.pool = pool or task_db.ConnectionPool(db_path)
+        if self.owns_pool:
+            with self.pool.write() as conn:
+                task_db.init_schema(conn)
+        self.owns_cache = classifier is None
+        self.classifier = classifier or PriorityClassifier(PriorityCache(db_path))
+        self.nlp_loader = nlp_loader or ModelLoader()
+        self.wait_for_model = wait_for_model
+        self.store = store
+
+    def close(self):
+        if self.owns_pool:
+            self.pool.close()
+        if self.owns_cache:
+            self.classifier.cache.close()
+
+    def _nlp(self, descriptions):
+        nlp = self.nlp_loader.nlp
+        if nlp is None and self.wait_for_model and any(map(self.classifier.needs_model, descriptions)):
+            nlp = self.nlp_loader.wait()
+        return nlp
+
+    def ai_prioritize_task(self, description):
+        return self.classifier.prioritize(description, self._nlp([description]))
+
+    def ai_prioritize_tasks(self, descriptions, batch_size=BATCH_SIZE, n_process=1):
+        return self.classifier.prioritize_batch(descriptions, self._nlp(descriptions), batch_size, n_process)
+
+    def _served_from_store(self):
+        return self.store is not None and self.store.loaded
+
+    def load_store(self):
+        """Fill the store from the database; returns the number of tasks"""
+        with self.pool.read() as conn:
+            return self.store.load(conn)
+
+    def reprioritize_all(self, workers=None, chunk_size=reprioritize.CHUNK_SIZE, progress=None):
+        """Rescore every task in worker processes (see reprioritize.reprioritize_all); returns (processed, changed, skipped)"""
+        result = reprioritize.reprioritize_all(self.pool, workers, chunk_size, progress=progress,
+                                               model_name=self.nlp_loader.name)
+        if self.store is not None and result[1]:
+            self.load_store()  # the worker processes wrote the database directly
+        return result
+
+    def archive_completed(self, older_than_days=archive.ARCHIVE_AFTER_DAYS, batch_size=archive.ARCHIVE_BATCH_SIZE,
+                          progress=None):
+        """Move long-completed tasks to the archive database (see archive.archive_completed); returns the count"""
+        if getattr(self.pool, "archive_path", None) is None:
+            raise ValueError("Archiving needs a SQLite database with its archive attached!")
+        archived_ids = []
+        count = archive.archive_completed(self.pool, older_than_days, batch_size, progress,
+                                          on_batch=archived_ids.extend)
+        if self.store is not None and archived_ids:
+            self.store.remove_many(archived_ids)
+        return count
+
+    def count_archived(self):
+        with self.pool.read() as conn:
+            return conn.execute("SELECT COUNT(*) FROM archive.tasks").fetchone()[0]
+
+    def poll_changes(self, feed, limit=changefeed.POLL_LIMIT):
+        """Changes since feed's last poll (see changefeed.ChangeFeed.poll), applied to the store
+
+        Returns (rows, deleted_ids, reset), rows being TASK_COLUMNS plus estimate_hours. With a
+        loaded store only the changes it did not already have are returned, so writes made through
+        this process are not applied twice; after a reset, or instead of applying more than
+        changefeed.RELOAD_AFTER changes, the store is reloaded.
+        """
+        reload_after = changefeed.RELOAD_AFTER if self._served_from_store() else None
+        with self.pool.read() as conn:
+            rows, deleted_ids, reset = feed.poll(conn, limit, reload_after)
+        if self.store is not None:
+            if reset:
+                self.load_store()
+            else:
+                rows, deleted_ids = self.store.apply_changes(rows, deleted_ids)
+        return rows, deleted_ids, reset
+
+    def latest_change(self):
+        with self.pool.read() as conn:
+            return changefeed.latest_seq(conn)
+
+    def prune_changes(self, retention=changefeed.RETENTION_SECONDS):
+        """Drop change log entries older than retention seconds; returns the count"""
+        return changefeed.prune(self.pool, retention)
+
+    def rescore_tasks(self, now=None, progress=None):
+        """Bring every score up to date with today's date (see scoring.rescore_all); returns (scored, changed)"""
+        on_chunk = self.store.set_reasons if self.store is not None else None
+        return scoring.rescore_all(self.pool, now, progress=progress, on_chunk=on_chunk)
+
+    def add_task(self, title, description, due_date, estimate_hours=None):
+        """Classify, score and insert a task, returning (id, title, description, due_date, priority, status)
+
+        The classifier picks the priority bucket; ai_reason explains the score (see scoring.py).
+        """
+        validate_task(title, due_date)
+        estimate_hours = parse_estimate(estimate_hours)
+        priority = self.ai_prioritize_task(description)[0]
+        features = scoring.text_features(description)
+        score, ai_reason = scoring.score_task(features, task_db.date_to_epoch(due_date), "Pending")
+        with self.pool.write() as conn:
+            cursor = conn.execute('''
+                INSERT INTO tasks (title, description, due_date, priority, status, ai_reason, estimate_hours,
+                                   score, score_features)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+            ''', (title, description, due_date, priority, "Pending", ai_reason, estimate_hours, score, features))
+        if self.store is not None:
+            self.store.upsert((cursor.lastrowid, title, description, due_date, priority, "Pending", ai_reason,
+                               estimate_hours))
+        return (cursor.lastrowid, title, description, due_date, priority, "Pending")
+
+    def update_task(self, task_id, title, description, due_date, estimate_hours=None):
+        """Reclassify, rescore and update a task, returning its row values (estimate_hours=None keeps the estimate)
+
+        Returns None when the task no longer exists, e.g. deleted by another process.
+        """
+        validate_task(title, due_date)
+        estimate_hours = parse_estimate(estimate_hours)
+        priority = self.ai_prioritize_task(description)[0]
+        features = scoring.text_features(description)
+        with self.pool.write() as conn:
+            row = conn.execute("SELECT status FROM tasks WHERE id=?", (task_id,)).fetchone()
+            if row is None:
+                return None
+            status = row[0]
+            score, ai_reason = scoring.score_task(features, task_db.date_to_epoch(due_date), status)
+            conn.execute('''
+                UPDATE tasks SET title=?, description=?, due_date=?, priority=?, ai_reason=?,
+                    estimate_hours=COALESCE(?, estimate_hours), score=?, score_features=?
+                WHERE id=?
+            ''', (title, description, due_date, priority, ai_reason, estimate_hours, score, features, task_id))
+        if self.store is not None:
+            self.store.update(task_id, title, description, due_date, priority, ai_reason, estimate_hours)
+        return (int(task_id), title, description, due_date, priority, status)
+
+    def set_estimate(self, task_id, estimate_hours):
+        """Set (or with None clear) a task's effort estimate; returns the number of rows changed"""
+        estimate_hours = parse_estimate(estimate_hours)
+        with self.pool.write() as conn:
+            changed = conn.execute("UPDATE tasks SET estimate_hours=? WHERE id=?", (estimate_hours, task_id)).rowcount
+        if self.store is not None and changed:
+            self.store.set_estimate(task_id, estimate_hours)
+        return changed
+
+    def build_plan(self, capacity=DAILY_CAPACITY, order="edf"):
+        """A planner.Planner over every pending task, for plan(), late() and incremental updates"""
+        planner = Planner(capacity, order)
+        with self.pool.read() as conn:
+            planner.load(conn.execute(
+                "SELECT id, title, due_epoch, priority, estimate_hours FROM tasks WHERE status='Pending'"
+            ).fetchall())
+        return planner
+
+    def complete_task(self, task_id):
+        """Mark a pending task completed, recording when, and rescore it; returns the number of rows changed
+
+        A task already completed (e.g. by another process) keeps its completion time and counts as unchanged.
+        """
+        completed_at = task_db.datetime_to_epoch(datetime.now())
+        with self.pool.write() as conn:
+            row = conn.execute("SELECT score_features, due_epoch, description, status FROM tasks WHERE id=?",
+                               (task_id,)).fetchone()
+            if row is None or row[3] == "Completed":
+                return 0
+            features = row[0] if row[0] is not None else scoring.text_features(row[2])
+            score, ai_reason = scoring.score_task(features, row[1], "Completed")
+            changed = conn.execute('''
+                UPDATE tasks SET status='Completed', completed_at=?, score=?, score_features=?, ai_reason=?
+                WHERE id=?
+            ''', (completed_at, score, features, ai_reason, task_id)).rowcount
+        if self.store is not None:
+            self.store.set_status(task_id, "Completed", ai_reason)
+        return changed
+
+    def delete_task(self, task_id):
+        """Delete a task; returns the number of rows deleted"""
+        with self.pool.write() as conn:
+            deleted = conn.execute("DELETE FROM tasks WHERE id=?", (task_id,)).rowcount
+        if self.store is not None:
+            self.store.remove(task_id)
+        return deleted
+
+    def get_task(self, task_id):
+        if self._served_from_store():
+            return self.store.get(task_id)
+        with self.pool.read() as conn:
+            return conn.execute(
+                "SELECT id, title, description, due_date, priority, status, ai_reason FROM tasks WHERE id=?",
+                (task_id,)
+            ).fetchone()
+
+    def count_tasks(self, status=None):
+        if self._served_from_store():
+            return self.store.count(status)
+        with self.pool.read() as conn:
+            if status is None:
+                return conn.execute("SELECT COUNT(*) FROM tasks").fetchone()[0]
+            return conn.execute("SELECT COUNT(*) FROM tasks WHERE status=?", (status,)).fetchone()[0]
+
+    def fetch_page(self, page_cursor, limit, status=None):
+        """Rows after page_cursor=(priority_rank, due_epoch, id) in display order, with those sort columns
+
+        With a status, only tasks in that status; from SQL that filter has no matching index, so
+        it is meant for a loaded store.
+        """
+        if self._served_from_store():
+            return self.store.page(page_cursor, limit, status)
+        condition, params = ("status=?", (status,)) if status is not None else ("1", ())
+        with self.pool.read() as conn:
+            if page_cursor is None:
+                return conn.execute(f"""
+                    SELECT id, title, description, due_date, priority, status, priority_rank, due_epoch
+                    FROM tasks
+                    WHERE {condition}
+                    ORDER BY priority_rank, due_epoch, id
+                    LIMIT ?
+                """, (*params, limit)).fetchall()
+            return conn.execute(f"""
+                SELECT id, title, description, due_date, priority, status, priority_rank, due_epoch
+                FROM tasks
+                WHERE {condition} AND (priority_rank, due_epoch, id) > (?, ?, ?)
+                ORDER BY priority_rank, due_epoch, id
+                LIMIT ?
+            """, (*params, *page_cursor, limit)).fetchall()
+
+    def search_tasks(self, text, limit=SEARCH_LIMIT, include_archived=False, status=None):
+        """Best full-text matches for text in title or description (TASK_COLUMNS rows, best first)
+
+        The last word matches as a prefix, so results can follow the user's typing. Every match
+        is ranked (bm25 with the weights set in the schema) and only the best limit are returned;
+        a status filter applies before the limit. With include_archived, archived matches are
+        ranked together with the live ones.
+        """
+        match = task_db.fts_query(text)
+        if match is None:
+            return []
+        status_condition = " AND t.status = ?" if status is not None else ""
+        params = (match, status) if status is not None else (match,)
+        query = f"""
+            SELECT t.id, t.title, t.description, t.due_date, t.priority, t.status, t.ai_reason, f.rank
+            FROM main.tasks_fts f JOIN main.tasks t ON t.id = f.rowid
+            WHERE f.tasks_fts MATCH ?{status_condition}
+        """
+        if include_archived:
+            query += f"""
+                UNION ALL
+                SELECT t.id, t.title, t.description, t.due_date, t.priority, t.status, t.ai_reason, f.rank
+                FROM archive.tasks_fts f JOIN archive.tasks t ON t.id = f.rowid
+                WHERE f.tasks_fts MATCH ?{status_condition}
+            """
+            params *= 2
+        with self.pool.read() as conn:
+            rows = conn.execute(f"SELECT * FROM ({query}) ORDER BY rank LIMIT ?", params + (limit,)).fetchall()
+        return [row[:-1] for row in rows]
+
+    def iter_tasks(self, status=None, priority=None, due_from=None, due_to=None,
+                   display_order=False, chunk_size=FETCH_CHUNK_SIZE, include_archived=False, by_score=False):
+        """Iterate task rows (TASK_COLUMNS) matching the filters, chunk_size rows in memory at a time
+
+        due_from/due_to are inclusive YYYY-MM-DD bounds. Rows come in id order unless
+        display_order is set, which sorts like the GUI list (priority, then due date), or
+        by_score, highest score first (read along the (status, score) index when a status is
+        given). With include_archived,
+        matching archived tasks follow the live ones, in the same order (by id for by_score).
+        """
+        for bound in (due_from, due_to):
+            if bound is not None and not validate_date(bound):
+                raise ValueError("Invalid date format! Use YYYY-MM-DD.")
+        if by_score:
+            order, archive_order = " ORDER BY score DESC, id", " ORDER BY id"
+        elif display_order:
+            order, archive_order = " ORDER BY priority_rank, due_epoch, id", ARCHIVE_DISPLAY_ORDER
+        else:
+            order, archive_order = " ORDER BY id", " ORDER BY id"
+        if display_order and not by_score and self._served_from_store():
+            rows = self.store.rows(status, priority,
+                                   due_from and task_db.date_to_epoch(due_from),
+                                   due_to and task_db.date_to_epoch(due_to))
+        else:
+            rows = self._stream(*self._filter_query("tasks", "due_epoch", status, priority, due_from, due_to, order),
+                                chunk_size)
+        if include_archived and status in (None, "Completed"):
+            # Archived tasks are all completed; due_epoch is computed as in the live table's generated column
+            rows = chain(rows, self._stream(*self._filter_query(
+                "archive.tasks", "CAST(strftime('%s', due_date) AS INTEGER)", status, priority, due_from, due_to,
+                archive_order), chunk_size))
+        return rows
+
+    @staticmethod
+    def _filter_query(table, due_column, status, priority, due_from, due_to, order):
+        conditions, params = [], []
+        if status is not None:
+            conditions.append("status=?")
+            params.append(status)
+        if priority is not None:
+            conditions.append("priority=?")
+            params.append(priority)
+        for bound, operator in ((due_from, ">="), (due_to, "<=")):
+            if bound is not None:
+                conditions.append(f"{due_column} {operator} ?")
+                params.append(task_db.date_to_epoch(bound))
+        query = f"SELECT id, title, description, due_date, priority, status, ai_reason FROM {table}"
+        if conditions:
+            query += " WHERE " + " AND ".join(conditions)
+        return query + order, params
+
+    def _stream(self, query, params, chunk_size):
+        # Holds one reader connection until the iteration finishes or the generator is closed
+        with self.pool.read() as conn:
+            cursor = conn.execute(query, params)
+            try:
+                while rows := cursor.fetchmany(chunk_size):
+                    yield from rows
+            finally:
+                cursor.close()
+
+    def due_tasks(self, days=1, now=None):
+        """Pending tasks due in less than `days` days (or overdue), earliest first"""
+        cutoff = task_db.datetime_to_epoch(now or datetime.now()) + days * 86400
+        if self._served_from_store():
+            return self.store.due_before(cutoff)
+        with self.pool.read() as conn:
+            return conn.execute(
+                "SELECT id, title, due_date FROM tasks WHERE status='Pending' AND due_epoch < ? ORDER BY due_epoch, id",
+                (cutoff,)
+            ).fetchall()
+
+    def import_tasks(self, path, batch_size=IMPORT_BATCH_SIZE, progress=None, on_invalid=None):
+        """Stream tasks from a CSV or JSONL file (title, description, due_date fields) into the database
+
+        Records are read lazily and handled batch_size at a time: validated (each distinct due date
+        is parsed once per batch), classified with one nlp.pipe pass and inserted in a single
+        transaction by pool.insert_tasks, so memory stays flat for any file size. Invalid records
+        are skipped (so are unreadable JSONL lines) and passed to on_invalid(record_number, message);
+        progress(imported, skipped) is called after every batch. Each batch is scored with one
+        scoring.score_tasks call. Returns (imported, skipped). An unreadable file raises OSError
+        (or UnicodeDecodeError, csv.Error part way through, with the earlier batches committed).
+        """
+        imported = skipped = 0
+        for batch in batched(read_records(path), batch_size):
+            dates = {record_field(record, "due_date") for _, record, _ in batch if record is not None}
+            valid_dates = {date for date in dates if validate_date(date)}
+            rows = []
+            for number, record, message in batch:
+                if message is None:
+                    title = record_field(record, "title")
+                    description = record_field(record, "description")
+                    due_date = record_field(record, "due_date")
+                    if not title or not due_date:
+                        message = "Title and Due Date are required!"
+                    elif due_date not in valid_dates:
+                        message = "Invalid date format! Use YYYY-MM-DD."
+                    else:
+                        rows.append((title, description, due_date))
+                        continue
+                skipped += 1
+                if on_invalid is not None:
+                    on_invalid(number, message)
+            results = self.ai_prioritize_tasks([description for _, description, _ in rows])
+            features = [scoring.text_features(description) for _, description, _ in rows]
+            epochs = {date: task_db.date_to_epoch(date) for date in valid_dates}
+            scores, reasons = scoring.score_tasks(features, [epochs[due_date] for _, _, due_date in rows],
+                                                  ["Pending"] * len(rows))
+            last_id = self.pool.insert_tasks([
+                row + (priority, ai_reason, score, feature_bits)
+                for row, (priority, _), ai_reason, score, feature_bits
+                in zip(rows, results, reasons, scores.tolist(), features)
+            ])
+            if self.store is not None and rows:
+                self._store_inserted(last_id)
+            imported += len(rows)
+            if progress is not None:
+                progress(imported, skipped)
+        return imported, skipped
+
+    def _store_inserted(self, last_id):
+        # A batch from insert_tasks gets the ids after last_id; the rows are read back to learn them
+        with self.pool.read() as conn:
+            rows = conn.execute(
+                "SELECT id, title, description, due_date, priority, status, ai_reason, estimate_hours FROM tasks "
+                "WHERE id > ?",
+                (last_id,)
+            ).fetchall()
+        for row in rows:
+            self.store.upsert(row)
+
+    def export_tasks(self, target, fmt=None, progress=None, **filters):
+        """Stream tasks to a file path or "-" (stdout) as csv, jsonl or text
+
+        The format defaults to the file extension (stdout: text). filters are passed to
+        iter_tasks; progress(count) is called every FETCH_CHUNK_SIZE rows. Returns the row count.
+        """
+        if fmt is None:
+            extension = os.path.splitext(target)[1].lower().lstrip(".")
+            fmt = extension if extension in EXPORT_FORMATS else "text" if target == "-" else "jsonl"
+        if fmt not in EXPORT_FORMATS:
+            raise ValueError(f"Unknown export format '{fmt}'")
+        rows = self.iter_tasks(**filters)
+        if target == "-":
+            return self.write_tasks(sys.stdout, fmt, progress, rows)
+        with open(target, "w", newline="", encoding="utf-8") as f:
+            return self.write_tasks(f, fmt, progress, rows)
+
+    def write_tasks(self, f, fmt, progress=None, rows=None):
+        """Write rows (default: every task) to an open file in the given format"""
+        count = 0
+        writer = csv.writer(f) if fmt == "csv" else None
+        if writer is not None:
+            writer.writerow(TASK_COLUMNS)
+        for row in rows if rows is not None else self.iter_tasks():
+            if writer is not None:
+                writer.writerow(row)
+            elif fmt == "jsonl":
+                f.write(json.dumps(dict(zip(TASK_COLUMNS, row))) + "\n")
+            else:
+                f.write(format_task(row) + "\n")
+            count += 1
+            if progress is not None and count % FETCH_CHUNK_SIZE == 0:
+                progress(count)
+        return count
@@ -0,0 +1,310 @@
+import sys
+import threading
+import time
+from bisect import bisect_left, insort
+from operator import attrgetter
+
+import task_db
+from metrics import METRICS
+
+# Rows pulled per fetchmany() call while loading
+LOAD_CHUNK_SIZE = 10000
+
+LOAD_QUERY = """
+    SELECT id, title, description, due_date, priority, status, ai_reason, estimate_hours, priority_rank, due_epoch
+    FROM tasks
+    ORDER BY priority_rank, due_epoch, id
+"""
+
+
+class TaskRecord:
+    """One task; __slots__ (no per-instance dict) keeps it at 112 bytes plus its own strings"""
+
+    __slots__ = ("id", "title", "description", "due_date", "priority", "status", "ai_reason", "estimate_hours",
+                 "rank", "due_epoch")
+
+    def __init__(self, task_id, title, description, due_date, priority, status, ai_reason, estimate_hours, rank,
+                 due_epoch):
+        self.id = task_id
+        self.title = title
+        self.description = description
+        self.due_date = due_date
+        self.priority = priority
+        self.status = status
+        self.ai_reason = ai_reason
+        self.estimate_hours = estimate_hours
+        self.rank = rank
+        self.due_epoch = due_epoch
+
+    def row(self):
+        """TASK_COLUMNS tuple, as get_task and iter_tasks return it"""
+        return (self.id, self.title, self.description, self.due_date, self.priority, self.status, self.ai_reason)
+
+    def change_row(self):
+        """TASK_COLUMNS plus estimate_hours, as changefeed.ChangeFeed.poll returns it"""
+        return self.row() + (self.estimate_hours,)
+
+    def page_row(self):
+        """TASK_COLUMNS[:6] plus the sort columns, as fetch_page returns it"""
+        return (self.id, self.title, self.description, self.due_date, self.priority, self.status,
+                self.rank, self.due_epoch)
+
+
+def display_key(record):
+    return task_db.sort_key(record.id, record.rank, record.due_epoch)
+
+
+due_key = attrgetter("due_epoch", "id")
+
+
+class TaskStore:
+    """Every task in memory, in display order, so the list, filters and due checks need no SQL
+
+    Loaded once with load(); TaskService then applies each write it commits (upsert, set_status,
+    remove), so the store stays authoritative. Three sorted lists share the same records: all
+    tasks and one bucket per status in display order (priority, due date, id), and the pending
+    tasks by due date. Repeated values (dates, priorities, statuses, AI reasons) are shared
+    between records instead of stored once per task. Writes arriving while a load is running
+    are replayed on top of it, so none is lost whichever side of the load's snapshot it landed.
+    All methods are thread-safe.
+    """
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._values = {}
+        self._by_id = {}
+        self._sorted = []
+        self._buckets = {}
+        self._due = []
+        self._backlog = None
+        self.loaded = False
+
+    def _shared(self, value):
+        return self._values.setdefault(value, value)
+
+    def _record(self, row):
+        task_id, title, description, due_date, priority, status, ai_reason, estimate_hours = row
+        rank = task_db.PRIORITY_RANKS.get(priority)
+        due_epoch = task_db.date_to_epoch(due_date)
+        return TaskRecord(int(task_id), title, description, self._shared(due_date), self._shared(priority),
+                          self._shared(status), self._shared(ai_reason), estimate_hours, rank,
+                          self._shared(due_epoch))
+
+    def load(self, conn):
+        """(Re)load every task with one ordered scan of the (priority_rank, due_epoch) index"""
+        started = time.perf_counter()
+        with self._lock:
+            self._backlog = []
+        try:
+            by_id, ordered, buckets = {}, [], {}
+            shared = self._values.setdefault
+            cursor = conn.execute(LOAD_QUERY)
+            while rows := cursor.fetchmany(LOAD_CHUNK_SIZE):
+                for (task_id, title, description, due_date, priority, status, ai_reason, estimate_hours, rank,
+                     due_epoch) in rows:
+                    status = shared(status, status)
+                    record = by_id[task_id] = TaskRecord(
+                        task_id, title, description, shared(due_date, due_date), shared(priority, priority),
+                        status, shared(ai_reason, ai_reason), estimate_hours, rank, shared(due_epoch, due_epoch))
+                    ordered.append(record)
+                    bucket = buckets.get(status)
+                    if bucket is None:
+                        bucket = buckets[status] = []
+                    bucket.append(record)
+            due = sorted((r for r in buckets.get("Pending", ()) if r.due_epoch is not None), key=due_key)
+            with self._lock:
+                self._by_id, self._sorted, self._buckets, self._due = by_id, ordered, buckets, due
+                backlog, self._backlog = self._backlog, None
+                self.loaded = True
+                for method, args in backlog:
+                    method(*args)
+        finally:
+            with self._lock:
+                self._backlog = None
+        METRICS.record("store load", time.perf_counter() - started)
+        print(f"[Store] Loaded {len(ordered)} tasks in {time.perf_counter() - started:.2f} s", file=sys.stderr)
+        return len(ordered)
+
+    def _deferred(self, method, args):
+        """True when the change was only queued (or can be ignored) because no load has finished"""
+        if self._backlog is not None:
+            self._backlog.append((method, args))
+        return not self.loaded
+
+    @staticmethod
+    def _insert(records, record, key):
+        insort(records, record, key=key)
+
+    @staticmethod
+    def _discard(records, record, key):
+        index = bisect_left(records, key(record), key=key)
+        if index < len(records) and records[index] is record:
+            del records[index]
+
+    def _link(self, record):
+        self._by_id[record.id] = record
+        self._insert(self._sorted, record, display_key)
+        self._insert(self._buckets.setdefault(record.status, []), record, display_key)
+        if record.status == "Pending" and record.due_epoch is not None:
+            self._insert(self._due, record, due_key)
+
+    def _unlink(self, record):
+        del self._by_id[record.id]
+        self._discard(self._sorted, record, display_key)
+        self._discard(self._buckets[record.status], record, display_key)
+        if record.status == "Pending" and record.due_epoch is not None:
+            self._discard(self._due, record, due_key)
+
+    def upsert(self, row):
+        """Add or replace a task from a TASK_COLUMNS row plus estimate_hours"""
+        with self._lock:
+            if self._deferred(self.upsert, (row,)):
+                return
+            old = self._by_id.get(int(row[0]))
+            if old is not None:
+                self._unlink(old)
+            self._link(self._record(row))
+
+    def update(self, task_id, title, description, due_date, priority, ai_reason, estimate_hours=None):
+        """Replace a task's fields except its status, as TaskService.update_task's UPDATE does
+
+        estimate_hours=None keeps the estimate.
+        """
+        with self._lock:
+            if self._deferred(self.update, (task_id, title, description, due_date, priority, ai_reason,
+                                            estimate_hours)):
+                return
+            old = self._by_id.get(int(task_id))
+            if old is not None:
+                self._unlink(old)
+                if estimate_hours is None:
+                    estimate_hours = old.estimate_hours
+                self._link(self._record((task_id, title, description, due_date, priority, old.status, ai_reason,
+                                         estimate_hours)))
+
+    def set_estimate(self, task_id, estimate_hours):
+        """Change (or with None clear) a task's estimate; no list changes, it is not a sort key"""
+        with self._lock:
+            if self._deferred(self.set_estimate, (task_id, estimate_hours)):
+                return
+            record = self._by_id.get(int(task_id))
+            if record is not None:
+                record.estimate_hours = estimate_hours
+
+    def set_status(self, task_id, status, ai_reason=None):
+        """Change a task's status (and, if given, its ai_reason)"""
+        with self._lock:
+            if self._deferred(self.set_status, (task_id, status, ai_reason)):
+                return
+            record = self._by_id.get(int(task_id))
+            if record is None:
+                return
+            if ai_reason is not None:
+                record.ai_reason = self._shared(ai_reason)
+            if record.status != status:
+                self._unlink(record)
+                record.status = self._shared(status)
+                self._link(record)
+
+    def set_reasons(self, items):
+        """Apply (ai_reason, id) pairs, e.g. from a rescoring; no list changes, the reason is not a sort key"""
+        with self._lock:
+            if self._deferred(self.set_reasons, (items,)):
+                return
+            for ai_reason, task_id in items:
+                record = self._by_id.get(int(task_id))
+                if record is not None:
+                    record.ai_reason = self._shared(ai_reason)
+
+    def remove(self, task_id):
+        with self._lock:
+            if self._deferred(self.remove, (task_id,)):
+                return
+            record = self._by_id.get(int(task_id))
+            if record is not None:
+                self._unlink(record)
+
+    def apply_changes(self, rows, deleted_ids):
+        """Apply a changefeed delta; returns the (rows, deleted_ids) the store did not already have
+
+        Rows equal to the stored task and ids already gone are skipped, which drops this process's
+        own writes coming back through the feed. Before the first load everything is returned.
+        """
+        with self._lock:
+            if self._deferred(self.apply_changes, (rows, deleted_ids)):
+                return rows, deleted_ids
+            changed = []
+            for row in rows:
+                old = self._by_id.get(row[0])
+                if old is not None:
+                    if old.change_row() == tuple(row):
+                        continue
+                    self._unlink(old)
+                self._link(self._record(row))
+                changed.append(row)
+            deleted = [task_id for task_id in deleted_ids if task_id in self._by_id]
+            for task_id in deleted:
+                self._unlink(self._by_id[task_id])
+            return changed, deleted
+
+    def remove_many(self, task_ids):
+        """Drop many tasks with one pass over each list (remove() is a list deletion per task)"""
+        with self._lock:
+            if self._deferred(self.remove_many, (task_ids,)):
+                return
+            removed = {int(task_id) for task_id in task_ids}
+            for task_id in removed:
+                self._by_id.pop(task_id, None)
+            self._sorted = [record for record in self._sorted if record.id not in removed]
+            for status, bucket in self._buckets.items():
+                self._buckets[status] = [record for record in bucket if record.id not in removed]
+            self._due = [record for record in self._due if record.id not in removed]
+
+    def get(self, task_id):
+        with self._lock:
+            record = self._by_id.get(int(task_id))
+            return record.row() if record is not None else None
+
+    def count(self, status=None):
+        with self._lock:
+            return len(self._sorted if status is None else self._buckets.get(status, ()))
+
+    def page(self, page_cursor, limit, status=None):
+        """Same rows as TaskService.fetch_page: limit tasks after page_cursor=(priority_rank, due_epoch, id)"""
+        with self._lock:
+            records = self._sorted if status is None else self._buckets.get(status, [])
+            start = 0
+            if page_cursor is not None:
+                rank, due_epoch, task_id = page_cursor
+                start = bisect_left(records, task_db.sort_key(task_id, rank, due_epoch), key=display_key)
+                if start < len(records) and records[start].id == task_id:
+                    start += 1
+            return [record.page_row() for record in records[start:start + limit]]
+
+    def rows(self, status=None, priority=None, due_from=None, due_to=None):
+        """TASK_COLUMNS rows in display order matching the filters (due bounds are epochs, inclusive)"""
+        with self._lock:
+            records = list(self._sorted if status is None else self._buckets.get(status, ()))
+        for record in records:
+            if priority is not None and record.priority != priority:
+                continue
+            if due_from is not None and (record.due_epoch is None or record.due_epoch < due_from):
+                continue
+            if due_to is not None and (record.due_epoch is None or record.due_epoch > due_to):
+                continue
+            yield record.row()
+
+    def due_before(self, cutoff):
+        """(id, title, due_date) of pending tasks due before the cutoff epoch, earliest first"""
+        with self._lock:
+            end = bisect_left(self._due, (cutoff, 0), key=due_key)
+            return [(record.id, record.title, record.due_date) for record in self._due[:end]]
+
+    def next_due(self, after):
+        """The first pending task due at or after the given epoch, as (id, title, due_date), or None"""
+        with self._lock:
+            index = bisect_left(self._due, (after, 0), key=due_key)
+            if index == len(self._due):
+                return None
+            record = self._due[index]
+            return record.id, record.title, record.due_date
@@ -0,0 +1,153 @@
+"""TaskService on the MySQL/MariaDB pool (task_mysql.py)
+
+Runs against the server in the TASKS_MYSQL_* environment variables, in a scratch database that
+is dropped afterwards; every test is skipped when no server is reachable.
+
+    TASKS_MYSQL_PASSWORD=secret python -m pytest test_task_mysql.py
+"""
+import os
+import threading
+import time
+import unittest
+
+import mysql.connector
+
+import task_mysql
+from task_ai import PriorityClassifier
+from task_service import TaskService
+
+TEST_DATABASE = f"task_scheduler_test_{os.getpid()}"
+SERVER_CONFIG = {key: value for key, value in task_mysql.MYSQL_CONFIG.items() if key != "database"}
+TEST_CONFIG = dict(SERVER_CONFIG, database=TEST_DATABASE)
+
+
+def server():
+    return mysql.connector.connect(autocommit=True, connection_timeout=5, **SERVER_CONFIG)
+
+
+def setUpModule():
+    try:
+        conn = server()
+    except mysql.connector.Error as e:
+        raise unittest.SkipTest(f"no MySQL server at {SERVER_CONFIG['host']}:{SERVER_CONFIG['port']}: {e}")
+    try:
+        conn.cursor().execute(f"CREATE DATABASE {TEST_DATABASE}")
+    finally:
+        conn.close()
+
+
+def tearDownModule():
+    conn = server()
+    try:
+        conn.cursor().execute(f"DROP DATABASE IF EXISTS {TEST_DATABASE}")
+    finally:
+        conn.close()
+
+
+def server_connections():
+    """Connections the server has open to the scratch database"""
+    conn = server()
+    try:
+        cursor = conn.cursor()
+        cursor.execute("SELECT COUNT(*) FROM information_schema.PROCESSLIST WHERE DB=%s", (TEST_DATABASE,))
+        return cursor.fetchone()[0]
+    finally:
+        conn.close()
+
+
+class MySQLServiceTest(unittest.TestCase):
+    pool_size = 2
+
+    def setUp(self):
+        self.pool = task_mysql.ConnectionPool(TEST_CONFIG, size=self.pool_size, reconnect_delay=0.1)
+        task_mysql.init_schema(self.pool)
+        with self.pool.write() as conn:
+            conn.execute("DELETE FROM tasks")
+        self.service = TaskService(classifier=PriorityClassifier(), pool=self.pool)
+
+    def tearDown(self):
+        self.service.close()
+        self.pool.close()
+
+    def connection_id(self):
+        with self.pool.read() as conn:
+            return conn.execute("SELECT CONNECTION_ID()").fetchone()[0]
+
+    def test_migrations(self):
+        with self.pool.read() as conn:
+            self.assertEqual(task_mysql.schema_version(conn), task_mysql.SCHEMA_VERSION)
+            columns = {row[0] for row in conn.execute(
+                "SELECT COLUMN_NAME FROM information_schema.COLUMNS WHERE TABLE_SCHEMA=? AND TABLE_NAME='tasks'",
+                (TEST_DATABASE,)
+            ).fetchall()}
+        self.assertLessEqual({"priority_rank", "due_epoch", "estimate_hours", "completed_at", "score",
+                              "score_features"}, columns)
+        self.assertEqual(task_mysql.init_schema(self.pool), task_mysql.SCHEMA_VERSION)
+
+    def test_crud(self):
+        task_id = self.service.add_task("Pay rent", "urgent, landlord is waiting", "2030-01-31")[0]
+        self.assertEqual(self.service.get_task(task_id)[1:6],
+                         ("Pay rent", "urgent, landlord is waiting", "2030-01-31", "High", "Pending"))
+        self.service.update_task(task_id, "Pay the rent", "whenever", "2030-02-01")
+        self.assertEqual(self.service.get_task(task_id)[1:5], ("Pay the rent", "whenever", "2030-02-01", "Low"))
+        self.assertEqual(self.service.complete_task(task_id), 1)
+        self.assertEqual(self.service.get_task(task_id)[5], "Completed")
+        self.assertEqual(self.service.count_tasks("Completed"), 1)
+        self.assertEqual(self.service.delete_task(task_id), 1)
+        self.assertIsNone(self.service.get_task(task_id))
+        self.assertEqual(self.service.delete_task(task_id), 0)
+        self.assertIsNone(self.service.update_task(task_id, "Pay the rent", "", "2030-02-01"))
+
+    def test_query_after_partly_read_listing(self):
+        for number in range(10):
+            self.service.add_task(f"Task {number}", "", "2030-01-01")
+        for _ in range(self.pool_size):
+            rows = self.service.iter_tasks(chunk_size=2)
+            self.assertEqual(next(rows)[1], "Task 0")
+            rows.close()  # returns its connection with the rest of the result set unread
+        self.assertEqual(self.service.count_tasks(), 10)
+        self.assertEqual(len(list(self.service.iter_tasks(chunk_size=3))), 10)
+
+    def test_checkouts_wait_for_a_free_connection(self):
+        errors = []
+
+        def hold():
+            try:
+                with self.pool.read() as conn:
+                    conn.execute("SELECT SLEEP(0.2)").fetchone()
+            except Exception as e:
+                errors.append(e)
+
+        threads = [threading.Thread(target=hold) for _ in range(self.pool_size * 3)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(errors, [])
+
+    def test_reconnect_after_dropped_connection(self):
+        self.service.add_task("Call the bank", "", "2030-01-01")
+        dropped = {self.connection_id() for _ in range(self.pool_size)}
+        conn = server()
+        try:
+            for connection_id in dropped:
+                conn.cursor().execute(f"KILL {int(connection_id)}")
+        finally:
+            conn.close()
+        time.sleep(0.2)
+        self.assertEqual(self.service.count_tasks(), 1)
+        self.assertNotIn(self.connection_id(), dropped)
+
+    def test_close_disconnects_pooled_connections(self):
+        self.service.count_tasks()
+        self.assertGreaterEqual(server_connections(), 1)
+        self.pool.close()
+        deadline = time.monotonic() + 5
+        while server_connections() and time.monotonic() < deadline:
+            time.sleep(0.05)
+        self.assertEqual(server_connections(), 0)
+        self.pool = task_mysql.ConnectionPool(TEST_CONFIG, size=1)  # for tearDown
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,84 @@
+import queue
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from metrics import METRICS
+
+# How often the Tk thread picks up callbacks handed over by other threads
+UI_POLL_MS = 10
+
+
+class UiQueue:
+    """Hands callbacks from any thread to the Tk thread
+
+    Tkinter calls, root.after included, are only safe on the thread running the main loop, so
+    after() here just puts the callback on a queue.Queue. A recurring root.after poll on the Tk
+    thread empties it and schedules each callback there with the delay it was given.
+    """
+
+    def __init__(self, root, interval_ms=UI_POLL_MS):
+        self.root = root
+        self.interval_ms = interval_ms
+        self._queue = queue.Queue()
+        self.root.after(self.interval_ms, self._drain)
+
+    def after(self, delay_ms, fn, *args):
+        """root.after(delay_ms, fn, *args) from any thread"""
+        self._queue.put((delay_ms, fn, args))
+
+    def _drain(self):
+        self.root.after(self.interval_ms, self._drain)
+        while True:
+            try:
+                delay_ms, fn, args = self._queue.get_nowait()
+            except queue.Empty:
+                return
+            self.root.after(delay_ms, fn, *args)
+
+
+class DbWorker:
+    """Runs database and NLP jobs off the Tk thread
+
+    factory() is called on the worker thread to create the object jobs run against (a TaskService,
+    which owns its own SQLite connection). Jobs are called as job(service, *args) in submission
+    order (one thread, so writes are serialized and a page fetched after an edit sees it).
+    Results and errors are handed back to the Tk thread through a UiQueue, so callbacks may
+    touch widgets. Each job's queue wait and run time are recorded in METRICS.
+    """
+
+    def __init__(self, ui, factory):
+        self.ui = ui
+        self.factory = factory
+        self._local = threading.local()
+        self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="db-worker", initializer=self._open)
+
+    def _open(self):
+        self._local.service = self.factory()
+
+    def _run(self, job, args, submitted):
+        started = time.perf_counter()
+        METRICS.record("worker queue wait", started - submitted)
+        try:
+            return job(self._local.service, *args)
+        finally:
+            METRICS.record(f"job {getattr(job, '__name__', 'job')}", time.perf_counter() - started)
+
+    def submit(self, job, *args, on_done=None, on_error=None):
+        future = self.executor.submit(self._run, job, args, time.perf_counter())
+        future.add_done_callback(lambda f: self._deliver(f, on_done, on_error))
+        return future
+
+    def _deliver(self, future, on_done, on_error):
+        error = future.exception()
+        if error is not None:
+            print(f"[Worker Error]: {error}", file=sys.stderr)
+            if on_error is not None:
+                self.ui.after(0, on_error, error)
+        elif on_done is not None:
+            self.ui.after(0, on_done, future.result())
+
+    def shutdown(self):
+        self.executor.submit(lambda: self._local.service.close())
+        self.executor.shutdown(wait=True)